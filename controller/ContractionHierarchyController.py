@@ -0,0 +1,74 @@
+from controller.RouteController import RouteController
+from core.Util import ConnectionInfo, Vehicle
+from core.contraction_hierarchy import ContractionHierarchy
+import numpy as np
+from core.sumo_backend import traci
+
+
+class ContractionHierarchyPolicy(RouteController):
+    """
+    Routes every vehicle with a customizable contraction hierarchy. The hierarchy is built once, and on every step
+    it is customized with the current edge weights before the vehicles are routed.
+    Weight types:
+        - "length": the edge lengths
+        - "density": the length weighted by the vehicle density of the edge, as in DensityDijkstraPolicy
+        - "travel_time": the length divided by the last step mean speed of the edge
+    """
+    def __init__(self, connection_info, weight_type="travel_time", order_cache_file=None):
+        """
+        :param weight_type: "length", "density" or "travel_time"
+        :param order_cache_file: file used to cache the contraction order, defaults to <net file>.ch_order.npz
+        """
+        super().__init__(connection_info)
+        if weight_type not in ("length", "density", "travel_time"):
+            raise ValueError("Unknown weight type: {}".format(weight_type))
+        self.weight_type = weight_type
+        self.engine = ContractionHierarchy(connection_info, order_cache_file)
+        self.lengths = np.array([connection_info.edge_length_dict[edge_id] for edge_id in connection_info.edge_ids])
+        self.passenger_edges = connection_info.edge_list_indices
+        self.customized_weights = None
+
+    def compute_weights(self):
+        """
+        Computes the weight of every edge for the current step, indexed by edge index. Edges that do not allow
+        passenger vehicles keep their length, they are never entered.
+        """
+        weights = self.lengths.copy()
+        if self.weight_type == "length":
+            return weights
+        traffic = self.current_traffic()
+        lengths = weights[self.passenger_edges]
+        if self.weight_type == "density":
+            density = traffic.density[self.passenger_edges]
+            weights[self.passenger_edges] = np.maximum(lengths, lengths * (100 * density))
+        else:
+            speed = traffic.mean_speed[self.passenger_edges]
+            # a jammed edge is very expensive, but not impassable
+            weights[self.passenger_edges] = lengths / np.maximum(speed, 0.1)
+        return weights
+
+    def make_decisions(self, vehicles, connection_info):
+        """
+        Customizes the hierarchy with the weights of this step, then finds the shortest path of every vehicle
+        with a query on the hierarchy. The weights are published on every step, also without vehicles to route, so
+        the route plans of the vehicles that follow them are checked against the current weights.
+        :param vehicles: list of vehicles on the map
+        :param connection_info: information about the map (roads, junctions, etc)
+        """
+        weights = self.compute_weights()
+        self.publish_weights(weights)
+        if not vehicles:
+            return {}
+        # customization only has to run again when the weights changed
+        if self.customized_weights is None or not np.array_equal(weights, self.customized_weights):
+            self.engine.customize(weights)
+            self.customized_weights = weights
+
+        local_targets = {}
+        edge_index_dict = self.connection_info.edge_index_dict
+        for vehicle in vehicles:
+            decision_list = self.cached_decisions(vehicle, lambda v: self.engine.shortest_path_directions(
+                edge_index_dict[v.current_edge], edge_index_dict[v.destination]))
+
+            local_targets[vehicle.vehicle_id] = self.compute_local_target(decision_list, vehicle)
+        return local_targets
@@ -1,15 +1,34 @@
 from controller.RouteController import RouteController
 from core.Util import ConnectionInfo, Vehicle
+from core.shortest_path_engine import DijkstraEngine
 import numpy as np
-import traci
+from core.sumo_backend import traci
 import math
 import copy
 
 
 class DensityDijkstraPolicy(RouteController):
 
-    def __init__(self, connection_info):
+    def __init__(self, connection_info, batch=False):
+        """
+        :param batch: if True, vehicles sharing a destination are routed from one reverse shortest-path tree
+                      computed with the density weights
+        """
         super().__init__(connection_info)
+        self.batch = batch
+        self.engine = DijkstraEngine(connection_info)
+        self.len_dict = {}
+
+    def compute_density_weights(self):
+        """
+        Computes the density weight of every edge from the traffic snapshot, indexed by edge index. Edges that do
+        not allow passenger vehicles keep their length, they are never entered by a search.
+        :return: list of per-edge costs for the DijkstraEngine
+        """
+        traffic = self.current_traffic()
+        weights = np.maximum(traffic.edge_lengths, traffic.edge_lengths * (100 * traffic.density))
+        weights = np.where(self.connection_info.passenger_mask, weights, traffic.edge_lengths)
+        return weights.tolist()
 
     def make_decisions(self, vehicles, connection_info):
         """
@@ -19,54 +38,62 @@ class DensityDijkstraPolicy(RouteController):
         :param vehicles: list of vehicles on the map
         :param connection_info: information about the map (roads, junctions, etc)
         """
+        if self.batch and vehicles:
+            return self.make_batch_decisions(vehicles, self.engine, self.compute_density_weights())
+
+        # Creates new length dictionary based on the density of the edge, once for all vehicles of this step
+        weights = self.compute_density_weights()
+        self.len_dict = {edge: weights[index] for edge, index in self.connection_info.edge_index_dict.items()}
+        self.publish_weights(weights)
+
         local_targets = {}
         for vehicle in vehicles:
-            decision_list = []
-            unvisited = {edge: 1000000000 for edge in self.connection_info.edge_list}  # map of unvisited edges
-            visited = {}  # map of visited edges
-            current_edge = vehicle.current_edge
-
-            current_distance = self.connection_info.edge_length_dict[current_edge]
-            unvisited[current_edge] = current_distance
-            path_lists = {edge: [] for edge in
-                          self.connection_info.edge_list}  # stores shortest path to each edge using directions
-            while True:
+            decision_list = self.cached_decisions(vehicle, self.density_dijkstra_decisions)
 
-                # Creates new length dictionary based on the density of the edge
-                len_dict = {}
-                for edge_now in self.connection_info.edge_list:
-                    car_num = traci.edge.getLastStepVehicleNumber(edge_now)
-                    density = car_num / self.connection_info.edge_length_dict[edge_now]
-                    len_dict[edge_now] = max((self.connection_info.edge_length_dict[edge_now]),
-                                             (self.connection_info.edge_length_dict[edge_now]) * (100*density))
+            local_targets[vehicle.vehicle_id] = self.compute_local_target(decision_list, vehicle)
+        return local_targets
 
-                if current_edge not in self.connection_info.outgoing_edges_dict.keys():
-                    continue
-                for direction, outgoing_edge in self.connection_info.outgoing_edges_dict[current_edge].items():
-                    if outgoing_edge not in unvisited:
-                        continue
-                    new_distance = current_distance + len_dict[outgoing_edge]
-                    new_distance_2 = current_distance + self.connection_info.edge_length_dict[outgoing_edge]
-                    if new_distance < unvisited[outgoing_edge]:
-                        # The edge dictionary used for the next step is the set as the original length, not the
-                        # weighted length of that edge
-                        unvisited[outgoing_edge] = new_distance_2
-                        current_path = copy.deepcopy(path_lists[current_edge])
-                        current_path.append(direction)
-                        path_lists[outgoing_edge] = copy.deepcopy(current_path)
+    def density_dijkstra_decisions(self, vehicle):
+        """
+        Dijkstra's Algorithm from the current edge of the vehicle with the density weights.
+        :return: the list of directions from the current edge of the vehicle to its destination
+        """
+        decision_list = []
+        unvisited = {edge: 1000000000 for edge in self.connection_info.edge_list}  # map of unvisited edges
+        visited = {}  # map of visited edges
+        current_edge = vehicle.current_edge
 
-                visited[current_edge] = current_distance
-                del unvisited[current_edge]
-                if not unvisited:
-                    break
-                if current_edge == vehicle.destination:
-                    break
-                possible_edges = [edge for edge in unvisited.items() if edge[1]]
-                current_edge, current_distance = sorted(possible_edges, key=lambda x: x[1])[0]
+        current_distance = self.connection_info.edge_length_dict[current_edge]
+        unvisited[current_edge] = current_distance
+        path_lists = {edge: [] for edge in
+                      self.connection_info.edge_list}  # stores shortest path to each edge using directions
+        len_dict = self.len_dict
+        while True:
 
-            for direction in path_lists[vehicle.destination]:
-                decision_list.append(direction)
+            if current_edge not in self.connection_info.outgoing_edges_dict.keys():
+                continue
+            for direction, outgoing_edge in self.connection_info.outgoing_edges_dict[current_edge].items():
+                if outgoing_edge not in unvisited:
+                    continue
+                new_distance = current_distance + len_dict[outgoing_edge]
+                new_distance_2 = current_distance + self.connection_info.edge_length_dict[outgoing_edge]
+                if new_distance < unvisited[outgoing_edge]:
+                    # The edge dictionary used for the next step is the set as the original length, not the
+                    # weighted length of that edge
+                    unvisited[outgoing_edge] = new_distance_2
+                    current_path = copy.deepcopy(path_lists[current_edge])
+                    current_path.append(direction)
+                    path_lists[outgoing_edge] = copy.deepcopy(current_path)
 
-            local_targets[vehicle.vehicle_id] = self.compute_local_target(decision_list, vehicle)
-        return local_targets
+            visited[current_edge] = current_distance
+            del unvisited[current_edge]
+            if not unvisited:
+                break
+            if current_edge == vehicle.destination:
+                break
+            possible_edges = [edge for edge in unvisited.items() if edge[1]]
+            current_edge, current_distance = sorted(possible_edges, key=lambda x: x[1])[0]
 
+        for direction in path_lists[vehicle.destination]:
+            decision_list.append(direction)
+        return decision_list
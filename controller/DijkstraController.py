@@ -1,15 +1,17 @@
 from controller.RouteController import RouteController
 from core.Util import ConnectionInfo, Vehicle
-import numpy as np
-import traci
-import math
-import copy
+from core.shortest_path_engine import DijkstraEngine
 
 
 class DijkstraPolicy(RouteController):
 
-    def __init__(self, connection_info):
+    def __init__(self, connection_info, batch=False):
+        """
+        :param batch: if True, vehicles sharing a destination are routed from one reverse shortest-path tree
+        """
         super().__init__(connection_info)
+        self.engine = DijkstraEngine(connection_info)
+        self.batch = batch
 
     def make_decisions(self, vehicles, connection_info):
         """
@@ -17,47 +19,15 @@ class DijkstraPolicy(RouteController):
         :param vehicles: list of vehicles on the map
         :param connection_info: information about the map (roads, junctions, etc)
         """
+        if self.batch:
+            return self.make_batch_decisions(vehicles, self.engine)
+
         local_targets = {}
+        edge_index_dict = self.connection_info.edge_index_dict
         for vehicle in vehicles:
-            # print("{}: current - {}, destination - {}".format(vehicle.vehicle_id, vehicle.current_edge, vehicle.destination))
-            decision_list = []
-            unvisited = {edge: 1000000000 for edge in self.connection_info.edge_list}  # map of unvisited edges
-            visited = {}  # map of visited edges
-            current_edge = vehicle.current_edge
-
-            current_distance = self.connection_info.edge_length_dict[current_edge]
-            unvisited[current_edge] = current_distance
-            path_lists = {edge: [] for edge in
-                          self.connection_info.edge_list}  # stores shortest path to each edge using directions
-            while True:
-                if current_edge not in self.connection_info.outgoing_edges_dict.keys():
-                    continue
-                for direction, outgoing_edge in self.connection_info.outgoing_edges_dict[current_edge].items():
-                    if outgoing_edge not in unvisited:
-                        continue
-                    edge_length = self.connection_info.edge_length_dict[outgoing_edge]
-                    new_distance = current_distance + edge_length
-                    if new_distance < unvisited[outgoing_edge]:
-                        unvisited[outgoing_edge] = new_distance
-                        current_path = copy.deepcopy(path_lists[current_edge])
-                        current_path.append(direction)
-                        path_lists[outgoing_edge] = copy.deepcopy(current_path)
-                        # print("{} + {} : {} + {}".format(path_lists[current_edge], direction, path_edge_lists[current_edge], outgoing_edge))
-
-                visited[current_edge] = current_distance
-                del unvisited[current_edge]
-                if not unvisited:
-                    break
-                if current_edge == vehicle.destination:
-                    break
-                possible_edges = [edge for edge in unvisited.items() if edge[1]]
-                current_edge, current_distance = sorted(possible_edges, key=lambda x: x[1])[0]
-                # print('{}:{}------------'.format(current_edge, current_distance))
-            # current_edge = vehicle.current_edge
-
-            for direction in path_lists[vehicle.destination]:
-                decision_list.append(direction)
+            # heap-based search over edge indices, stops as soon as the destination is settled
+            decision_list = self.cached_decisions(vehicle, lambda v: self.engine.shortest_path_directions(
+                edge_index_dict[v.current_edge], edge_index_dict[v.destination]))
 
             local_targets[vehicle.vehicle_id] = self.compute_local_target(decision_list, vehicle)
         return local_targets
-
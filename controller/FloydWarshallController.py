@@ -1,7 +1,8 @@
 from controller.RouteController import RouteController
 from core.Util import ConnectionInfo, Vehicle
+from core.all_pairs_shortest_paths import DynamicAllPairsEngine
 import numpy as np
-import traci
+from core.sumo_backend import traci
 import math
 import copy
 
@@ -20,40 +21,44 @@ class FloydWarshallPolicy(RouteController):
         """
         super().__init__(connection_info)
         self.edge_lane_speed_list = {}
+        self.create_lane_speed()
+        self.engine = DynamicAllPairsEngine(connection_info)
+
+    def edges_of_interest(self, vehicle, hops=2):
+        """
+        The all-pairs travel times are computed from the mean speed of every edge, so every edge of edge_list is
+        of interest.
+        """
+        return self.connection_info.edge_list_indices
 
     def trace_path(self, i, j, p):
         """
-        Reconstructs the path from edge i to edge j using the predecessor matrix constructed during
+        Reconstructs the path from edge i to edge j using the next hop matrix constructed during
         the calculations of the Floyd-Warshall algorithm
         :param i: edge i, the initial edge
         :param j: edge j, the final edge
-        :param p: the predecessor matrix, where p[i][j] contains the predecessor from i to j
+        :param p: the next hop matrix, where p[i][j] contains the edge after i on the path from i to j
         :return: path: an array containing the reconstructed path from edge i to edge j
         """
         if p[i][j] == -1:
-            return {}
+            return []
 
         path = [i]
         while i != j:
-            i = p[i][j]
+            i = int(p[i][j])
             path.append(i)
 
         return path
 
     def create_lane_speed(self):
         """
-        Constructs the variable edge_lane_speed_list, filling it with the maximum speed of each edge.
+        Constructs the variable edge_lane_speed_list, filling it with the maximum speed of each edge from the
+        network file.
         """
-        for edge in self.connection_info.edge_list:
-            if self.edge_lane_speed_list:
-                return
-
-        lanes_list = traci.lane.getIDList()
-        self.edge_lane_speed_list = {edge: [] for edge in self.connection_info.edge_list}
-        for lane in lanes_list:
-            edge = traci.lane.getEdgeID(lane)
-            if edge in self.edge_lane_speed_list:
-                self.edge_lane_speed_list[edge].append(traci.lane.getMaxSpeed(lane))
+        if self.edge_lane_speed_list:
+            return
+        self.edge_lane_speed_list = {edge: self.connection_info.edge_max_speed_dict[edge]
+                                     for edge in self.connection_info.edge_list}
 
     def make_decisions(self, vehicles, connection_info):
         """
@@ -65,15 +70,13 @@ class FloydWarshallPolicy(RouteController):
         """
         self.create_lane_speed()
 
-        # Variables used for the Floyd-Warshall algorithm
-        inf = 1e8
-        n = len(self.connection_info.edge_list)
         edge_idx = self.connection_info.edge_index_dict
 
         # Computes the weight of edges
+        mean_speeds = self.current_traffic().mean_speed.tolist()
         weight = {}
         for edge in self.connection_info.edge_list:
-            max_speed = max(self.edge_lane_speed_list[edge])
+            max_speed = self.edge_lane_speed_list[edge]
             length = self.connection_info.edge_length_dict[edge]
 
             # The commented section below does the exact same thing as the uncommented section. TraCI and SUMO
@@ -92,61 +95,41 @@ class FloydWarshallPolicy(RouteController):
             #     print(">>>> ", total_velocity, len(vehicles_on_edge), speed)
             # print(traci.edge.getLastStepMeanSpeed(edge), traci.edge.getLastStepVehicleNumber(edge))
 
-            traci_spd = traci.edge.getLastStepMeanSpeed(edge)
+            traci_spd = mean_speeds[edge_idx[edge]]
             speed = traci_spd if traci_spd != 0 else max_speed
             weight[edge] = length / speed
 
-        # Initializes the distance matrix, where distance[i][j] stores the shortest path from i to j
-        distance = [[inf if i != j else 0 for i in range(n)] for j in range(n)]
+        # Computes the shortest path for all pairs of edges i and j; engine.next_hop[i][j] stores the next edge
+        # after i on the path to j. Only the pairs affected by the weights that changed since the last step
+        # are updated.
+        weights = np.zeros(self.engine.edge_count, dtype=np.float32)
         for edge in self.connection_info.edge_list:
-            idx1 = edge_idx[edge]
-            for direction, outgoing_edge in self.connection_info.outgoing_edges_dict[edge].items():
-                idx2 = edge_idx[outgoing_edge]
-                distance[idx1][idx2] = weight[edge]
-
-        # Initializes predecessor matrix, where p[i][j] stores the predecessor from i to j
-        p = [[0 for i in range(n)] for j in range(n)]
-        for i in range(n):
-            for j in range(n):
-                if distance[i][j] == inf:
-                    p[i][j] = -1
-                else:
-                    p[i][j] = j
-
-        # Floyd-Warshall Algorithm, computes the shortest path for all pairs of edges i and j
-        for k in range(n):
-            for i in range(n):
-                for j in range(n):
-                    if distance[i][k] == inf or distance[k][j] == inf:
-                        continue
-
-                    if distance[i][k] + distance[k][j] < distance[i][j]:
-                        distance[i][j] = distance[i][k] + distance[k][j]
-                        p[i][j] = p[i][k]
+            weights[edge_idx[edge]] = weight[edge]
+        self.engine.update_weights(weights)
+        self.publish_weights(weights)
 
         local_targets = {}
         for vehicle in vehicles:
-            # Defines variables for easier use in the following sections
-            current_edge = vehicle.current_edge
-            destination = vehicle.destination
-            curr = edge_idx[current_edge]
-            end = edge_idx[destination]
-
-            # Traces the shortest path between the origin (curr) and the destination (end)
-            path = self.trace_path(curr, end, p)
-            edge_path = []
-            for edge in path:
-                for key, value in edge_idx.items():
-                    if edge == value:
-                        edge_path.append(key)
-
-            # Uses the reconstructed path to make a decisions list that can be used to compute instructions
-            decision_list = []
-            for i in range(len(edge_path) - 1):
-                for direction, outgoing_edge in self.connection_info.outgoing_edges_dict[edge_path[i]].items():
-                    if outgoing_edge == edge_path[i + 1]:
-                        decision_list.append(direction)
+            decision_list = self.cached_decisions(vehicle, self.compute_decisions)
 
             # Creates the local_targets for each vehicle
             local_targets[vehicle.vehicle_id] = self.compute_local_target(decision_list, vehicle)
         return local_targets
+
+    def compute_decisions(self, vehicle):
+        """
+        Reads the shortest path of a vehicle from the next hop matrix.
+        :return: the list of directions from the current edge of the vehicle to its destination
+        """
+        edge_idx = self.connection_info.edge_index_dict
+        # Defines variables for easier use in the following sections
+        current_edge = vehicle.current_edge
+        destination = vehicle.destination
+        curr = edge_idx[current_edge]
+        end = edge_idx[destination]
+
+        # Traces the shortest path between the origin (curr) and the destination (end)
+        path = self.trace_path(curr, end, self.engine.next_hop)
+
+        # Uses the reconstructed path to make a decisions list that can be used to compute instructions
+        return self.connection_info.path_directions(path)
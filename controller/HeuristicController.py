@@ -1,7 +1,10 @@
 from controller.RouteController import RouteController
 from core.Util import ConnectionInfo, Vehicle
+from core.shortest_path_engine import DijkstraEngine
+from core.all_pairs_shortest_paths import DynamicAllPairsEngine
+from core.landmarks import LandmarkIndex
 import numpy as np
-import traci
+from core.sumo_backend import traci
 import math
 import copy
 import heapq
@@ -28,9 +31,24 @@ class PriorityQueue:
 
 class HeuristicPolicy(RouteController):
 
-    def __init__(self, connection_info):
+    def __init__(self, connection_info, batch=False, landmark_count=None):
+        """
+        :param batch: if True, vehicles sharing a destination are routed from one reverse shortest-path tree of
+                      the travel-time weights instead of one A* search each; the routes have the same travel time,
+                      but ties between routes can be broken differently
+        :param landmark_count: if set, the heuristic uses lower bounds from this many landmarks, computed once
+                               with the free-flow travel times, instead of a Floyd-Warshall matrix on every step
+        """
         super().__init__(connection_info)
+        self.batch = batch
+        self.landmark_count = landmark_count
+        self.engine = DijkstraEngine(connection_info)
+        self.floyd_warshall = None if landmark_count else DynamicAllPairsEngine(connection_info)
+        self.landmarks = None
+        self.goal_bounds = None
+        self.current_time = 0
         self.edge_lane_speed_list = {}
+        self.create_lane_speed()
         self.edge_idx = self.connection_info.edge_index_dict
         self.weight = None
         self.distance = None
@@ -38,42 +56,30 @@ class HeuristicPolicy(RouteController):
 
     def create_lane_speed(self):
         """
-        Constructs the variable edge_lane_speed_list, filling it with the maximum speed of each edge.
+        Constructs the variable edge_lane_speed_list, filling it with the maximum speed of each edge from the
+        network file.
+        """
+        self.edge_lane_speed_list = {edge: self.connection_info.edge_max_speed_dict[edge]
+                                     for edge in self.connection_info.edge_list}
+
+    def edges_of_interest(self, vehicle, hops=2):
+        """
+        The weights and the all-pairs heuristic are computed from the vehicles on every edge, so every edge of
+        edge_list is of interest.
         """
-        lanes_list = traci.lane.getIDList()
-        self.edge_lane_speed_list = {edge: 0 for edge in self.connection_info.edge_list}
-        for lane in lanes_list:
-            edge = traci.lane.getEdgeID(lane)
-            if edge in self.edge_lane_speed_list:
-                self.edge_lane_speed_list[edge] = max(traci.lane.getMaxSpeed(lane),
-                                                      self.edge_lane_speed_list[edge])
+        return self.connection_info.edge_list_indices
 
     def generate_floyd_warshall(self):
         """
         Generates the distance for Floyd-Warshall to use as heuristic.
         """
-        # Variables used for the Floyd-Warshall algorithm
-        inf = 1e9
-        n = len(self.connection_info.edge_list)
-
-        # Initializes the distance matrix, where distance[i][j] stores the shortest path from i to j
-        distance = [[inf if i != j else 0 for i in range(n)] for j in range(n)]
+        weights = np.zeros(self.floyd_warshall.edge_count, dtype=np.float32)
         for edge in self.connection_info.edge_list:
-            idx1 = self.edge_idx[edge]
-            for direction, outgoing_edge in self.connection_info.outgoing_edges_dict[edge].items():
-                idx2 = self.edge_idx[outgoing_edge]
-                distance[idx1][idx2] = self.weight[edge]
-
-        # Computes the shortest path for all pairs of edges i and j
-        for k in range(n):
-            for i in range(n):
-                for j in range(n):
-                    if distance[i][k] == inf or distance[k][j] == inf:
-                        continue
-                    if distance[i][k] + distance[k][j] < distance[i][j]:
-                        distance[i][j] = distance[i][k] + distance[k][j]
-
-        return distance
+            weights[self.edge_idx[edge]] = self.weight[edge]
+
+        # Computes the shortest path for all pairs of edges i and j, updating only the pairs affected by the
+        # weights that changed since the last call
+        return self.floyd_warshall.update_weights(weights)
 
     def compute_weights(self):
         """
@@ -81,15 +87,18 @@ class HeuristicPolicy(RouteController):
         across that edge. The estimate is based on a log of the ratio of maximum
         occupancy to current occupancy of the edge.
         """
+        traffic = self.current_traffic()
+        vehicle_numbers = traffic.vehicle_number.tolist()
+        vehicle_lengths = traffic.vehicle_length.tolist()
         weight = {}
         for edge in self.connection_info.edge_list:
             max_speed = self.edge_lane_speed_list[edge]  # maximum speed on the edge
             length = self.connection_info.edge_length_dict[edge]  # length of the edge
 
-            vehicle_number = traci.edge.getLastStepVehicleNumber(edge)  # number of vehicles on the edge
+            vehicle_number = vehicle_numbers[self.edge_idx[edge]]  # number of vehicles on the edge
             vehicle_number = max(vehicle_number, 0.01)  # account for case where there are no vehicles on edge
 
-            vehicle_length = max(traci.edge.getLastStepLength(edge),  # average length of vehicles on the edge
+            vehicle_length = max(vehicle_lengths[self.edge_idx[edge]],  # average length of vehicles on the edge
                                  self.saved_vehicle_length)  # if there are no vehicles, use this saved length
             max_cars = length / (1.3 * vehicle_length)  # multiplied to account for space between vehicles
             max_cars = max(vehicle_number, max_cars)  # max_cars might not be fully accurate, this fixes it
@@ -102,12 +111,29 @@ class HeuristicPolicy(RouteController):
             weight[edge] = length / speed  # estimates travel time and assigns its
         return weight
 
+    def free_flow_weights(self):
+        """
+        Computes the weights of compute_weights on an empty network, the lowest they can be, indexed by edge index.
+        Edges that do not allow passenger vehicles keep their length, they are never entered.
+        """
+        weights = list(self.engine.lengths)
+        for edge in self.connection_info.edge_list:
+            length = self.connection_info.edge_length_dict[edge]
+            vehicle_number = 0.01
+            max_cars = max(vehicle_number, length / (1.3 * self.saved_vehicle_length))
+            if max_cars == vehicle_number:
+                max_cars += 1
+            speed = self.edge_lane_speed_list[edge] * np.log(max_cars / vehicle_number)
+            weights[self.edge_idx[edge]] = length / speed
+        return weights
+
     def make_decisions(self, vehicles, connection_info):
         """
         make_decisions uses a modified A-star Algorithm to find the shortest path between each individual
         vehicle's current position and its destination. The heuristic used in the A-star algorithm if the
         remaining travel time between its current position and its destination, where a lower travel time
-        is better. This remaining travel time is calculated using the Floyd-Warshall algorithm.
+        is better. This remaining travel time is calculated using the Floyd-Warshall algorithm, or bounded from
+        below by landmark distances.
         :param vehicles: list of vehicles on the map
         :param connection_info: information about the map (roads, junctions, etc)
         """
@@ -116,15 +142,44 @@ class HeuristicPolicy(RouteController):
 
         self.weight = self.compute_weights()  # Calculate the weights based on travel time
 
-        # Calculate the distances between every node using Floyd-Warshall
-        self.distance = self.generate_floyd_warshall()
+        weights = [self.weight.get(edge, length) for edge, length in
+                   zip(self.connection_info.edge_ids, self.engine.lengths)]
+        self.publish_weights(weights)
+
+        # Both searches minimize the weights of the edges entered after the current edge. The heuristic is a
+        # per-vehicle constant plus the remaining travel time to the goal scaled down by sigma. The landmark bounds
+        # use the same entering-cost model, so that heuristic never overestimates and A* finds a path of the
+        # shortest travel time. The Floyd-Warshall distances pay the weight of an edge when leaving it, so next to
+        # the goal the heuristic can overestimate when an edge weighs more than sigma times the next one; in
+        # practice A* still finds paths of the shortest travel time (see test/test_heuristic_batch.py), and the
+        # reverse tree of the same weights gives paths of that cost without the all-pairs matrix. Where several
+        # paths share the shortest travel time, the two searches break the tie differently and can pick different
+        # ones.
+        if self.batch:
+            return self.make_batch_decisions(vehicles, self.engine, weights)
+
+        # The simulation time is read once for all the heuristic evaluations of this step
+        self.current_time = self.current_traffic().time
+        if self.landmark_count:
+            if self.landmarks is None:
+                self.landmarks = LandmarkIndex(self.connection_info, self.free_flow_weights(), self.landmark_count)
+            goal_bounds = {}
+        else:
+            # Calculate the distances between every node using Floyd-Warshall
+            self.distance = self.generate_floyd_warshall()
 
         local_targets = {}  # this will store the targets for each vehicle
 
         sorted_vehicles = sorted(vehicles, key=lambda x: x.start_time)  # Sort the vehicle set by start time.
+        # A* routes depend on the deadline of each vehicle, so they are not kept in the route cache
 
         # Iteratively loop through each vehicle
         for vehicle in sorted_vehicles:
+            if self.landmark_count:
+                # lower bounds on the remaining travel time to the destination, shared by its vehicles
+                if vehicle.destination not in goal_bounds:
+                    goal_bounds[vehicle.destination] = self.landmarks.lower_bounds(self.edge_idx[vehicle.destination])
+                self.goal_bounds = goal_bounds[vehicle.destination]
             # Parents stores the path from current edge to destination.
             parents = self.a_star_search(vehicle.current_edge, vehicle.destination, vehicle.deadline)
 
@@ -141,12 +196,7 @@ class HeuristicPolicy(RouteController):
             path_list = reconstruct_path(parents, vehicle.current_edge, vehicle.destination)
 
             # Uses the path list to create a set of instructions (in the form of directions) for vehicle
-            decision_list = list()
-            for i in range(len(path_list) - 1):
-                for direction, outgoing_edge in self.connection_info.outgoing_edges_dict[path_list[i]].items():
-                    if outgoing_edge == path_list[i + 1]:
-                        decision_list.append(direction)
-                        continue
+            decision_list = self.connection_info.edge_id_path_directions(path_list)
 
             local_targets[vehicle.vehicle_id] = self.compute_local_target(decision_list, vehicle)
         return local_targets
@@ -154,18 +204,21 @@ class HeuristicPolicy(RouteController):
     def heuristic(self, a, b, deadline, mu=0, sigma=50):
         """
         The heuristic is based on the previously calculated estimated total travel time from the
-        Floyd-Warshall algorithm, and the deadline of the vehicle.
+        Floyd-Warshall algorithm, or its landmark lower bound, and the deadline of the vehicle.
         :param a: the current edge
         :param b: the goal edge
         :param deadline: the deadline of the vehicle
         :param mu: mean, used for z score
         :param sigma: standard deviation, used for z score
         """
-        tt = self.distance[self.edge_idx[a]][self.edge_idx[b]]
+        if self.landmark_count:
+            tt = self.goal_bounds[self.edge_idx[a]]
+        else:
+            tt = self.distance[self.edge_idx[a]][self.edge_idx[b]]
         # This allows for negatives: ie. if the estimated travel time of this path passes the allowed
         # deadline, the heuristic is positive and the cost for the edge is increased. Else, the heuristic
         # is negative and the cost decreases, thereby encouraging the algorithm to pick this edge.
-        remaining_tt = (tt + traci.simulation.getTime()) - deadline
+        remaining_tt = (tt + self.current_time) - deadline
         # print(a, b, tt, remaining_tt, traci.simulation.getTime(), deadline)
         z = (remaining_tt - mu) / sigma  # uses the Z-score, since the remaining travel time can be very large,
                                          # leading to a large skew in how the weight is considered
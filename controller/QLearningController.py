@@ -1,13 +1,14 @@
 from controller.RouteController import RouteController
 from core.Util import ConnectionInfo, Vehicle
-from keras.models import load_model
 import numpy as np
-import traci
+from core.sumo_backend import traci
 
 
 class QLearningPolicy(RouteController):
     def __init__(self, connection_info, model_file):
         super().__init__(connection_info)
+        # keras is only imported when a Q-learning policy is created, see controller.registry
+        from keras.models import load_model
         self.model = load_model(model_file)
 
     def make_decisions(self, vehicles, connection_info: ConnectionInfo):
@@ -58,6 +59,12 @@ class QLearningPolicy(RouteController):
 
 
 
+    def edges_of_interest(self, vehicle, hops=2):
+        """
+        The state of the model holds the density of every edge, so every edge of edge_list is of interest.
+        """
+        return self.connection_info.edge_list_indices
+
     # this function reacheds the Neural Network trained before and let it make a decision for the situation now
     def act(self, state):
         act_values = self.model.predict(state)
@@ -82,10 +89,8 @@ class QLearningPolicy(RouteController):
                 state.append(0)
                 # 0 means this action cannot be chosen.
         # put the congestion ratio of all edges into the state.
-        for edge_now in self.connection_info.edge_list:
-            car_num = traci.edge.getLastStepVehicleNumber(edge_now)
-            density = car_num / self.connection_info.edge_length_dict[edge_now]
-            state.append(density)
+        traffic = self.current_traffic()
+        state.extend(traffic.density[self.connection_info.edge_list_indices].tolist())
 
         state = np.reshape(state, [1, len(state)])
         return state
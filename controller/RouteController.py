@@ -2,14 +2,17 @@ from abc import ABC, abstractmethod
 import random
 import os
 import sys
+from collections import defaultdict
+import numpy as np
 from core.Util import *
+from core.route_cache import RouteCache
+from core.traffic_snapshot import TrafficSnapshot
 if 'SUMO_HOME' in os.environ:
     tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
     sys.path.append(tools)
 else:
     sys.exit("No environment variable SUMO_HOME!")
-import traci
-import sumolib
+from core.sumo_backend import traci
 
 STRAIGHT = "s"
 TURN_AROUND = "t"
@@ -43,8 +46,65 @@ class RouteController(ABC):
     def __init__(self, connection_info: ConnectionInfo):
         self.connection_info = connection_info
         self.direction_choices = [STRAIGHT, TURN_AROUND,  SLIGHT_RIGHT, RIGHT, SLIGHT_LEFT, LEFT]
+        self.route_cache = None
+        self.edge_weights = None
+        self.weight_version = 0
+        self.traffic_snapshot = None
+
+    def observe_traffic(self, traffic_snapshot):
+        """
+        Called by the simulation on every step, before make_decisions, with the traffic state of that step.
+        :param traffic_snapshot: TrafficSnapshot of the current step
+        """
+        self.traffic_snapshot = traffic_snapshot
+
+    def current_traffic(self):
+        """
+        :return: the TrafficSnapshot of the current step; when the controller is used without the simulation
+                 passing snapshots, it is queried from TraCI
+        """
+        if self.traffic_snapshot is None:
+            return TrafficSnapshot.from_traci(self.connection_info)
+        return self.traffic_snapshot
+
+    def enable_route_cache(self, max_size=4096):
+        """
+        Opts this controller into caching decision lists by (current edge, destination, weight version).
+        Controllers whose weights change over time publish them with publish_weights before routing.
+        :param max_size: maximum number of cached routes
+        :return: the route cache, which keeps the hit and miss counters
+        """
+        self.route_cache = RouteCache(max_size)
+        return self.route_cache
+
+    def publish_weights(self, weights):
+        """
+        Tells the route cache and the route plans which edge weights the next routes are computed with: the weight
+        version is increased if the weights differ from the last published ones, so routes cached under other
+        weights are no longer returned.
+        :param weights: array of per-edge weights indexed by edge index
+        """
+        weights = np.array(weights, dtype=np.float64)
+        if self.edge_weights is not None and not np.array_equal(weights, self.edge_weights):
+            self.weight_version += 1
+        self.edge_weights = weights
+
+    def cached_decisions(self, vehicle, compute_decisions):
+        """
+        :param vehicle: vehicle to route
+        :param compute_decisions: function of the vehicle computing its decision list, called on a cache miss
+        :return: decision list of the vehicle
+        """
+        if self.route_cache is None:
+            return compute_decisions(vehicle)
+        decision_list = self.route_cache.get(vehicle.current_edge, vehicle.destination, self.weight_version)
+        if decision_list is None:
+            decision_list = compute_decisions(vehicle)
+            self.route_cache.put(vehicle.current_edge, vehicle.destination, self.weight_version, decision_list)
+        return decision_list
 
     def compute_local_target(self, decision_list, vehicle):
+        self.record_route_plan(decision_list, vehicle)
         current_target_edge = vehicle.current_edge
         try:
             path_length = 0
@@ -79,6 +139,104 @@ class RouteController(ABC):
 
         return current_target_edge
 
+    def record_route_plan(self, decision_list, vehicle):
+        """
+        Stores the full edge path of the decisions on the vehicle, with the weights it was computed with, so the
+        simulation can follow it until the vehicle leaves it or the weights drift.
+        """
+        route_plan = [vehicle.current_edge]
+        for choice in decision_list:
+            outgoing_edges = self.connection_info.outgoing_edges_dict.get(route_plan[-1], {})
+            if choice not in outgoing_edges:
+                break
+            route_plan.append(outgoing_edges[choice])
+        vehicle.route_plan = route_plan
+        vehicle.plan_index = 0
+        vehicle.plan_weight_version = self.weight_version
+        vehicle.plan_weights = self.edge_weights
+
+    def make_batch_decisions(self, vehicles, engine, weights=None):
+        """
+        Batch routing mode: groups the vehicles by destination and runs a single reverse search per distinct
+        destination, then reads the path of every vehicle in the group from that shortest-path tree.
+        With the route cache enabled, the weights are published and vehicles with a cached route do not
+        count towards a search.
+        :param vehicles: list of vehicles to make routing decisions for
+        :param engine: DijkstraEngine built on this controller's connection_info
+        :param weights: list of per-edge costs indexed by edge index, defaults to the edge lengths
+        :return: local_targets: {vehicle_id, target_edge}, where target_edge is a local target to send to TRACI
+        """
+        edge_index_dict = self.connection_info.edge_index_dict
+        self.publish_weights(engine.lengths if weights is None else weights)
+        local_targets = {}
+        vehicles_by_destination = defaultdict(list)
+        for vehicle in vehicles:
+            decision_list = None
+            if self.route_cache is not None:
+                decision_list = self.route_cache.get(vehicle.current_edge, vehicle.destination, self.weight_version)
+            if decision_list is None:
+                vehicles_by_destination[vehicle.destination].append(vehicle)
+            else:
+                local_targets[vehicle.vehicle_id] = self.compute_local_target(decision_list, vehicle)
+
+        for destination, destination_vehicles in vehicles_by_destination.items():
+            target = edge_index_dict[destination]
+            _, next_edge, next_arc = engine.reverse_search(target, weights)
+            for vehicle in destination_vehicles:
+                decision_list = engine.tree_directions(edge_index_dict[vehicle.current_edge], target,
+                                                       next_edge, next_arc)
+                if self.route_cache is not None:
+                    self.route_cache.put(vehicle.current_edge, vehicle.destination, self.weight_version,
+                                         decision_list)
+                local_targets[vehicle.vehicle_id] = self.compute_local_target(decision_list, vehicle)
+        return local_targets
+
+    def edges_of_interest(self, vehicle, hops=2):
+        """
+        Region of interest of a vehicle: the edges whose traffic state its next decisions depend on. By default the
+        rest of its route plan (or its current edge and destination without a plan) and every edge within hops
+        outgoing connections of them, which covers the detours branching off the plan. Controllers that read the
+        traffic state elsewhere override this, e.g. with every edge of edge_list when they read the whole network.
+        :param vehicle: controlled vehicle, called after it moves to a new edge and again after it is routed
+        :param hops: width of the corridor around the route plan, in connections
+        :return: int array of edge indices
+        """
+        edge_index_dict = self.connection_info.edge_index_dict
+        route = vehicle.route_plan
+        if vehicle.current_edge in route[vehicle.plan_index:]:
+            route = route[route.index(vehicle.current_edge, vehicle.plan_index):]
+        else:
+            route = [vehicle.current_edge, vehicle.destination]
+        region = np.array([edge_index_dict[edge] for edge in route if edge in edge_index_dict], dtype=np.int32)
+        frontier = region
+        out_indptr, out_indices = self.connection_info.out_indptr, self.connection_info.out_indices
+        for _ in range(hops):
+            if frontier.size == 0:
+                break
+            frontier = np.concatenate([out_indices[out_indptr[edge]:out_indptr[edge + 1]] for edge in frontier])
+            frontier = np.setdiff1d(frontier, region)
+            region = np.union1d(region, frontier)
+        return region
+
+    def on_depart(self, vehicle):
+        """
+        Called by the simulation when a controlled vehicle enters the network, before its first decision.
+        """
+        pass
+
+    def on_edge_change(self, vehicle, previous_edge):
+        """
+        Called by the simulation when a controlled vehicle moves to a new edge, after vehicle.current_edge and
+        vehicle.current_speed are updated and before it is routed from that edge.
+        :param previous_edge: the edge the vehicle was on before, empty for its first edge
+        """
+        pass
+
+    def on_arrive(self, vehicle):
+        """
+        Called by the simulation when a controlled vehicle leaves the network.
+        """
+        pass
 
     @abstractmethod
     def make_decisions(self, vehicles, connection_info):
@@ -0,0 +1,54 @@
+"""
+    This file contains the registry of routing policies. A policy is
+    registered by name with the module and class that implement it, and its
+    module is only imported when a policy of that name is loaded, so a
+    script pays for the imports (e.g. keras for QLearningPolicy) of the
+    policies it runs and no others.
+"""
+
+import importlib
+
+# {name: (module, class)} of the policies shipped with the testbed
+CONTROLLERS = {
+    "random": ("controller.RouteController", "RandomPolicy"),
+    "dijkstra": ("controller.DijkstraController", "DijkstraPolicy"),
+    "density_dijkstra": ("controller.DensityDijkstraController", "DensityDijkstraPolicy"),
+    "floyd_warshall": ("controller.FloydWarshallController", "FloydWarshallPolicy"),
+    "heuristic": ("controller.HeuristicController", "HeuristicPolicy"),
+    "contraction_hierarchy": ("controller.ContractionHierarchyController", "ContractionHierarchyPolicy"),
+    "qlearning": ("controller.QLearningController", "QLearningPolicy"),
+}
+
+
+def register_controller(name, module_name, class_name):
+    """
+    Registers a policy so it can be loaded by name; an existing name is replaced.
+    :param module_name: module implementing the policy, e.g. "controller.DijkstraController"
+    :param class_name: RouteController subclass in that module, e.g. "DijkstraPolicy"
+    """
+    CONTROLLERS[name] = (module_name, class_name)
+
+
+def controller_names():
+    return sorted(CONTROLLERS)
+
+
+def load_controller(name):
+    """
+    Imports the module of a registered policy.
+    :return: the policy class
+    """
+    if name not in CONTROLLERS:
+        raise ValueError("Unknown controller: {} (available: {})".format(name, ", ".join(controller_names())))
+    module_name, class_name = CONTROLLERS[name]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def create_controller(name, connection_info, *args, **kwargs):
+    """
+    :param name: registered name of the policy, e.g. "dijkstra"
+    :param connection_info: object containing network information
+    :return: a policy of the class registered under name, created with the connection info and the other
+             arguments of its constructor
+    """
+    return load_controller(name)(connection_info, *args, **kwargs)
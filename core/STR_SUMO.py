@@ -1,9 +1,13 @@
 import os
 import sys
+import copy
+import queue
 import optparse
+from concurrent.futures import ThreadPoolExecutor
 from xml.dom.minidom import parse, parseString
 from core.Util import *
-from core.target_vehicles_generation_protocols import *
+from core.edge_statistics import EdgeStatisticsCollector
+from core.traffic_snapshot import TrafficSnapshot, edge_length_array
 
 if 'SUMO_HOME' in os.environ:
     tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
@@ -11,8 +15,9 @@ if 'SUMO_HOME' in os.environ:
 else:
     sys.exit("No environment variable SUMO_HOME!")
 
-import traci
-import sumolib
+from core.sumo_backend import traci
+# loads traci and sumolib also with the libsumo backend, which imports both itself, see import_time_report.py
+import traci.constants as tc
 from controller.RouteController import *
 
 """
@@ -30,17 +35,75 @@ SLIGHT_LEFT = "L"
 SLIGHT_RIGHT = "R"
 
 
+# subscribed values of the controlled vehicles; the allowed speed (the speed limit of the lane times the speed factor
+# of the vehicle) bounds how soon a vehicle can reach the end of its edge when steps are skipped
+VEHICLE_VARIABLES = [tc.VAR_ROAD_ID, tc.VAR_SPEED, tc.VAR_LANEPOSITION, tc.VAR_ALLOWED_SPEED]
+
+
 class StrSumo:
-    def __init__(self, route_controller, connection_info, controlled_vehicles):
+    def __init__(self, route_controller, connection_info, controlled_vehicles, replan_threshold=None,
+                 pipeline=False, max_staleness=1, dispatch="target", max_reroutes_per_step=None,
+                 adaptive_stepping=False, decision_interval=1, region_hops=None, region_expiry=10):
         """
         :param route_controller: object that implements the scheduling algorithm for controlled vehicles
         :param connection_info: object that includes the map information
         :param controlled_vehicles: a dictionary that includes the vehicles under control
+        :param replan_threshold: if set, vehicles follow the route plan of their last routing decision and are only
+                                 sent to the route controller again when they leave it, or when the cost of the
+                                 rest of the plan under the latest published weights differs from its planned
+                                 cost by more than this fraction; if None, every edge change is a new decision
+        :param pipeline: if True, the decisions of a step are computed on a worker thread from the traffic snapshot
+                         of that step while SUMO runs the next steps, and applied when they are ready. Vehicles that
+                         could reach the end of their edge before that are decided on the spot. The route controller
+                         must only read the traffic snapshot, not call TraCI, and its on_depart, on_edge_change and
+                         on_arrive callbacks are delivered on the thread that runs make_decisions.
+        :param max_staleness: in pipelined mode, the number of steps after which the decisions of a step are
+                              waited for if they are not ready yet
+        :param dispatch: "target" sends the local target of every decision with changeTarget, and SUMO routes the
+                         vehicle to it; "route" sends the whole route plan of the decision with setRoute, only when
+                         it differs from the route the vehicle already holds. Decisions without a route plan to the
+                         destination are still sent as local targets.
+        :param max_reroutes_per_step: in "route" dispatch, the maximum number of setRoute commands per step; the
+                                      other vehicles keep their current route and are sent theirs on the next steps
+        :param adaptive_stepping: if True, the simulation advances several steps at once while no controlled
+                                  vehicle can depart, arrive or reach the end of its edge, and stops as soon as
+                                  every controlled vehicle has arrived
+        :param decision_interval: the route controller is called every decision_interval steps with all the
+                                  vehicles that changed edge since its last call. With "target" dispatch a
+                                  vehicle can reach its local target before it is decided, so longer intervals
+                                  are meant for "route" dispatch
+        :param region_hops: if set, only the edges in the regions of interest of the controlled vehicles are
+                            queried, see RouteController.edges_of_interest with this many hops; the other edges
+                            read as empty in the traffic snapshot. None queries every edge.
+        :param region_expiry: number of simulation steps an edge stays queried after it left every region of interest,
+                              including the steps skipped with adaptive_stepping
         """
         self.direction_choices = [STRAIGHT, TURN_AROUND, SLIGHT_RIGHT, RIGHT, SLIGHT_LEFT, LEFT]
         self.connection_info = connection_info
         self.route_controller = route_controller
         self.controlled_vehicles = controlled_vehicles  # dictionary of Vehicles by id
+        self.replan_threshold = replan_threshold
+        self.region_hops = region_hops
+        self.edge_statistics = EdgeStatisticsCollector(connection_info,
+                                                       None if region_hops is None else region_expiry)
+        self.vehicle_regions = {}  # region of interest of every controlled vehicle in the simulation, by id
+        self.edge_lengths = edge_length_array(connection_info)
+        self.pipeline = pipeline
+        self.max_staleness = max_staleness
+        self.executor = None
+        self.pending_decisions = []  # (step, vehicle copies, future) of the decisions computed on the worker
+        self.controller_events = queue.SimpleQueue()  # callbacks waiting for the worker, in pipelined mode
+        self.step_length = 1.0
+        if dispatch not in ("target", "route"):
+            raise ValueError("Unknown dispatch mode: {}".format(dispatch))
+        self.dispatch = dispatch
+        self.max_reroutes_per_step = max_reroutes_per_step
+        self.routes_to_send = {}  # vehicle ids waiting for their route plan to be sent, in order
+        self.route_commands = 0  # number of changeTarget and setRoute commands sent
+        self.adaptive_stepping = adaptive_stepping
+        self.decision_interval = decision_interval
+        self.waiting_vehicles = {}  # vehicles that changed edge, waiting for the next decision step, by id
+        self.skipped_steps = 0  # number of steps advanced without running the loop body, in adaptive stepping
         # print(self.controlled_vehicles)
 
     def run(self):
@@ -48,6 +111,7 @@ class StrSumo:
         Runs the SUMO simulation
         At each time-step, cars that have moved edges make a decision based on user-supplied scheduler algorithm
         Decisions are enforced in SUMO by setting the destination of the vehicle to the result of the
+        With TraCI call tracing enabled on the SUMO handle, the call summary is written at the end.
         :returns: total time, number of cars that reached their destination, number of deadlines missed
         """
         total_time = 0
@@ -56,66 +120,104 @@ class StrSumo:
 
         step = 0
         vehicles_to_direct = []  # the batch of controlled vehicles passed to make_decisions()
-        vehicle_IDs_in_simulation = []
+        active_vehicles = set()  # controlled vehicles currently in the simulation
+        released_vehicles = set()  # controlled vehicles that have departed
 
+        if self.pipeline:
+            self.executor = ThreadPoolExecutor(max_workers=1)
         try:
+            self.edge_statistics.subscribe()
+            self.step_length = traci.simulation.getDeltaT()
+            traci.simulation.subscribe([tc.VAR_TIME, tc.VAR_DEPARTED_VEHICLES_IDS, tc.VAR_ARRIVED_VEHICLES_IDS])
+            simulation_time = traci.simulation.getTime()
+            # vehicles already in the simulation are handled as if they just departed
+            departed = traci.vehicle.getIDList()
+            arrived_at_destination = []
             while traci.simulation.getMinExpectedNumber() > 0:
-                vehicle_ids = set(traci.vehicle.getIDList())
-
-                # store edge vehicle counts in connection_info.edge_vehicle_count
-                self.get_edge_vehicle_counts()
-                # initialize vehicles to be directed
-                vehicles_to_direct = []
-                # iterate through vehicles currently in simulation
-                for vehicle_id in vehicle_ids:
-
-                    # should not be added because there is no corresponding -1, this makes edge_vehicle_count becomes the total number of vehicles that used to be on this edge.
-                    # self.connection_info.edge_vehicle_count[traci.vehicle.getRoadID(vehicle_id)] += 1
-
-                    # handle newly arrived controlled vehicles
-                    if vehicle_id not in vehicle_IDs_in_simulation and vehicle_id in self.controlled_vehicles:
-                        vehicle_IDs_in_simulation.append(vehicle_id)
+                # handle newly departed controlled vehicles, and forget the ones that arrived
+                for vehicle_id in departed:
+                    if vehicle_id in self.controlled_vehicles and vehicle_id not in active_vehicles:
+                        active_vehicles.add(vehicle_id)
+                        released_vehicles.add(vehicle_id)
+                        traci.vehicle.subscribe(vehicle_id, VEHICLE_VARIABLES)
                         traci.vehicle.setColor(vehicle_id,
                                                (255, 0, 0))  # set color so we can visually track controlled vehicles
                         self.controlled_vehicles[vehicle_id].start_time = float(
                             step)  # Use the detected release time as start time
+                        self.notify_controller("on_depart", self.controlled_vehicles[vehicle_id])
+                active_vehicles.difference_update(arrived_at_destination)
+                vehicle_states = traci.vehicle.getAllSubscriptionResults()
 
-                    if vehicle_id in self.controlled_vehicles.keys():
-                        current_edge = traci.vehicle.getRoadID(vehicle_id)
+                # initialize vehicles to be directed
+                vehicles_to_direct = []
+                moved_vehicles = []  # vehicles that changed edge on this step
+                # iterate through controlled vehicles currently in simulation
+                for vehicle_id in active_vehicles:
+                    vehicle_state = vehicle_states.get(vehicle_id)
+                    if not vehicle_state:
+                        continue
+                    current_edge = vehicle_state[tc.VAR_ROAD_ID]
 
-                        if current_edge not in self.connection_info.edge_index_dict.keys():
-                            continue
-                        elif current_edge == self.controlled_vehicles[vehicle_id].destination:
-                            continue
+                    if current_edge not in self.connection_info.edge_index_dict.keys():
+                        continue
+                    elif current_edge == self.controlled_vehicles[vehicle_id].destination:
+                        continue
 
-                        # print("{} now on: {}, records on {}; {} ".format(vehicle_id, current_edge, self.controlled_vehicles[vehicle_id].current_edge, current_edge!=self.controlled_vehicles[vehicle_id].current_edge))
-                        if current_edge != self.controlled_vehicles[vehicle_id].current_edge:
-                            self.controlled_vehicles[vehicle_id].current_edge = current_edge
-                            self.controlled_vehicles[vehicle_id].current_speed = traci.vehicle.getSpeed(vehicle_id)
-                            vehicles_to_direct.append(self.controlled_vehicles[vehicle_id])
+                    if current_edge != self.controlled_vehicles[vehicle_id].current_edge:
+                        previous_edge = self.controlled_vehicles[vehicle_id].current_edge
+                        self.controlled_vehicles[vehicle_id].current_edge = current_edge
+                        self.controlled_vehicles[vehicle_id].current_speed = vehicle_state[tc.VAR_SPEED]
+                        self.notify_controller("on_edge_change", self.controlled_vehicles[vehicle_id], previous_edge)
+                        moved_vehicles.append(self.controlled_vehicles[vehicle_id])
+                        if self.replan_threshold is not None and \
+                                self.follow_route_plan(self.controlled_vehicles[vehicle_id]):
+                            continue
+                        vehicles_to_direct.append(self.controlled_vehicles[vehicle_id])
+                if self.region_hops is not None:
+                    # the edges the vehicles that moved depend on are subscribed before the statistics are read, so
+                    # their first decisions on the new edges see the traffic state of these edges
+                    self.request_regions(moved_vehicles, active_vehicles, step)
+                # store edge statistics, including connection_info.edge_vehicle_count
+                self.get_edge_vehicle_counts(step)
+                # the traffic state of this step, read by the route controller instead of querying every edge
+                traffic_snapshot = TrafficSnapshot.from_statistics(simulation_time, self.edge_statistics,
+                                                                   self.edge_lengths)
+                if self.decision_interval > 1:
+                    vehicles_to_direct = self.next_decision_batch(vehicles_to_direct, active_vehicles, step)
                 # print(len(vehicles_to_direct))
-                vehicle_decisions_by_id = self.route_controller.make_decisions(vehicles_to_direct, self.connection_info)
-                for vehicle_id, local_target_edge in vehicle_decisions_by_id.items():
-                    # if decision not in self.connection_info.outgoing_edges_dict[self.controlled_vehicles[vehicle_id].current_edge]:
-                    #     raise ValueError(f'{decision} does not lead to a valid edge from edge '
-                    #                      f'{self.controlled_vehicles[vehicle_id].current_edge}')
-                    #
-                    # current_edge_of_vehicle = self.controlled_vehicles[vehicle_id].current_edge
-                    # target_edge = self.connection_info.outgoing_edges_dict[current_edge_of_vehicle][decision]
-                    if vehicle_id in traci.vehicle.getIDList():
-                        # print("Changing the target of {} to {} with length {}".format(vehicle_id, local_target_edge, self.connection_info.edge_length_dict[local_target_edge]))
-                        traci.vehicle.changeTarget(vehicle_id, local_target_edge)
-                        self.controlled_vehicles[vehicle_id].local_destination = local_target_edge
-
-                arrived_at_destination = traci.simulation.getArrivedIDList()
+                if self.pipeline:
+                    vehicle_decisions_by_id = self.pipelined_decisions(vehicles_to_direct, vehicle_states,
+                                                                       traffic_snapshot, step)
+                else:
+                    vehicle_decisions_by_id = self.decide(vehicles_to_direct, traffic_snapshot)
+                if self.dispatch == "route":
+                    self.dispatch_routes(vehicle_decisions_by_id, active_vehicles)
+                else:
+                    for vehicle_id, local_target_edge in vehicle_decisions_by_id.items():
+                        # if decision not in self.connection_info.outgoing_edges_dict[self.controlled_vehicles[vehicle_id].current_edge]:
+                        #     raise ValueError(f'{decision} does not lead to a valid edge from edge '
+                        #                      f'{self.controlled_vehicles[vehicle_id].current_edge}')
+                        #
+                        # current_edge_of_vehicle = self.controlled_vehicles[vehicle_id].current_edge
+                        # target_edge = self.connection_info.outgoing_edges_dict[current_edge_of_vehicle][decision]
+                        if vehicle_id in active_vehicles:
+                            # print("Changing the target of {} to {} with length {}".format(vehicle_id, local_target_edge, self.connection_info.edge_length_dict[local_target_edge]))
+                            traci.vehicle.changeTarget(vehicle_id, local_target_edge)
+                            self.route_commands += 1
+                            self.controlled_vehicles[vehicle_id].local_destination = local_target_edge
+                if self.region_hops is not None:
+                    # the regions follow the route plans of the decisions of this step from the next step
+                    self.request_regions([self.controlled_vehicles[vehicle_id] for vehicle_id in vehicle_decisions_by_id
+                                          if vehicle_id in active_vehicles], active_vehicles, step)
 
                 for vehicle_id in arrived_at_destination:
                     if vehicle_id in self.controlled_vehicles:
+                        self.notify_controller("on_arrive", self.controlled_vehicles[vehicle_id])
                         # print the raw result out to the terminal
-                        arrived_at_destination = False
+                        reached_destination = False
                         if self.controlled_vehicles[vehicle_id].local_destination == self.controlled_vehicles[
                             vehicle_id].destination:
-                            arrived_at_destination = True
+                            reached_destination = True
                         time_span = step - self.controlled_vehicles[vehicle_id].start_time
                         total_time += time_span
                         miss = False
@@ -124,12 +226,27 @@ class StrSumo:
                             miss = True
                         end_number += 1
                         print("Vehicle {} reaches the destination: {}, timespan: {}, deadline missed: {}" \
-                              .format(vehicle_id, arrived_at_destination, time_span, miss))
+                              .format(vehicle_id, reached_destination, time_span, miss))
                         # if not arrived_at_destination:
                         # print("{} - {}".format(self.controlled_vehicles[vehicle_id].local_destination, self.controlled_vehicles[vehicle_id].destination))
 
-                traci.simulationStep()
-                step += 1
+                if self.adaptive_stepping and end_number == len(self.controlled_vehicles):
+                    print('All controlled vehicles arrived.')
+                    break
+                steps = 1
+                if self.adaptive_stepping:
+                    steps = self.steps_to_skip(step, simulation_time, active_vehicles, released_vehicles,
+                                               vehicle_states)
+                if steps > 1:
+                    traci.simulationStep(simulation_time + steps * self.step_length)
+                    self.skipped_steps += steps - 1
+                else:
+                    traci.simulationStep()
+                step += steps
+                simulation_events = traci.simulation.getSubscriptionResults()
+                simulation_time = simulation_events.get(tc.VAR_TIME, simulation_time)
+                departed = simulation_events.get(tc.VAR_DEPARTED_VEHICLES_IDS, ())
+                arrived_at_destination = simulation_events.get(tc.VAR_ARRIVED_VEHICLES_IDS, ())
 
                 if step > MAX_SIMULATION_STEPS:
                     print('Ending due to timeout.')
@@ -138,11 +255,279 @@ class StrSumo:
         except ValueError as err:
             print('Exception caught.')
             print(err)
+        finally:
+            self.stop_pipeline()
+
+        if traci.tracer is not None:
+            traci.tracer.write_summary()
 
         num_deadlines_missed = len(deadlines_missed)
 
         return total_time, end_number, num_deadlines_missed
 
-    def get_edge_vehicle_counts(self):
-        for edge in self.connection_info.edge_list:
-            self.connection_info.edge_vehicle_count[edge] = traci.edge.getLastStepVehicleNumber(edge)
+    def notify_controller(self, callback, *args):
+        """
+        Calls a lifecycle callback of the route controller, or queues it for the worker in pipelined mode so the
+        controller is only ever used by one thread at a time.
+        """
+        if self.pipeline:
+            self.controller_events.put((callback, args))
+        else:
+            getattr(self.route_controller, callback)(*args)
+
+    def deliver_controller_events(self):
+        """
+        Calls the queued lifecycle callbacks of the route controller, in order.
+        """
+        while True:
+            try:
+                callback, args = self.controller_events.get_nowait()
+            except queue.Empty:
+                return
+            getattr(self.route_controller, callback)(*args)
+
+    def decide(self, vehicles, traffic_snapshot):
+        """
+        Delivers the queued callbacks and the traffic snapshot to the route controller and runs make_decisions.
+        :return: {vehicle_id: local target edge}
+        """
+        self.deliver_controller_events()
+        self.route_controller.observe_traffic(traffic_snapshot)
+        return self.route_controller.make_decisions(vehicles, self.connection_info)
+
+    def pipelined_decisions(self, vehicles, vehicle_states, traffic_snapshot, step):
+        """
+        Pipelined mode: collects the decisions of earlier steps that are ready or due, decides the vehicles that
+        could reach the end of their edge before a pipelined decision lands right away, and hands the other
+        vehicles to the worker.
+        :return: {vehicle_id: local target edge} of the decisions to apply on this step
+        """
+        urgent, deferred = [], []
+        for vehicle in vehicles:
+            if self.reaches_junction_soon(vehicle, vehicle_states[vehicle.vehicle_id]):
+                urgent.append(vehicle)
+            else:
+                deferred.append(vehicle)
+
+        # the controller can only be used on this thread once the worker is done with it
+        decisions = self.collect_decisions(step, wait=bool(urgent))
+        if urgent:
+            decisions.update(self.decide(urgent, traffic_snapshot))
+        if deferred:
+            # the worker gets copies, the vehicles keep moving on this thread
+            vehicle_copies = [copy.copy(vehicle) for vehicle in deferred]
+            future = self.executor.submit(self.decide, vehicle_copies, traffic_snapshot)
+            self.pending_decisions.append((step, vehicle_copies, future))
+        return decisions
+
+    def collect_decisions(self, step, wait=False):
+        """
+        Takes the results of the pipelined decisions that are ready, or older than max_staleness steps. A decision
+        is dropped if its vehicle has moved to another edge since, that edge is decided separately.
+        :param wait: if True, waits for all pending decisions
+        :return: {vehicle_id: local target edge}
+        """
+        decisions = {}
+        pending = []
+        for submitted, vehicle_copies, future in self.pending_decisions:
+            if not (wait or future.done() or step - submitted >= self.max_staleness):
+                pending.append((submitted, vehicle_copies, future))
+                continue
+            local_targets = future.result()
+            for vehicle_copy in vehicle_copies:
+                vehicle = self.controlled_vehicles[vehicle_copy.vehicle_id]
+                if vehicle_copy.vehicle_id not in local_targets or vehicle.current_edge != vehicle_copy.current_edge:
+                    continue
+                decisions[vehicle.vehicle_id] = local_targets[vehicle.vehicle_id]
+                vehicle.route_plan = vehicle_copy.route_plan
+                vehicle.plan_index = vehicle_copy.plan_index
+                vehicle.plan_weight_version = vehicle_copy.plan_weight_version
+                vehicle.plan_weights = vehicle_copy.plan_weights
+        self.pending_decisions = pending
+        return decisions
+
+    def reaches_junction_soon(self, vehicle, vehicle_state):
+        """
+        :return: True if the vehicle could reach the end of its edge before a pipelined decision is applied, i.e.
+                 within max_staleness steps and one more step of margin at the maximum speed of the edge
+        """
+        remaining = self.connection_info.edge_length_dict[vehicle.current_edge] - vehicle_state[tc.VAR_LANEPOSITION]
+        speed = max(vehicle_state[tc.VAR_SPEED], self.connection_info.edge_max_speed_dict[vehicle.current_edge])
+        return remaining <= speed * (self.max_staleness + 1) * self.step_length
+
+    def stop_pipeline(self):
+        """
+        Waits for the worker, drops the decisions that were not applied and delivers the queued callbacks.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        self.pending_decisions = []
+        self.deliver_controller_events()
+
+    def next_decision_batch(self, vehicles, active_vehicles, step):
+        """
+        Holds the vehicles that changed edge until the next decision step.
+        :return: the vehicles to pass to the route controller on this step
+        """
+        for vehicle in vehicles:
+            self.waiting_vehicles[vehicle.vehicle_id] = vehicle
+        if step % self.decision_interval != 0:
+            return []
+        vehicles = [vehicle for vehicle_id, vehicle in self.waiting_vehicles.items()
+                    if vehicle_id in active_vehicles and vehicle.current_edge != vehicle.destination]
+        self.waiting_vehicles = {}
+        return vehicles
+
+    def steps_to_skip(self, step, simulation_time, active_vehicles, released_vehicles, vehicle_states):
+        """
+        Adaptive stepping: the number of steps the simulation can advance at once without a controlled vehicle
+        departing, arriving, or reaching the end of its edge before the last of them, so no departure, arrival or
+        edge change of a controlled vehicle is missed.
+        :return: the number of steps to advance, at least 1
+        """
+        if self.pending_decisions or self.waiting_vehicles or self.routes_to_send:
+            return 1
+        steps = MAX_SIMULATION_STEPS - step
+        # the release of a controlled vehicle happens on a normal step
+        for vehicle_id, vehicle in self.controlled_vehicles.items():
+            if vehicle_id not in released_vehicles:
+                steps = min(steps, int((vehicle.start_time - simulation_time) / self.step_length) - 1)
+        for vehicle_id in active_vehicles:
+            if steps <= 1:
+                break
+            vehicle_state = vehicle_states.get(vehicle_id)
+            if not vehicle_state or vehicle_state[tc.VAR_ROAD_ID] not in self.connection_info.edge_index_dict:
+                return 1
+            edge = vehicle_state[tc.VAR_ROAD_ID]
+            remaining = self.connection_info.edge_length_dict[edge] - vehicle_state[tc.VAR_LANEPOSITION]
+            speed = max(vehicle_state[tc.VAR_SPEED], vehicle_state[tc.VAR_ALLOWED_SPEED])
+            steps = min(steps, int(remaining / (speed * self.step_length)) - 1)
+        return max(steps, 1)
+
+    def follow_route_plan(self, vehicle):
+        """
+        Advances the vehicle along its route plan and sends it the next local target from the plan.
+        :return: False if the vehicle left its plan or the plan drifted, and it has to be routed again
+        """
+        route_plan = vehicle.route_plan
+        try:
+            plan_index = route_plan.index(vehicle.current_edge, vehicle.plan_index)
+        except ValueError:
+            return False
+        vehicle.plan_index = plan_index
+        if self.route_plan_drifted(vehicle):
+            return False
+
+        # the same lookahead as RouteController.compute_local_target
+        path_length = 0
+        local_target = vehicle.current_edge
+        for edge in route_plan[plan_index + 1:]:
+            if path_length > max(vehicle.current_speed, 20) or local_target == vehicle.destination:
+                break
+            local_target = edge
+            path_length += self.connection_info.edge_length_dict[edge]
+        if self.dispatch == "route" and self.planned_route(vehicle) is not None:
+            # the route plan is sent whole by dispatch_routes, if the vehicle does not hold it already
+            self.routes_to_send[vehicle.vehicle_id] = True
+        elif local_target != vehicle.local_destination:
+            traci.vehicle.changeTarget(vehicle.vehicle_id, local_target)
+            self.route_commands += 1
+            vehicle.local_destination = local_target
+        return True
+
+    def dispatch_routes(self, local_targets, active_vehicles):
+        """
+        "route" dispatch: sends the rest of the route plan of every decided vehicle, and of the vehicles left over
+        from earlier steps, with setRoute if it differs from the route the vehicle holds, up to
+        max_reroutes_per_step commands. A vehicle whose plan does not reach its destination gets its local target.
+        :param local_targets: {vehicle_id: local target edge} of the decisions of this step
+        """
+        for vehicle_id in local_targets:
+            self.routes_to_send[vehicle_id] = True
+        budget = self.max_reroutes_per_step
+        routes_to_send = {}
+        for vehicle_id in self.routes_to_send:
+            if vehicle_id not in active_vehicles:
+                continue
+            vehicle = self.controlled_vehicles[vehicle_id]
+            route = self.planned_route(vehicle)
+            if route is None:
+                if vehicle_id in local_targets:
+                    traci.vehicle.changeTarget(vehicle_id, local_targets[vehicle_id])
+                    self.route_commands += 1
+                    vehicle.local_destination = local_targets[vehicle_id]
+                continue
+            if self.holds_route(vehicle, route):
+                continue
+            if budget is not None and budget <= 0:
+                routes_to_send[vehicle_id] = True
+                continue
+            traci.vehicle.setRoute(vehicle_id, route)
+            self.route_commands += 1
+            if budget is not None:
+                budget -= 1
+            vehicle.dispatched_route = route
+            vehicle.local_destination = route[-1]
+        self.routes_to_send = routes_to_send
+
+    def planned_route(self, vehicle):
+        """
+        :return: the rest of the route plan of the vehicle from its current edge, or None if the vehicle is not on
+                 its plan or the plan does not reach its destination
+        """
+        route_plan = vehicle.route_plan
+        if not route_plan or route_plan[-1] != vehicle.destination:
+            return None
+        try:
+            plan_index = route_plan.index(vehicle.current_edge, vehicle.plan_index)
+        except ValueError:
+            return None
+        return route_plan[plan_index:]
+
+    @staticmethod
+    def holds_route(vehicle, route):
+        """
+        :return: True if the rest of the route last sent to the vehicle is the given route
+        """
+        dispatched_route = vehicle.dispatched_route
+        if route[0] not in dispatched_route:
+            return False
+        return dispatched_route[dispatched_route.index(route[0]):] == route
+
+    def route_plan_drifted(self, vehicle):
+        """
+        :return: True if the cost of the rest of the route plan under the latest published weights differs from
+                 its cost when it was planned by more than replan_threshold
+        """
+        weights = self.route_controller.edge_weights
+        if vehicle.plan_weight_version == self.route_controller.weight_version or \
+                weights is None or vehicle.plan_weights is None:
+            return False
+        remaining = [self.connection_info.edge_index_dict[edge] for edge in vehicle.route_plan[vehicle.plan_index + 1:]]
+        planned_cost = vehicle.plan_weights[remaining].sum()
+        current_cost = weights[remaining].sum()
+        return abs(current_cost - planned_cost) > self.replan_threshold * planned_cost
+
+    def request_regions(self, moved_vehicles, active_vehicles, step):
+        """
+        Updates the regions of interest of the given vehicles, forgets the ones of vehicles that left, and requests
+        the union from the edge statistics collector. Called with the vehicles that changed edge before the edge
+        statistics are read, and with the vehicles that were routed after their decisions.
+        :param step: current simulation step
+        """
+        for vehicle in moved_vehicles:
+            self.vehicle_regions[vehicle.vehicle_id] = self.route_controller.edges_of_interest(vehicle,
+                                                                                               self.region_hops)
+        for vehicle_id in [vehicle_id for vehicle_id in self.vehicle_regions if vehicle_id not in active_vehicles]:
+            del self.vehicle_regions[vehicle_id]
+        for region in self.vehicle_regions.values():
+            self.edge_statistics.request(region, step)
+
+    def get_edge_vehicle_counts(self, step):
+        """
+        Updates the edge statistics of the last step, including connection_info.edge_vehicle_count, from the edge
+        subscriptions.
+        :param step: current simulation step, which the regions of interest expire against
+        """
+        self.edge_statistics.update(step)
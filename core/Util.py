@@ -5,8 +5,21 @@ if 'SUMO_HOME' in os.environ:
     sys.path.append(tools)
 else:
     sys.exit("No environment variable SUMO_HOME!")
-from sumolib import net
-import sumolib
+import numpy as np
+from core.network_cache import file_hash, load_cache, save_cache
+from core import net_reader
+
+# Space taken by one vehicle in a jam (vehicle length and gap), used to estimate the capacity of an edge.
+JAM_SPACING = 7.5
+
+# Directions defined by SUMO, in the same order as RouteController.direction_choices.
+# The position of a direction in this list is its integer code in the array-backed graph.
+DIRECTION_LIST = ["s", "t", "R", "r", "L", "l"]
+
+# Arrays of the array-backed graph that are stored in the network cache and used as they are on a cache hit.
+GRAPH_ARRAYS = ["edge_lengths", "passenger_mask", "roundabout_mask", "edge_list_indices", "edge_lane_counts",
+                "edge_max_speeds", "edge_free_flow_times", "edge_capacities", "out_indptr", "out_indices",
+                "out_directions", "in_indptr", "in_indices", "in_directions", "in_arcs"]
 
 class Vehicle:
     def __init__(self, vehicle_id, destination, start_time, deadline):
@@ -24,6 +37,14 @@ class Vehicle:
         self.current_edge = ""
         self.current_speed = 0.0
         self.local_destination = ""
+        # route plan: the full edge path of the last routing decision, the position of the vehicle on it, and the
+        # weight version (and weights) it was computed with
+        self.route_plan = []
+        self.plan_index = 0
+        self.plan_weight_version = None
+        self.plan_weights = None
+        # the full route last sent to SUMO with setRoute, when routes are dispatched whole
+        self.dispatched_route = []
 
 
 class ConnectionInfo:
@@ -36,16 +57,64 @@ class ConnectionInfo:
         - edge_index_dict {edge_index_dict} keep track of edge ids by an index
         - edge_vehicle_count {edge_id: number of vehicles at edge}
         - edge_list [edge_id]
+        - edge_lane_count_dict {edge_id: number of lanes}
+        - edge_max_speed_dict {edge_id: highest maximum speed of its lanes}
+        - roundabout_edges [edge_id] the edges that are part of a roundabout, in edge index order
+    Array-backed view of the same graph, indexed by edge_index_dict:
+        - edge_ids [edge_id] the edge id of every edge index
+        - edge_lengths float32 array of edge lengths
+        - passenger_mask bool array, True if the edge allows passenger vehicles
+        - roundabout_mask bool array, True if the edge is part of a roundabout
+        - edge_list_indices int array of the edge indices of edge_list, in the same order
+        - edge_lane_counts int array, number of lanes of the edge
+        - edge_max_speeds float array, highest maximum speed of the lanes of the edge
+        - edge_free_flow_times float array, edge length divided by its maximum speed
+        - edge_capacities float array, number of vehicles the edge holds at jam density
+        - out_indptr, out_indices, out_directions CSR arrays of outgoing edges; the outgoing edges of
+          edge i are out_indices[out_indptr[i]:out_indptr[i+1]], reached with direction code out_directions[...]
+        - in_indptr, in_indices, in_directions CSR arrays of incoming edges, in the same layout;
+          in_arcs gives the position of every incoming arc in the outgoing arrays
+        - direction_list [direction] maps a direction code back to its SUMO direction
+        - direction_table {(from_index, to_index): direction} the direction from an edge to one of its
+          outgoing edges (the first one in outgoing_edges_dict if several directions lead there)
     :param net_file: file name of a SUMO network file, e.g. 'test.net.xml'
+    :param cache_file: binary cache of the parsed network, defaults to <net file>.netcache; it is only used if it
+                       was written for the same file contents, see core.network_cache. An empty string disables
+                       the cache.
+    :param net: the network already read from net_file (sumolib.net.Net or net_reader.StreamedNet); if not given and
+                there is no cache, net_file is read with the streaming reader of core.net_reader
     """
-    def __init__(self, net_file):
+    def __init__(self, net_file, cache_file=None, net=None):
         self.net_filename = net_file
-        net = sumolib.net.readNet(net_file)
+        if cache_file is None:
+            cache_file = net_file + ".netcache"
+        # the hash is only needed to check or write the cache
+        content_hash = file_hash(net_file) if cache_file else None
+        cached = None
+        if cache_file and net is None:
+            cached = load_cache(cache_file, content_hash, ("edge_ids", "direction_list"))
+        if cached is not None:
+            self.load_network(cached)
+            return
+
+        self.read_network(net if net is not None else net_reader.read_net(net_file))
+        self.build_graph_arrays()
+        if cache_file:
+            save_cache(cache_file, content_hash, self.cache_arrays(), {"edge_ids": self.edge_ids,
+                                                                       "direction_list": self.direction_list})
+
+    def read_network(self, net):
+        """
+        Collects the edge information of a network (sumolib.net.Net or net_reader.StreamedNet) into the
+        dictionaries.
+        """
         self.outgoing_edges_dict = {}
         self.edge_length_dict = {}
         self.edge_index_dict = {}
         self.edge_vehicle_count = {}
         self.edge_list = []
+        self.edge_lane_count_dict = {}
+        self.edge_max_speed_dict = {}
 
         edge_index = 0
 
@@ -73,6 +142,10 @@ class ConnectionInfo:
                 print(current_edge_id + "already exists!")
             else:
                 self.edge_length_dict[current_edge_id] = current_edge.getLength()
+            lanes = current_edge.getLanes()
+            self.edge_lane_count_dict[current_edge_id] = len(lanes)
+            self.edge_max_speed_dict[current_edge_id] = max((lane.getSpeed() for lane in lanes),
+                                                            default=current_edge.getSpeed())
 
             # collect outgoing edges by direction
             outgoing_edges = current_edge.getOutgoing()
@@ -83,3 +156,145 @@ class ConnectionInfo:
                 for connection in connections:
                     direction = connection.getDirection()
                     self.outgoing_edges_dict[current_edge_id][direction] = current_outgoing_edge.getID()
+
+        self.roundabout_edges = sorted({edge_id for roundabout in net.getRoundabouts()
+                                        for edge_id in roundabout.getEdges() if edge_id in self.edge_index_dict},
+                                       key=self.edge_index_dict.get)
+
+    def load_network(self, cached):
+        """
+        Takes the arrays of the graph from the network cache as they are (read-only, backed by the mapped file) and
+        rebuilds the dictionaries from them, in the order they were read.
+        """
+        for name in GRAPH_ARRAYS:
+            setattr(self, name, cached[name])
+        edge_ids = self.edge_ids = cached["edge_ids"]
+        direction_list = self.direction_list = cached["direction_list"]
+        self.edge_index_dict = {edge_id: index for index, edge_id in enumerate(edge_ids)}
+        self.edge_length_dict = dict(zip(edge_ids, cached["edge_length_values"].tolist()))
+        self.edge_lane_count_dict = dict(zip(edge_ids, self.edge_lane_counts.tolist()))
+        self.edge_max_speed_dict = dict(zip(edge_ids, self.edge_max_speeds.tolist()))
+        self.edge_list = [edge_ids[index] for index in self.edge_list_indices.tolist()]
+        self.roundabout_edges = [edge_ids[index] for index in np.flatnonzero(self.roundabout_mask).tolist()]
+        self.edge_vehicle_count = {}
+
+        out_indptr = self.out_indptr.tolist()
+        out_indices = self.out_indices.tolist()
+        out_directions = self.out_directions.tolist()
+        self.outgoing_edges_dict = {}
+        for index, edge_id in enumerate(edge_ids):
+            self.outgoing_edges_dict[edge_id] = {
+                direction_list[out_directions[arc]]: edge_ids[out_indices[arc]]
+                for arc in range(out_indptr[index], out_indptr[index + 1])}
+        sources = np.repeat(np.arange(len(edge_ids)), np.diff(self.out_indptr)).tolist()
+        self.build_direction_table(sources, out_indices, out_directions)
+
+    def cache_arrays(self):
+        """
+        :return: the arrays stored in the network cache, see load_network
+        """
+        arrays = {name: getattr(self, name) for name in GRAPH_ARRAYS}
+        # edge_lengths is float32, the dictionary keeps the lengths of the network file
+        arrays["edge_length_values"] = np.array([self.edge_length_dict[edge_id] for edge_id in self.edge_ids])
+        return arrays
+
+    def build_direction_table(self, sources, targets, directions):
+        """
+        :param sources, targets, directions: lists of the source edge, target edge and direction code of every arc
+        """
+        self.direction_table = {}
+        for source, target, code in zip(sources, targets, directions):
+            self.direction_table.setdefault((source, target), self.direction_list[code])
+
+    def build_graph_arrays(self):
+        """
+        Builds the array-backed (CSR) view of the edge graph from the dictionaries.
+        The arcs of every edge are stored in the iteration order of outgoing_edges_dict, so searches over the
+        arrays break ties the same way as searches over the dictionaries.
+        """
+        edge_count = len(self.edge_index_dict)
+        self.edge_ids = [None] * edge_count
+        for edge_id, index in self.edge_index_dict.items():
+            self.edge_ids[index] = edge_id
+
+        self.direction_list = list(DIRECTION_LIST)
+        direction_codes = {direction: code for code, direction in enumerate(self.direction_list)}
+
+        self.edge_lengths = np.zeros(edge_count, dtype=np.float32)
+        self.passenger_mask = np.zeros(edge_count, dtype=bool)
+        for edge_id in self.edge_list:
+            self.passenger_mask[self.edge_index_dict[edge_id]] = True
+        self.edge_list_indices = np.array([self.edge_index_dict[edge_id] for edge_id in self.edge_list],
+                                          dtype=np.int64)
+        self.roundabout_mask = np.zeros(edge_count, dtype=bool)
+        self.roundabout_mask[[self.edge_index_dict[edge_id] for edge_id in self.roundabout_edges]] = True
+
+        # static edge attributes from the network file
+        lengths = np.array([self.edge_length_dict[edge_id] for edge_id in self.edge_ids])
+        self.edge_lane_counts = np.array([self.edge_lane_count_dict[edge_id] for edge_id in self.edge_ids],
+                                         dtype=np.int32)
+        self.edge_max_speeds = np.array([self.edge_max_speed_dict[edge_id] for edge_id in self.edge_ids])
+        self.edge_free_flow_times = np.full(len(self.edge_ids), np.inf)
+        np.divide(lengths, self.edge_max_speeds, out=self.edge_free_flow_times, where=self.edge_max_speeds > 0)
+        self.edge_capacities = self.edge_lane_counts * lengths / JAM_SPACING
+
+        # outgoing adjacency in CSR layout
+        out_indptr = np.zeros(edge_count + 1, dtype=np.int32)
+        sources = []
+        targets = []
+        directions = []
+        for index, edge_id in enumerate(self.edge_ids):
+            self.edge_lengths[index] = self.edge_length_dict[edge_id]
+            for direction, outgoing_edge in self.outgoing_edges_dict[edge_id].items():
+                if direction not in direction_codes:
+                    direction_codes[direction] = len(self.direction_list)
+                    self.direction_list.append(direction)
+                sources.append(index)
+                targets.append(self.edge_index_dict[outgoing_edge])
+                directions.append(direction_codes[direction])
+            out_indptr[index + 1] = len(targets)
+        self.out_indptr = out_indptr
+        self.out_indices = np.array(targets, dtype=np.int32)
+        self.out_directions = np.array(directions, dtype=np.int8)
+        self.build_direction_table(sources, targets, directions)
+
+        # incoming adjacency: the same arcs sorted by target edge (stable, so arc order is kept)
+        sources = np.array(sources, dtype=np.int32)
+        order = np.argsort(self.out_indices, kind="stable")
+        self.in_indptr = np.zeros(edge_count + 1, dtype=np.int32)
+        np.cumsum(np.bincount(self.out_indices, minlength=edge_count), out=self.in_indptr[1:])
+        self.in_indices = sources[order]
+        self.in_directions = self.out_directions[order]
+        self.in_arcs = order.astype(np.int32)
+
+    def outgoing_arcs(self, edge_index):
+        """
+        :param edge_index: index of an edge, as in edge_index_dict
+        :return: (outgoing edge indices, direction codes) of the edge as array views
+        """
+        start, end = self.out_indptr[edge_index], self.out_indptr[edge_index + 1]
+        return self.out_indices[start:end], self.out_directions[start:end]
+
+    def path_directions(self, path):
+        """
+        :param path: list of edge indices, each one an outgoing edge of the previous one
+        :return: list of directions leading along the path
+        """
+        direction_table = self.direction_table
+        return [direction_table[(path[i], path[i + 1])] for i in range(len(path) - 1)]
+
+    def edge_id_path_directions(self, edge_path):
+        """
+        :param edge_path: list of edge ids, each one an outgoing edge of the previous one
+        :return: list of directions leading along the path
+        """
+        edge_index_dict = self.edge_index_dict
+        return self.path_directions([edge_index_dict[edge] for edge in edge_path])
+
+    def incoming_arcs(self, edge_index):
+        """
+        :param edge_index: index of an edge, as in edge_index_dict
+        :return: (incoming edge indices, direction codes) of the edge as array views
+        """
+        start, end = self.in_indptr[edge_index], self.in_indptr[edge_index + 1]
+        return self.in_indices[start:end], self.in_directions[start:end]
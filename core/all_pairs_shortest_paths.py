@@ -0,0 +1,247 @@
+"""
+    This file contains the all-pairs shortest path engine shared by the
+    Floyd-Warshall based routing policies. Distances and next hops are kept
+    in NumPy matrices indexed by the edge indices of ConnectionInfo.
+"""
+
+import numpy as np
+
+
+class FloydWarshallEngine:
+    """
+    Vectorized Floyd-Warshall over the edge graph of a ConnectionInfo.
+    Entering an outgoing edge from edge i costs weights[i], i.e. the weight of an edge is paid when leaving it,
+    which is the cost model of FloydWarshallPolicy and HeuristicPolicy.
+    After compute():
+        - distance[i][j] float32 matrix, shortest cost from edge i to edge j (inf if unreachable)
+        - next_hop[i][j] int32 matrix, the edge after i on the shortest path to j (-1 if unreachable)
+    :param connection_info: object containing network information
+    """
+    def __init__(self, connection_info):
+        self.connection_info = connection_info
+        self.edge_count = len(connection_info.edge_ids)
+
+        # only edges that allow passenger vehicles are used as the start of an arc
+        sources = np.repeat(np.arange(self.edge_count, dtype=np.int32), np.diff(connection_info.out_indptr))
+        mask = connection_info.passenger_mask[sources]
+        self.arc_sources = sources[mask]
+        self.arc_targets = connection_info.out_indices[mask]
+        # only edges with both incoming and outgoing arcs can be in the middle of a path
+        self.intermediates = np.intersect1d(self.arc_sources, self.arc_targets)
+
+        self.weights = None
+        self.distance = None
+        self.next_hop = None
+
+    def initialize(self, weights):
+        """
+        Sets the distance and next hop matrices to the direct arcs of the graph.
+        :param weights: array of per-edge weights indexed by edge index
+        """
+        n = self.edge_count
+        weights = np.array(weights, dtype=np.float32)
+        self.weights = weights
+        self.distance = np.full((n, n), np.inf, dtype=np.float32)
+        self.distance[self.arc_sources, self.arc_targets] = weights[self.arc_sources]
+        np.fill_diagonal(self.distance, 0)
+
+        self.next_hop = np.full((n, n), -1, dtype=np.int32)
+        self.next_hop[self.arc_sources, self.arc_targets] = self.arc_targets
+        np.fill_diagonal(self.next_hop, np.arange(n, dtype=np.int32))
+
+    def compute(self, weights):
+        """
+        Computes the shortest path for all pairs of edges.
+        For every intermediate edge k, the rows that can reach k are updated at once with a broadcasted
+        distance[i][k] + distance[k][j] instead of a Python loop over i and j.
+        :param weights: array of per-edge weights indexed by edge index
+        :return: the distance matrix
+        """
+        self.initialize(weights)
+        for k in self.intermediates:
+            self.relax_through(k)
+        return self.distance
+
+    def relax_through(self, k, rows=None, columns=None):
+        """
+        Relaxes the paths of the given rows through the intermediate edge k.
+        :param k: index of the intermediate edge
+        :param rows: indices of the start edges to update, defaults to every edge that can reach k
+        :param columns: indices of the destination edges to update, defaults to every edge
+        """
+        distance = self.distance
+        if rows is None:
+            rows = np.flatnonzero(distance[:, k] < np.inf)
+        else:
+            rows = rows[distance[rows, k] < np.inf]
+        if rows.size == 0:
+            return
+        if columns is None:
+            candidate = distance[rows, k][:, None] + distance[k][None, :]
+            block = distance[rows]
+            improved = candidate < block
+            if not improved.any():
+                return
+            distance[rows] = np.where(improved, candidate, block)
+            self.next_hop[rows] = np.where(improved, self.next_hop[rows, k][:, None], self.next_hop[rows])
+            return
+
+        block_index = np.ix_(rows, columns)
+        candidate = distance[rows, k][:, None] + distance[k, columns][None, :]
+        block = distance[block_index]
+        improved = candidate < block
+        if not improved.any():
+            return
+        distance[block_index] = np.where(improved, candidate, block)
+        self.next_hop[block_index] = np.where(improved, self.next_hop[rows, k][:, None], self.next_hop[block_index])
+
+    def path(self, i, j):
+        """
+        Reconstructs the path from edge i to edge j from the next hop matrix.
+        :return: list of edge indices from i to j, empty if j is unreachable from i
+        """
+        if self.next_hop[i][j] == -1:
+            return []
+        path = [i]
+        while i != j:
+            i = int(self.next_hop[i][j])
+            path.append(i)
+        return path
+
+
+class DynamicAllPairsEngine(FloydWarshallEngine):
+    """
+    Floyd-Warshall engine that keeps its matrices across simulation steps and only updates them for the edges
+    whose weight changed since the last step:
+        - for an edge whose weight increased, the pairs whose shortest path leaves that edge are reset and
+          recomputed, only over the rows and columns that contain such pairs
+        - for an edge whose weight decreased, every pair is relaxed through that edge, which is O(n^2)
+    When more than rebuild_threshold of the edges changed, the matrices are rebuilt from scratch instead.
+    :param connection_info: object containing network information
+    :param rebuild_threshold: fraction of changed edges above which a full rebuild is done
+    """
+    def __init__(self, connection_info, rebuild_threshold=0.05):
+        super().__init__(connection_info)
+        self.rebuild_threshold = rebuild_threshold
+        self.out_arcs = [[] for _ in range(self.edge_count)]
+        for source, target in zip(self.arc_sources.tolist(), self.arc_targets.tolist()):
+            self.out_arcs[source].append(target)
+
+    def update_weights(self, weights):
+        """
+        Brings the matrices up to date with a full array of new weights, updating only what the changed
+        weights affect. The first call computes the matrices from scratch.
+        :param weights: array of per-edge weights indexed by edge index
+        :return: the distance matrix
+        """
+        weights = np.asarray(weights, dtype=np.float32)
+        if self.distance is None:
+            return self.compute(weights)
+        changed = np.flatnonzero(weights != self.weights)
+        return self.update({edge: weights[edge] for edge in changed.tolist()})
+
+    def update(self, changes):
+        """
+        Applies a set of changed edge weights to the distance and next hop matrices.
+        :param changes: {edge index: new weight} of the edges whose weight changed since the last update
+        :return: the distance matrix
+        """
+        if not changes:
+            return self.distance
+        if len(changes) > self.rebuild_threshold * self.edge_count:
+            weights = self.weights.copy()
+            for edge, weight in changes.items():
+                weights[edge] = weight
+            return self.compute(weights)
+
+        increased = [edge for edge, weight in changes.items() if weight > self.weights[edge]]
+        decreased = [edge for edge, weight in changes.items() if weight < self.weights[edge]]
+
+        if increased:
+            for edge in increased:
+                self.weights[edge] = changes[edge]
+            if not self.recompute_through(increased):
+                for edge in decreased:
+                    self.weights[edge] = changes[edge]
+                return self.compute(self.weights)
+        for edge in decreased:
+            self.weights[edge] = changes[edge]
+            self.relax_decreased(edge)
+        return self.distance
+
+    def pairs_through(self, edges):
+        """
+        Finds the pairs (i, j) whose current shortest path leaves one of the given edges, i.e. uses one of
+        their outgoing arcs. Only rows that reach one of the edges and columns reachable from one of them can
+        be affected, so the search is restricted to that block. It works column by column on the next hop
+        matrix with pointer jumping, so it takes O(rows * columns * log n) whatever the path lengths are.
+        :param edges: list of edge indices
+        :return: n x n bool matrix
+        """
+        n = self.edge_count
+        through = np.zeros((n, n), dtype=bool)
+        rows = np.flatnonzero(np.isfinite(self.distance[:, edges]).any(axis=1))
+        columns = np.flatnonzero(np.isfinite(self.distance[edges, :]).any(axis=0))
+
+        # local row of every edge; edges outside the block go to an extra all-False row that points to itself
+        local_row = np.full(n + 1, rows.size, dtype=np.int64)
+        local_row[rows] = np.arange(rows.size)
+        block = np.zeros((rows.size + 1, columns.size), dtype=bool)
+        block[local_row[edges], :] = True
+        # a path that ends at one of the edges does not leave it (every edge is in its own row and column)
+        block[local_row[edges], np.searchsorted(columns, edges)] = False
+        local_columns = np.arange(columns.size)[None, :]
+
+        # unreachable pairs point to the extra row so the jumps stay in range
+        hop = self.next_hop[np.ix_(rows, columns)]
+        hop = local_row[np.where(hop < 0, n, hop)]
+        hop = np.vstack([hop, np.full((1, columns.size), rows.size, dtype=hop.dtype)])
+        while True:
+            block |= block[hop, local_columns]
+            next_hop = hop[hop, local_columns]
+            if np.array_equal(next_hop, hop):
+                break
+            hop = next_hop
+
+        through[np.ix_(rows, columns)] = block[:rows.size]
+        return through
+
+    def recompute_through(self, edges):
+        """
+        Resets the pairs whose shortest path leaves one of the given edges to their direct arcs and runs
+        Floyd-Warshall over the block of rows and columns that contain them.
+        :param edges: list of edge indices whose weight increased
+        :return: False if too many pairs are affected and a full rebuild is cheaper, True otherwise
+        """
+        through = self.pairs_through(edges)
+        rows = np.flatnonzero(through.any(axis=1))
+        columns = np.flatnonzero(through.any(axis=0))
+        # past half of the routable matrix, recomputing the block costs as much as a full rebuild
+        if rows.size * columns.size > self.intermediates.size ** 2 // 2:
+            return False
+
+        self.distance[through] = np.inf
+        self.next_hop[through] = -1
+        reset_arcs = through[self.arc_sources, self.arc_targets]
+        sources, targets = self.arc_sources[reset_arcs], self.arc_targets[reset_arcs]
+        self.distance[sources, targets] = self.weights[sources]
+        self.next_hop[sources, targets] = targets
+
+        for k in self.intermediates:
+            self.relax_through(k, rows, columns)
+        return True
+
+    def relax_decreased(self, edge):
+        """
+        Updates the matrices after the weight of an edge decreased: first the row of the edge is relaxed over
+        its outgoing arcs, then every row is relaxed through the edge.
+        :param edge: index of the edge whose weight decreased
+        """
+        weight = self.weights[edge]
+        row = self.distance[edge]
+        for target in self.out_arcs[edge]:
+            candidate = weight + self.distance[target]
+            improved = candidate < row
+            row[improved] = candidate[improved]
+            self.next_hop[edge][improved] = target
+        self.relax_through(edge)
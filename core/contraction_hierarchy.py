@@ -0,0 +1,389 @@
+"""
+    This file contains a customizable contraction hierarchy (CCH) over the
+    edge graph of ConnectionInfo, for routing on networks too large for
+    per-vehicle Dijkstra or all-pairs matrices.
+    The hierarchy is built in three phases:
+        1. ordering: a metric-independent contraction order of the edges by
+           nested dissection, computed once per network file and cached
+           next to it
+        2. contraction: the shortcuts added by contracting the edges in
+           that order, independent of the weights
+        3. customization: the weights of all arcs and shortcuts for a given
+           set of edge weights, cheap enough to run on every step
+    Queries walk the elimination tree upwards from both ends.
+"""
+
+import os
+import zipfile
+import hashlib
+import numpy as np
+from core.network_cache import write_atomically
+
+INF = float("inf")
+
+
+def undirected_neighbours(edge_count, sources, targets):
+    """
+    :return: list of sets, the neighbours of every node of the edge graph ignoring arc directions
+    """
+    neighbours = [set() for _ in range(edge_count)]
+    for source, target in zip(sources.tolist(), targets.tolist()):
+        if source != target:
+            neighbours[source].add(target)
+            neighbours[target].add(source)
+    return neighbours
+
+
+def compute_contraction_order(edge_count, sources, targets, leaf_size=16):
+    """
+    Computes a contraction order by nested dissection: every part of the graph is split by the middle level of
+    a breadth-first search from a far away node; both halves are ordered first and the separator last, so
+    separators end up at the top of the hierarchy. Road networks have small separators, which keeps the
+    number of shortcuts low.
+    :param edge_count: number of nodes of the edge graph
+    :param sources: array of arc sources
+    :param targets: array of arc targets
+    :param leaf_size: parts up to this size are not split further
+    :return: int32 array, the edge indices in contraction order
+    """
+    neighbours = undirected_neighbours(edge_count, sources, targets)
+    part_of = [0] * edge_count
+    next_part = 1
+    order = []
+
+    def breadth_first_levels(start, part):
+        levels = [[start]]
+        seen = {start}
+        while True:
+            level = []
+            for node in levels[-1]:
+                for neighbour in neighbours[node]:
+                    if part_of[neighbour] == part and neighbour not in seen:
+                        seen.add(neighbour)
+                        level.append(neighbour)
+            if not level:
+                return levels
+            levels.append(level)
+
+    # stack of (part, nodes, separator) where a separator is appended to the order once both halves are done
+    stack = [(0, list(range(edge_count)), None)]
+    while stack:
+        part, nodes, separator = stack.pop()
+        if separator is not None:
+            order.extend(separator)
+            continue
+        if len(nodes) <= leaf_size:
+            order.extend(nodes)
+            continue
+
+        # split off one connected component; the rest of the part is handled separately
+        levels = breadth_first_levels(nodes[0], part)
+        levels = breadth_first_levels(levels[-1][0], part)
+        component = [node for level in levels for node in level]
+        if len(component) < len(nodes):
+            in_component = set(component)
+            rest = [node for node in nodes if node not in in_component]
+            for node in rest:
+                part_of[node] = next_part
+            stack.append((next_part, rest, None))
+            next_part += 1
+            for node in component:
+                part_of[node] = next_part
+            stack.append((next_part, component, None))
+            next_part += 1
+            continue
+        if len(levels) < 3:
+            order.extend(nodes)
+            continue
+
+        # the smallest level that leaves at least a third of the nodes on each side
+        middle, smallest, count = 1, None, len(levels[0])
+        for index in range(1, len(levels) - 1):
+            if len(nodes) // 3 <= count <= 2 * len(nodes) // 3 and \
+                    (smallest is None or len(levels[index]) < smallest):
+                middle, smallest = index, len(levels[index])
+            count += len(levels[index])
+        if smallest is None:
+            middle = len(levels) // 2
+        separator = levels[middle]
+        for node in separator:
+            part_of[node] = -1
+        stack.append((-1, None, separator))
+        for half in (levels[:middle], levels[middle + 1:]):
+            half_nodes = [node for level in half for node in level]
+            for node in half_nodes:
+                part_of[node] = next_part
+            stack.append((next_part, half_nodes, None))
+            next_part += 1
+    return np.array(order, dtype=np.int32)
+
+
+def topology_fingerprint(edge_count, sources, targets):
+    """
+    :return: a hash of the arcs of the edge graph, used to check that a cached order still fits the network
+    """
+    digest = hashlib.sha1(np.int64(edge_count).tobytes())
+    digest.update(np.ascontiguousarray(sources, dtype=np.int32).tobytes())
+    digest.update(np.ascontiguousarray(targets, dtype=np.int32).tobytes())
+    return digest.hexdigest()
+
+
+class ContractionHierarchy:
+    """
+    Customizable contraction hierarchy over the edge graph of a ConnectionInfo.
+    Entering an edge costs the weight of that edge, which is the cost model of DijkstraEngine.
+    :param connection_info: object containing network information
+    :param order_cache_file: file used to cache the contraction order, defaults to <net file>.ch_order.npz;
+                             an empty string disables the cache
+    """
+    def __init__(self, connection_info, order_cache_file=None):
+        self.connection_info = connection_info
+        self.edge_count = len(connection_info.edge_ids)
+        self.arc_sources = np.repeat(np.arange(self.edge_count, dtype=np.int32),
+                                     np.diff(connection_info.out_indptr))
+        self.arc_targets = connection_info.out_indices
+
+        if order_cache_file is None and getattr(connection_info, "net_filename", None):
+            order_cache_file = connection_info.net_filename + ".ch_order.npz"
+        self.order = self.load_order(order_cache_file)
+        self.rank = np.empty(self.edge_count, dtype=np.int32)
+        self.rank[self.order] = np.arange(self.edge_count, dtype=np.int32)
+        self.contract()
+        # plain lists for the query loop
+        self.up_indptr_list = self.up_indptr.tolist()
+        self.up_heads_list = self.up_heads.tolist()
+        self.shortcut_lower_list = self.shortcut_lower.tolist()
+        self.shortcut_upper_list = self.shortcut_upper.tolist()
+
+        self.weights = None
+        self.up_weights = None
+        self.down_weights = None
+        self.up_parts = None
+        self.down_parts = None
+
+    def load_order(self, cache_file):
+        """
+        Loads the contraction order from the cache file if it was computed for the same topology,
+        otherwise computes it and writes it to the cache file. A cache file that cannot be read is computed again.
+        :return: int32 array, the edge indices in contraction order
+        """
+        fingerprint = topology_fingerprint(self.edge_count, self.arc_sources, self.arc_targets)
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with np.load(cache_file) as cached:
+                    if str(cached["fingerprint"]) == fingerprint:
+                        order = cached["order"]
+                        if order.shape == (self.edge_count,):
+                            return order
+            except (OSError, ValueError, zipfile.BadZipFile, KeyError):
+                pass
+
+        order = compute_contraction_order(self.edge_count, self.arc_sources, self.arc_targets)
+        if cache_file:
+            try:
+                write_atomically(cache_file, lambda f: np.savez(f, order=order, fingerprint=np.array(fingerprint)))
+            except OSError as err:
+                print("Could not cache the contraction order: {}".format(err))
+        return order
+
+    def contract(self):
+        """
+        Contracts the edges in order and builds the weight-independent structure:
+            - shortcut_lower, shortcut_upper: the two ends of every arc or shortcut (lower rank first); the
+              shortcuts of an edge to its upward neighbours are numbered consecutively from up_indptr[edge]
+            - up_indptr, up_heads: CSR of the upward neighbours of every edge, sorted by rank
+            - parent: the elimination tree, i.e. the lowest ranked upward neighbour of every edge
+            - triangle_batches: the lower triangles used by customization, grouped by level
+        """
+        rank = self.rank.tolist()
+        neighbours = undirected_neighbours(self.edge_count, self.arc_sources, self.arc_targets)
+        upward = [None] * self.edge_count
+        for node in self.order.tolist():
+            ups = sorted((neighbour for neighbour in neighbours[node] if rank[neighbour] > rank[node]),
+                         key=lambda neighbour: rank[neighbour])
+            upward[node] = ups
+            # contracting the node connects all of its upward neighbours to each other
+            for i, first in enumerate(ups):
+                neighbours[first].discard(node)
+                for second in ups[i + 1:]:
+                    neighbours[first].add(second)
+                    neighbours[second].add(first)
+        del neighbours
+
+        up_counts = np.array([len(ups) for ups in upward], dtype=np.int64)
+        self.up_indptr = np.zeros(self.edge_count + 1, dtype=np.int64)
+        np.cumsum(up_counts, out=self.up_indptr[1:])
+        self.up_heads = np.array([neighbour for ups in upward for neighbour in ups], dtype=np.int32)
+        self.shortcut_lower = np.repeat(np.arange(self.edge_count, dtype=np.int32), up_counts)
+        self.shortcut_upper = self.up_heads
+        # sorted keys to look up the shortcut of a (lower, upper) pair with searchsorted
+        self.shortcut_keys = self.shortcut_lower.astype(np.int64) * self.edge_count + self.rank[self.up_heads]
+        self.parent = [ups[0] if ups else -1 for ups in upward]
+
+        # level of a node: one more than the highest level of its lower neighbours, so the triangles of all
+        # nodes on the same level only read shortcuts that are already final
+        level = [0] * self.edge_count
+        for node in self.order.tolist():
+            for neighbour in upward[node]:
+                level[neighbour] = max(level[neighbour], level[node] + 1)
+
+        # lower triangle (x, u, v) of every pair of upward neighbours u, v of x, as shortcut ids
+        # a = {x, u}, b = {x, v}, c = {u, v}
+        batches = {}
+        pair_indices = {}
+        for node in range(self.edge_count):
+            degree = int(up_counts[node])
+            if degree < 2:
+                continue
+            if degree not in pair_indices:
+                pair_indices[degree] = np.triu_indices(degree, 1)
+            first, second = pair_indices[degree]
+            base = self.up_indptr[node]
+            ups = self.up_heads[base:base + degree]
+            batch = batches.setdefault(level[node], ([], [], []))
+            batch[0].append((base + first).astype(np.int32))
+            batch[1].append((base + second).astype(np.int32))
+            batch[2].append(self.shortcut_ids(ups[first], ups[second]).astype(np.int32))
+        self.triangle_batches = [tuple(np.concatenate(part) for part in batches[key]) for key in sorted(batches)]
+
+        # original arcs as (shortcut, head) for the upward and downward directions
+        loops = self.arc_sources == self.arc_targets
+        sources, targets = self.arc_sources[~loops], self.arc_targets[~loops]
+        self.arc_upward = self.rank[sources] < self.rank[targets]
+        self.arc_shortcuts = self.shortcut_ids(np.where(self.arc_upward, sources, targets),
+                                               np.where(self.arc_upward, targets, sources))
+        self.arc_heads = targets
+
+    def shortcut_ids(self, lower, upper):
+        """
+        :param lower: array of the lower ranked ends
+        :param upper: array of the upper ranked ends
+        :return: array of the ids of the shortcuts between them
+        """
+        return np.searchsorted(self.shortcut_keys, lower.astype(np.int64) * self.edge_count + self.rank[upper])
+
+    def customize(self, weights):
+        """
+        Computes the upward and downward weight of every arc and shortcut for the given edge weights, and the
+        two shortcuts every shortcut is made of (-1 for an original arc), used to unpack paths.
+        Edges that do not allow passenger vehicles are never entered, as in DijkstraEngine.
+        :param weights: array of per-edge weights indexed by edge index
+        """
+        weights = np.array(weights, dtype=np.float64)
+        weights[~self.connection_info.passenger_mask] = INF
+        self.weights = weights
+
+        shortcut_count = self.shortcut_lower.size
+        up_weights = np.full(shortcut_count, INF)
+        down_weights = np.full(shortcut_count, INF)
+        up_parts = np.full((2, shortcut_count), -1, dtype=np.int64)
+        down_parts = np.full((2, shortcut_count), -1, dtype=np.int64)
+        arc_weights = weights[self.arc_heads]
+        np.minimum.at(up_weights, self.arc_shortcuts[self.arc_upward], arc_weights[self.arc_upward])
+        np.minimum.at(down_weights, self.arc_shortcuts[~self.arc_upward], arc_weights[~self.arc_upward])
+
+        # lower triangle (x, u, v) with a = {x, u}, b = {x, v}, c = {u, v}:
+        # u -> x -> v costs down(a) + up(b) and v -> x -> u costs down(b) + up(a)
+        for lower_a, lower_b, top in self.triangle_batches:
+            candidate = down_weights[lower_a] + up_weights[lower_b]
+            np.minimum.at(up_weights, top, candidate)
+            hit = candidate == up_weights[top]
+            up_parts[0, top[hit]] = lower_a[hit]
+            up_parts[1, top[hit]] = lower_b[hit]
+
+            candidate = down_weights[lower_b] + up_weights[lower_a]
+            np.minimum.at(down_weights, top, candidate)
+            hit = candidate == down_weights[top]
+            down_parts[0, top[hit]] = lower_b[hit]
+            down_parts[1, top[hit]] = lower_a[hit]
+
+        # original arcs that are as short as their shortcut are used as they are
+        direct = arc_weights == np.where(self.arc_upward, up_weights[self.arc_shortcuts],
+                                         down_weights[self.arc_shortcuts])
+        up_parts[:, self.arc_shortcuts[direct & self.arc_upward]] = -1
+        down_parts[:, self.arc_shortcuts[direct & ~self.arc_upward]] = -1
+
+        self.up_weights = up_weights.tolist()
+        self.down_weights = down_weights.tolist()
+        self.up_parts = up_parts.tolist()
+        self.down_parts = down_parts.tolist()
+
+    def upward_search(self, start, shortcut_weights):
+        """
+        Walks the elimination tree from start to the root, relaxing the upward shortcuts of every edge on it.
+        :return: (distance, previous) dictionaries over the edges on the path to the root
+        """
+        up_indptr = self.up_indptr_list
+        up_heads = self.up_heads_list
+        distance = {start: 0.0}
+        previous = {}
+        node = start
+        while node != -1:
+            node_distance = distance.get(node, INF)
+            if node_distance < INF:
+                for shortcut in range(up_indptr[node], up_indptr[node + 1]):
+                    head = up_heads[shortcut]
+                    new_distance = node_distance + shortcut_weights[shortcut]
+                    if new_distance < distance.get(head, INF):
+                        distance[head] = new_distance
+                        previous[head] = (node, shortcut)
+            node = self.parent[node]
+        return distance, previous
+
+    def shortest_path(self, source, target):
+        """
+        :param source: index of the start edge
+        :param target: index of the destination edge
+        :return: list of edge indices from source to target, empty if target is unreachable
+        """
+        if source == target:
+            return [source]
+        forward_distance, forward_previous = self.upward_search(source, self.up_weights)
+        backward_distance, backward_previous = self.upward_search(target, self.down_weights)
+
+        best, meeting = INF, -1
+        for node, distance in forward_distance.items():
+            total = distance + backward_distance.get(node, INF)
+            if total < best:
+                best, meeting = total, node
+        if meeting == -1:
+            return []
+
+        # source up to the meeting edge, then the meeting edge down to target
+        up_part = []
+        node = meeting
+        while node != source:
+            lower, shortcut = forward_previous[node]
+            up_part.append(shortcut)
+            node = lower
+        path = [source]
+        for shortcut in reversed(up_part):
+            self.unpack(shortcut, True, path)
+        node = meeting
+        while node != target:
+            lower, shortcut = backward_previous[node]
+            self.unpack(shortcut, False, path)
+            node = lower
+        return path
+
+    def unpack(self, shortcut, upward, path):
+        """
+        Appends the edges of a shortcut to path (without its first edge, which is already on it).
+        :param upward: True for the direction lower -> upper, False for upper -> lower
+        """
+        first, second = (self.up_parts[0][shortcut], self.up_parts[1][shortcut]) if upward else \
+            (self.down_parts[0][shortcut], self.down_parts[1][shortcut])
+        if first == -1:
+            path.append(self.shortcut_upper_list[shortcut] if upward else self.shortcut_lower_list[shortcut])
+            return
+        # through the middle edge: down the first shortcut, then up the second one
+        self.unpack(first, False, path)
+        self.unpack(second, True, path)
+
+    def shortest_path_directions(self, source, target):
+        """
+        :param source: index of the start edge
+        :param target: index of the destination edge
+        :return: list of directions leading from source to target, empty if target is unreachable
+        """
+        return self.connection_info.path_directions(self.shortest_path(source, target))
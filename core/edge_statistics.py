@@ -0,0 +1,119 @@
+"""
+    This file contains the per-step edge statistics collector. It subscribes
+    once to the last step values of every passenger edge, so a single TraCI
+    reply per step brings the statistics of all edges instead of one round
+    trip per edge and value.
+"""
+
+import os
+import sys
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("No environment variable SUMO_HOME!")
+import numpy as np
+from core.sumo_backend import traci
+import traci.constants as tc
+
+EDGE_VARIABLES = (tc.LAST_STEP_VEHICLE_NUMBER, tc.LAST_STEP_MEAN_SPEED, tc.LAST_STEP_OCCUPANCY,
+                  tc.LAST_STEP_LENGTH)
+
+
+class EdgeStatisticsCollector:
+    """
+    Collects the last step statistics of every edge in edge_list from TraCI edge subscriptions.
+    After update(), the arrays are indexed by edge index (edges outside edge_list stay 0):
+        - vehicle_number number of vehicles on the edge
+        - mean_speed mean speed of the vehicles on the edge (the maximum speed if there are none)
+        - occupancy occupancy of the edge in percent
+        - vehicle_length mean length of the vehicles on the edge
+    and connection_info.edge_vehicle_count {edge_id: number of vehicles at edge} is filled.
+    With expiry_steps set, only the edges requested with request() are subscribed (the region of interest), and an
+    edge is unsubscribed once it has not been requested for expiry_steps simulation steps, counted with the steps
+    given to update(), so steps advanced without an update() also count. Edges outside the region read as empty: no
+    vehicles, occupancy 0 and the maximum speed as mean speed.
+    :param connection_info: object containing network information
+    :param expiry_steps: None to subscribe to every edge in edge_list, or the number of steps an edge stays
+                         subscribed after its last request
+    """
+    def __init__(self, connection_info, expiry_steps=None):
+        self.connection_info = connection_info
+        edge_count = len(connection_info.edge_ids)
+        self.vehicle_number = np.zeros(edge_count, dtype=np.int32)
+        self.mean_speed = np.zeros(edge_count)
+        self.occupancy = np.zeros(edge_count)
+        self.vehicle_length = np.zeros(edge_count)
+        self.subscribed = False
+        self.expiry_steps = expiry_steps
+        self.step = 0  # simulation step of the last update()
+        self.last_request = np.full(edge_count, -1, dtype=np.int64)  # step of the last request of every edge
+        self.subscribed_mask = np.zeros(edge_count, dtype=bool)
+        self.edge_list_mask = np.zeros(edge_count, dtype=bool)
+        self.edge_list_mask[connection_info.edge_list_indices] = True
+        if expiry_steps is not None:
+            self.mean_speed[:] = connection_info.edge_max_speeds
+
+    def subscribe(self):
+        """
+        Subscribes to the statistics of every edge in edge_list, or of the requested edges with a region of
+        interest; must be called after traci.start.
+        """
+        if self.expiry_steps is None:
+            for edge in self.connection_info.edge_list:
+                traci.edge.subscribe(edge, EDGE_VARIABLES)
+            self.subscribed_mask[self.edge_list_mask] = True
+        else:
+            self.update_region()
+        self.subscribed = True
+
+    def request(self, edge_indices, step=None):
+        """
+        Adds edges to the region of interest of the current step; they are subscribed from the next update().
+        :param edge_indices: int array of edge indices
+        :param step: simulation step of the request, the step of the last update() if None
+        """
+        self.last_request[edge_indices] = self.step if step is None else step
+
+    def update_region(self):
+        """
+        Subscribes to the requested edges that are not subscribed yet, and unsubscribes the edges that were not
+        requested for expiry_steps steps, resetting their statistics.
+        """
+        wanted = (self.last_request >= 0) & (self.last_request >= self.step - self.expiry_steps) & self.edge_list_mask
+        edge_ids = self.connection_info.edge_ids
+        for index in np.flatnonzero(wanted & ~self.subscribed_mask):
+            traci.edge.subscribe(edge_ids[index], EDGE_VARIABLES)
+        dropped = np.flatnonzero(self.subscribed_mask & ~wanted)
+        for index in dropped:
+            traci.edge.unsubscribe(edge_ids[index])
+            self.connection_info.edge_vehicle_count[edge_ids[index]] = 0
+        self.vehicle_number[dropped] = 0
+        self.mean_speed[dropped] = self.connection_info.edge_max_speeds[dropped]
+        self.occupancy[dropped] = 0
+        self.vehicle_length[dropped] = 0
+        self.subscribed_mask = wanted
+
+    def update(self, step=None):
+        """
+        Reads the statistics of the last step from the bulk subscription reply.
+        :param step: current simulation step, which the region of interest expires against; if None, every call
+                     counts as one step
+        """
+        self.step = self.step + 1 if step is None else step
+        if not self.subscribed:
+            self.subscribe()
+        elif self.expiry_steps is not None:
+            self.update_region()
+        edge_index_dict = self.connection_info.edge_index_dict
+        edge_vehicle_count = self.connection_info.edge_vehicle_count
+        for edge, values in traci.edge.getAllSubscriptionResults().items():
+            index = edge_index_dict.get(edge)
+            if index is None:
+                continue
+            vehicle_number = values[tc.LAST_STEP_VEHICLE_NUMBER]
+            self.vehicle_number[index] = vehicle_number
+            self.mean_speed[index] = values[tc.LAST_STEP_MEAN_SPEED]
+            self.occupancy[index] = values[tc.LAST_STEP_OCCUPANCY]
+            self.vehicle_length[index] = values[tc.LAST_STEP_LENGTH]
+            edge_vehicle_count[edge] = vehicle_number
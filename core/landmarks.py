@@ -0,0 +1,131 @@
+"""
+    This file contains landmark (ALT) lower bounds on the shortest path
+    cost between two edges. The distances to and from a few landmark edges
+    are computed once for a set of free-flow weights and cached next to the
+    network file; by the triangle inequality they bound the cost of every
+    path from below for any weights that are never lower than the free-flow
+    weights.
+"""
+
+import os
+import zipfile
+import hashlib
+import numpy as np
+from core.network_cache import write_atomically
+from core.shortest_path_engine import DijkstraEngine
+
+
+def weights_fingerprint(connection_info, weights):
+    """
+    :return: a hash of the edge graph and the weights, used to check that cached landmark distances still fit
+    """
+    digest = hashlib.sha1(np.ascontiguousarray(connection_info.out_indptr, dtype=np.int32).tobytes())
+    digest.update(np.ascontiguousarray(connection_info.out_indices, dtype=np.int32).tobytes())
+    digest.update(connection_info.passenger_mask.tobytes())
+    digest.update(np.ascontiguousarray(weights, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+class LandmarkIndex:
+    """
+    Distances from and to a set of landmark edges, with the cost model of DijkstraEngine: a path costs the weights
+    of the edges it enters.
+        - landmarks int array of the landmark edge indices
+        - from_landmark[l][i] cost from landmark l to edge i (inf if unreachable)
+        - to_landmark[l][i] cost from edge i to landmark l (inf if unreachable)
+    :param connection_info: object containing network information
+    :param weights: array of free-flow per-edge weights indexed by edge index
+    :param landmark_count: number of landmarks
+    :param cache_file: file used to cache the distances, defaults to <net file>.landmarks.npz;
+                       an empty string disables the cache
+    """
+    def __init__(self, connection_info, weights, landmark_count=8, cache_file=None):
+        self.connection_info = connection_info
+        self.weights = np.array(weights, dtype=np.float64)
+        self.landmark_count = landmark_count
+        if cache_file is None and getattr(connection_info, "net_filename", None):
+            cache_file = connection_info.net_filename + ".landmarks.npz"
+
+        fingerprint = weights_fingerprint(connection_info, self.weights)
+        if not self.load(cache_file, fingerprint):
+            self.compute()
+            self.save(cache_file, fingerprint)
+
+    def load(self, cache_file, fingerprint):
+        """
+        Loads the landmark distances from the cache file if they were computed for the same graph and weights.
+        :return: True if the distances were loaded, False if there is no cache for them or it cannot be read
+        """
+        if not cache_file or not os.path.exists(cache_file):
+            return False
+        try:
+            with np.load(cache_file) as cached:
+                if str(cached["fingerprint"]) != fingerprint or cached["landmarks"].size != self.landmark_count:
+                    return False
+                landmarks = cached["landmarks"]
+                from_landmark = cached["from_landmark"]
+                to_landmark = cached["to_landmark"]
+        except (OSError, ValueError, zipfile.BadZipFile, KeyError):
+            return False
+        shape = (landmarks.size, len(self.weights))
+        if from_landmark.shape != shape or to_landmark.shape != shape:
+            return False
+        self.landmarks, self.from_landmark, self.to_landmark = landmarks, from_landmark, to_landmark
+        return True
+
+    def save(self, cache_file, fingerprint):
+        if not cache_file:
+            return
+        try:
+            write_atomically(cache_file, lambda f: np.savez(f, landmarks=self.landmarks,
+                                                            from_landmark=self.from_landmark,
+                                                            to_landmark=self.to_landmark,
+                                                            fingerprint=np.array(fingerprint)))
+        except OSError as err:
+            print("Could not cache the landmark distances: {}".format(err))
+
+    def compute(self):
+        """
+        Chooses the landmarks by farthest selection: every new landmark is the passenger edge farthest (in both
+        directions) from the landmarks chosen so far, starting from the first passenger edge.
+        """
+        engine = DijkstraEngine(self.connection_info)
+        weights = self.weights.tolist()
+        candidates = np.flatnonzero(self.connection_info.passenger_mask)
+        landmark_count = min(self.landmark_count, candidates.size)
+
+        landmarks, from_rows, to_rows = [], [], []
+        nearest = np.full(len(weights), np.inf)
+        landmark = int(candidates[0]) if candidates.size else -1
+        for _ in range(landmark_count):
+            distance, _, _ = engine.search(landmark, weights=weights)
+            from_row = np.array(distance) - weights[landmark]
+            to_row = np.array(engine.reverse_search(landmark, weights)[0])
+            landmarks.append(landmark)
+            from_rows.append(from_row)
+            to_rows.append(to_row)
+
+            # distance of every edge to its nearest landmark, only over edges that reach and are reached
+            round_trip = from_row + to_row
+            nearest = np.minimum(nearest, np.where(np.isfinite(round_trip), round_trip, -1))
+            nearest[landmarks] = -1
+            landmark = int(candidates[np.argmax(nearest[candidates])])
+
+        self.landmarks = np.array(landmarks, dtype=np.int32)
+        self.from_landmark = np.array(from_rows).reshape(len(landmarks), len(weights))
+        self.to_landmark = np.array(to_rows).reshape(len(landmarks), len(weights))
+
+    def lower_bounds(self, goal):
+        """
+        Lower bounds on the cost from every edge to the goal edge:
+        cost(i, goal) >= cost(l, goal) - cost(l, i) and cost(i, goal) >= cost(i, l) - cost(goal, l).
+        :param goal: index of the destination edge
+        :return: list of lower bounds indexed by edge index
+        """
+        with np.errstate(invalid="ignore"):
+            forward = self.from_landmark[:, goal][:, None] - self.from_landmark
+            backward = self.to_landmark - self.to_landmark[:, goal][:, None]
+        # a bound is only used when both distances are known
+        bounds = np.concatenate([forward, backward])
+        bounds = np.where(np.isfinite(bounds), bounds, 0)
+        return np.maximum(bounds.max(axis=0, initial=0), 0).tolist()
@@ -0,0 +1,174 @@
+"""
+    This file contains a streaming reader for SUMO network files. It reads
+    only the edges, lanes, connections and roundabouts that ConnectionInfo needs with
+    iterparse and drops every element once it is read, so the time and
+    memory of loading a network grow with the number of edges, not with
+    its geometry (shapes, junctions, traffic light programs).
+    The result has the part of the sumolib.net.Net interface that
+    ConnectionInfo uses, with the same edge order, lane order and
+    connection order as sumolib.net.readNet.
+"""
+
+import os
+import sys
+import xml.etree.ElementTree as ElementTree
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("No environment variable SUMO_HOME!")
+
+
+class NetLane:
+    """
+    Lane of a streamed network: speed, length and the vehicle classes it allows.
+    """
+    __slots__ = ("speed", "length", "allowed")
+
+    def __init__(self, speed, length, allowed):
+        self.speed = speed
+        self.length = length
+        self.allowed = allowed
+
+    def getSpeed(self):
+        return self.speed
+
+    def getLength(self):
+        return self.length
+
+    def allows(self, vehicle_class):
+        return vehicle_class in self.allowed
+
+
+class NetConnection:
+    """
+    Connection of a streamed network; only its direction is kept.
+    """
+    __slots__ = ("direction",)
+
+    def __init__(self, direction):
+        self.direction = direction
+
+    def getDirection(self):
+        return self.direction
+
+
+class NetEdge:
+    """
+    Edge of a streamed network, with its lanes in file order and its outgoing connections grouped by target edge
+    in the order the targets first appear, as in sumolib.
+    """
+    __slots__ = ("edge_id", "lanes", "outgoing")
+
+    def __init__(self, edge_id):
+        self.edge_id = edge_id
+        self.lanes = []
+        self.outgoing = {}
+
+    def getID(self):
+        return self.edge_id
+
+    def getLanes(self):
+        return self.lanes
+
+    def getLength(self):
+        return self.lanes[0].length
+
+    def getSpeed(self):
+        # sumolib keeps the speed of the last lane added
+        return self.lanes[-1].speed if self.lanes else None
+
+    def allows(self, vehicle_class):
+        return any(lane.allows(vehicle_class) for lane in self.lanes)
+
+    def getOutgoing(self):
+        return self.outgoing
+
+    def getConnections(self, to_edge):
+        return self.outgoing.get(to_edge, [])
+
+
+class NetRoundabout:
+    """
+    Roundabout of a streamed network; only the ids of its edges are kept.
+    """
+    __slots__ = ("edges",)
+
+    def __init__(self, edges):
+        self.edges = edges
+
+    def getEdges(self):
+        return self.edges
+
+
+class StreamedNet:
+    """
+    The edges of a network file without internal edges, and its roundabouts, as read by sumolib.net.readNet.
+    """
+    def __init__(self):
+        self.edges = []
+        self.id_to_edge = {}
+        self.roundabouts = []
+
+    def getRoundabouts(self):
+        return self.roundabouts
+
+    def getEdges(self):
+        return self.edges
+
+    def getEdge(self, edge_id):
+        return self.id_to_edge[edge_id]
+
+    def hasEdge(self, edge_id):
+        return edge_id in self.id_to_edge
+
+
+def read_net(net_file):
+    """
+    Streams a SUMO network file. Like sumolib.net.readNet, edges with a function (internal edges, crossings,
+    walking areas, connectors) are skipped, and so are the connections from or to them.
+    :param net_file: file name of a SUMO network file, e.g. 'test.net.xml'
+    :return: StreamedNet
+    """
+    # the vehicle class rules of sumolib; imported here, so loading a cached network does not import sumolib
+    from sumolib.net.lane import get_allowed
+    net = StreamedNet()
+    permissions = {}  # allowed vehicle classes by (allow, disallow), shared by the lanes
+    current_edge = None
+    root = None
+    depth = 0
+    for event, element in ElementTree.iterparse(net_file, events=("start", "end")):
+        if event == "end":
+            depth -= 1
+            if depth == 1:
+                # a top-level element is read completely, nothing read so far is needed any more
+                current_edge = None
+                root.clear()
+            continue
+        depth += 1
+        tag = element.tag
+        if root is None:
+            root = element
+        elif tag == "edge":
+            current_edge = None
+            if element.get("function", "") == "":
+                edge_id = element.get("id")
+                current_edge = net.id_to_edge.get(edge_id)
+                if current_edge is None:
+                    current_edge = NetEdge(edge_id)
+                    net.edges.append(current_edge)
+                    net.id_to_edge[edge_id] = current_edge
+        elif tag == "lane" and current_edge is not None:
+            permission = (element.get("allow"), element.get("disallow"))
+            allowed = permissions.get(permission)
+            if allowed is None:
+                allowed = permissions[permission] = frozenset(get_allowed(*permission))
+            current_edge.lanes.append(NetLane(float(element.get("speed")), float(element.get("length")), allowed))
+        elif tag == "connection":
+            from_edge = net.id_to_edge.get(element.get("from"))
+            to_edge = net.id_to_edge.get(element.get("to"))
+            if from_edge is not None and to_edge is not None:
+                from_edge.outgoing.setdefault(to_edge, []).append(NetConnection(element.get("dir")))
+        elif tag == "roundabout":
+            net.roundabouts.append(NetRoundabout(element.get("edges").split()))
+    return net
@@ -0,0 +1,192 @@
+"""
+    This file contains the binary cache of parsed networks. The collections
+    ConnectionInfo derives from a .net.xml file are stored next to it in
+    <net file>.netcache, keyed by the hash of the file contents, and the
+    cache is memory mapped on load instead of parsing the XML again.
+    File layout: a magic line, the length of a JSON header, the header
+    ({"hash", "arrays": {name: [dtype, shape, offset]}}), then the raw
+    arrays, each aligned to ARRAY_ALIGNMENT bytes. Lists of strings are
+    stored as one UTF-8 blob with an offsets array.
+"""
+
+import os
+import sys
+import json
+import mmap
+import hashlib
+import tempfile
+import numpy as np
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("No environment variable SUMO_HOME!")
+
+# the version in the magic changes whenever the cached arrays change, so older caches are rebuilt
+CACHE_MAGIC = b"STRNETCACHE3\n"
+ARRAY_ALIGNMENT = 64
+
+# sumolib networks already read in this process, by content hash
+sumolib_nets = {}
+
+
+def file_hash(file_name):
+    """
+    :return: the SHA-1 hex digest of the file contents
+    """
+    digest = hashlib.sha1()
+    with open(file_name, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_sumolib_net(net_file, content_hash=None):
+    """
+    Reads a network with sumolib once per process; later calls for a file with the same contents return the same
+    sumolib.net.Net, which must not be modified.
+    :param content_hash: hash of the file contents, computed if not given
+    """
+    content_hash = content_hash or file_hash(net_file)
+    net = sumolib_nets.get(content_hash)
+    if net is None:
+        import sumolib
+        net = sumolib.net.readNet(net_file)
+        sumolib_nets[content_hash] = net
+    return net
+
+
+class NetworkEdge:
+    """
+    Stand-in for a sumolib edge where only the id is needed, for tables built from the cache.
+    """
+    def __init__(self, edge_id):
+        self.edge_id = edge_id
+
+    def getID(self):
+        return self.edge_id
+
+    def __repr__(self):
+        return "NetworkEdge({})".format(self.edge_id)
+
+
+def encode_strings(strings):
+    """
+    :return: (uint8 array of the UTF-8 blob, int64 array of the end offset of every string)
+    """
+    encoded = [string.encode("utf-8") for string in strings]
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    ends = np.cumsum([len(string) for string in encoded], dtype=np.int64)
+    return blob, ends
+
+
+def decode_strings(blob, ends):
+    data = blob.tobytes()
+    starts = [0] + ends[:-1].tolist()
+    return [data[start:end].decode("utf-8") for start, end in zip(starts, ends.tolist())]
+
+
+def write_atomically(cache_file, write):
+    """
+    Writes a cache file under a temporary name in the same directory and then renames it, so a run that is killed
+    while writing, or two runs writing at the same time, never leave a partly written cache behind.
+    :param write: function writing the contents to the binary file object it is given
+    :raises OSError: if the file cannot be written; the temporary file is removed
+    """
+    descriptor, temporary_file = tempfile.mkstemp(prefix=os.path.basename(cache_file) + ".",
+                                                  dir=os.path.dirname(os.path.abspath(cache_file)))
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            write(f)
+        os.replace(temporary_file, cache_file)
+    except BaseException:
+        if os.path.exists(temporary_file):
+            os.remove(temporary_file)
+        raise
+
+
+def save_cache(cache_file, content_hash, arrays, string_lists):
+    """
+    Writes the cache file with write_atomically; failures are reported and ignored, the cache only saves time.
+    :param arrays: {name: numpy array}
+    :param string_lists: {name: list of strings}, stored as name + "_blob" and name + "_ends" arrays
+    """
+    arrays = dict(arrays)
+    for name, strings in string_lists.items():
+        arrays[name + "_blob"], arrays[name + "_ends"] = encode_strings(strings)
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        layout[name] = [array.dtype.str, list(array.shape), offset]
+        offset += -(-array.nbytes // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+    header = json.dumps({"hash": content_hash, "arrays": layout}).encode("utf-8")
+    data_start = -(-(len(CACHE_MAGIC) + 8 + len(header)) // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+    def write(f):
+        f.write(CACHE_MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name][2])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+
+    try:
+        write_atomically(cache_file, write)
+    except OSError as err:
+        print("Could not cache the network: {}".format(err))
+
+
+def load_cache(cache_file, content_hash, string_lists=()):
+    """
+    Memory maps the cache file if it was written for the same file contents.
+    :param string_lists: names of the lists of strings to decode
+    :return: {name: read-only array backed by the mapped file, or list of strings}, or None if there is no
+             valid cache (missing, written for other contents, truncated or malformed)
+    """
+    if not cache_file or not os.path.exists(cache_file):
+        return None
+    try:
+        with open(cache_file, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if buffer[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+        return None
+    try:
+        return read_arrays(buffer, content_hash, string_lists)
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def read_arrays(buffer, content_hash, string_lists):
+    """
+    Reads the header and the arrays of a mapped cache file after the magic line.
+    :return: see load_cache; None if the cache was written for other contents
+    :raises ValueError, KeyError, TypeError: if the file is truncated or the header is malformed
+    """
+    position = len(CACHE_MAGIC)
+    header_length = int.from_bytes(buffer[position:position + 8], "little")
+    if position + 8 + header_length > len(buffer):
+        raise ValueError("truncated header")
+    header = json.loads(buffer[position + 8:position + 8 + header_length].decode("utf-8"))
+    if header.get("hash") != content_hash:
+        return None
+    data_start = -(-(position + 8 + header_length) // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+    values = {}
+    for name, (dtype, shape, offset) in header["arrays"].items():
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape, dtype=np.int64))
+        if offset < 0 or data_start + offset + count * dtype.itemsize > len(buffer):
+            raise ValueError("array {} is cut off".format(name))
+        if count == 0:
+            values[name] = np.empty(shape, dtype=dtype)
+            continue
+        values[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + offset).reshape(shape)
+    for name in string_lists:
+        values[name] = decode_strings(values.pop(name + "_blob"), values.pop(name + "_ends"))
+    return values
@@ -0,0 +1,133 @@
+"""
+    This file contains the in-process generator of the uncontrolled
+    background vehicles. It draws trips the way SUMO's randomTrips.py does
+    with its default options, drops the trips without a path as its
+    duarouter validation does, and writes the fastest free-flow route of
+    the others, working on the arrays of a ConnectionInfo instead of
+    running randomTrips.py and duarouter as subprocesses.
+"""
+
+from xml.sax.saxutils import quoteattr
+import numpy as np
+from core.reachability import ReachabilityIndex
+from core.shortest_path_engine import DijkstraEngine
+
+# the default seed of randomTrips.py, which is used unless it is given --seed or --random
+RANDOM_TRIPS_SEED = 42
+
+# turnaround directions, which do not count as connections when looking for the fringe of the network
+TURNAROUND_DIRECTIONS = ("t", "T")
+
+
+def departure_times(begin, end, period):
+    """
+    :return: the departure times begin, begin + period, ... before end; the period is added up the same way as in
+             randomTrips.py, so the number of departures is the same
+    """
+    times = []
+    time = begin
+    while time < end:
+        times.append(time)
+        time += period
+    return times
+
+
+def trip_edge_candidates(connection_info):
+    """
+    The edges randomTrips.py starts and ends trips on with its default options: passenger edges outside
+    roundabouts, and not on the fringe of the network, i.e. a start edge needs an outgoing and an end edge an
+    incoming connection that is not a turnaround. Only connections to passenger edges are counted, unlike
+    randomTrips.py, which also counts connections to edges that vehicles of the trips cannot drive on.
+    :return: (int array of the start edge indices, int array of the end edge indices)
+    """
+    edge_count = len(connection_info.edge_ids)
+    turnaround_codes = [code for code, direction in enumerate(connection_info.direction_list)
+                        if direction in TURNAROUND_DIRECTIONS]
+    through = ~np.isin(connection_info.out_directions, turnaround_codes)
+    arc_sources = np.repeat(np.arange(edge_count), np.diff(connection_info.out_indptr))
+    has_outgoing = np.bincount(arc_sources[through], minlength=edge_count) > 0
+    has_incoming = np.bincount(connection_info.out_indices[through], minlength=edge_count) > 0
+    usable = connection_info.passenger_mask & ~connection_info.roundabout_mask
+    return np.flatnonzero(usable & has_outgoing), np.flatnonzero(usable & has_incoming)
+
+
+def trip_routes(engine, sources, destinations, weights):
+    """
+    Finds the routes of the trips with one search per distinct start edge.
+    :param engine: DijkstraEngine of the network
+    :param sources, destinations: edge indices of the start and end edge of every trip
+    :param weights: list of per-edge costs indexed by edge index
+    :return: list of the route (list of edge indices) of every trip, None for a trip without a path
+    """
+    trips_by_source = {}
+    for trip, source in enumerate(sources.tolist()):
+        trips_by_source.setdefault(source, []).append(trip)
+    destinations = destinations.tolist()
+
+    routes = [None] * len(destinations)
+    for source, trips in trips_by_source.items():
+        distance, previous, _ = engine.search(source, weights=weights)
+        for trip in trips:
+            current = destinations[trip]
+            if distance[current] == float("inf"):
+                continue
+            route = [current]
+            while current != source:
+                current = previous[current]
+                route.append(current)
+            route.reverse()
+            routes[trip] = route
+    return routes
+
+
+def generate_random_trips(connection_info, route_file, period, end=50.0, begin=0.0, seed=RANDOM_TRIPS_SEED,
+                          reachability=None, engine=None):
+    """
+    Writes the same kind of route file as randomTrips.py -n <net file> -b <begin> -e <end> -p <period> -r
+    <route_file>: one trip departs every period seconds from begin until end, between start and end edges drawn
+    uniformly from trip_edge_candidates. Trips without a path are dropped, and the vehicle ids of the others are
+    the numbers of their trips. Every vehicle takes the fastest route at the maximum speeds of the edges.
+    :param connection_info: object containing network information
+    :param route_file: file the vehicles are written to
+    :param period: time between two departures
+    :param seed: seed of the random draws; the same seed gives the same vehicles
+    :param reachability: ReachabilityIndex of the network, built if not given
+    :param engine: DijkstraEngine of the network, built if not given
+    :return: number of vehicles written, or None if the period is not positive or the network has no edges to start
+             or end trips on
+    """
+    if period <= 0:
+        print("The period of the trips must be positive, not {}.".format(period))
+        return None
+    times = departure_times(begin, end, period)
+    source_candidates, destination_candidates = trip_edge_candidates(connection_info)
+    if source_candidates.size == 0 or destination_candidates.size == 0:
+        print("No valid edges for generating the start or the destination of the trips.")
+        return None
+
+    random_state = np.random.RandomState(seed)
+    sources = random_state.choice(source_candidates, size=len(times))
+    destinations = random_state.choice(destination_candidates, size=len(times))
+    if reachability is None:
+        reachability = ReachabilityIndex(connection_info)
+    valid = np.flatnonzero(reachability.reachable_array(sources, destinations))
+    if engine is None:
+        engine = DijkstraEngine(connection_info)
+    routes = trip_routes(engine, sources[valid], destinations[valid], connection_info.edge_free_flow_times.tolist())
+
+    edge_ids = connection_info.edge_ids
+    vehicle_count = 0
+    with open(route_file, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n\n')
+        f.write('<routes xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+                'xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/routes_file.xsd">\n')
+        for trip, route in zip(valid.tolist(), routes):
+            if route is None:
+                # only reachable over edges that cannot be driven on (maximum speed 0)
+                continue
+            vehicle_count += 1
+            f.write('    <vehicle id="{}" depart="{:.2f}">\n'.format(trip, times[trip]))
+            f.write('        <route edges={}/>\n'.format(quoteattr(" ".join(edge_ids[edge] for edge in route))))
+            f.write('    </vehicle>\n')
+        f.write('</routes>\n')
+    return vehicle_count
@@ -0,0 +1,159 @@
+"""
+    This file contains the reachability index of the edge graph. The
+    strongly connected components of the graph are computed once, and every
+    component of the condensation DAG stores the set of components it can
+    reach as a bitset, so whether an edge can be reached from another is
+    answered with one bit test instead of a shortest path search.
+"""
+
+import numpy as np
+
+# rows of the reachability bitsets unpacked at a time when counting reachable pairs
+COUNT_BLOCK_ROWS = 256
+
+
+def strongly_connected_components(indptr, indices):
+    """
+    Tarjan's algorithm without recursion, on a graph in CSR layout.
+    :param indptr, indices: CSR arrays of the outgoing arcs, e.g. ConnectionInfo.out_indptr and out_indices
+    :return: (component of every node, number of components); components are numbered in reverse topological
+             order, so every arc leads to a component with the same or a lower number
+    """
+    indptr = indptr.tolist()
+    indices = indices.tolist()
+    node_count = len(indptr) - 1
+    order = [-1] * node_count
+    low = [0] * node_count
+    on_stack = [False] * node_count
+    component = [-1] * node_count
+    stack = []
+    counter = 0
+    component_count = 0
+    for root in range(node_count):
+        if order[root] != -1:
+            continue
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [[root, indptr[root]]]
+        while work:
+            frame = work[-1]
+            node, arc = frame
+            if arc < indptr[node + 1]:
+                frame[1] = arc + 1
+                successor = indices[arc]
+                if order[successor] == -1:
+                    order[successor] = low[successor] = counter
+                    counter += 1
+                    stack.append(successor)
+                    on_stack[successor] = True
+                    work.append([successor, indptr[successor]])
+                elif on_stack[successor] and order[successor] < low[node]:
+                    low[node] = order[successor]
+                continue
+            work.pop()
+            if work and low[node] < low[work[-1][0]]:
+                low[work[-1][0]] = low[node]
+            if low[node] == order[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component[member] = component_count
+                    if member == node:
+                        break
+                component_count += 1
+    return np.array(component, dtype=np.int32), component_count
+
+
+class ReachabilityIndex:
+    """
+    Which edges can be reached from which, over the outgoing arcs of ConnectionInfo (the arcs the routing policies
+    search). An edge always reaches itself.
+        - component int array, strongly connected component of every edge index
+        - component_count number of components
+        - reach uint8 array of shape (component_count, ceil(component_count / 8)); bit d (little-endian bit order)
+          of row c is set if component d can be reached from component c
+    :param connection_info: object containing network information
+    """
+    def __init__(self, connection_info):
+        self.edge_index_dict = connection_info.edge_index_dict
+        self.component, self.component_count = strongly_connected_components(connection_info.out_indptr,
+                                                                             connection_info.out_indices)
+        self.reach = self.component_reach(connection_info)
+
+    def component_reach(self, connection_info):
+        """
+        Builds the bitsets over the condensation DAG. Components are numbered in reverse topological order, so
+        the successors of a component are complete before the component itself.
+        """
+        count = self.component_count
+        sources = np.repeat(np.arange(len(self.component)), np.diff(connection_info.out_indptr))
+        source_components = self.component[sources].astype(np.int64)
+        target_components = self.component[connection_info.out_indices].astype(np.int64)
+        keep = source_components != target_components
+        arcs = np.unique(source_components[keep] * count + target_components[keep])
+        arc_sources = arcs // count
+        arc_targets = arcs % count
+        arc_starts = np.searchsorted(arc_sources, np.arange(count + 1))
+
+        reach = np.zeros((count, (count + 7) // 8), dtype=np.uint8)
+        for c in range(count):
+            successors = arc_targets[arc_starts[c]:arc_starts[c + 1]]
+            if successors.size:
+                np.bitwise_or.reduce(reach[successors], axis=0, out=reach[c])
+            reach[c, c >> 3] |= 1 << (c & 7)
+        return reach
+
+    def reachable(self, from_index, to_index):
+        """
+        :return: True if the edge with index to_index can be reached from the edge with index from_index
+        """
+        target = self.component[to_index]
+        return bool((self.reach[self.component[from_index], target >> 3] >> (target & 7)) & 1)
+
+    def reachable_edge(self, from_edge, to_edge):
+        """
+        :param from_edge, to_edge: edge ids
+        """
+        return self.reachable(self.edge_index_dict[from_edge], self.edge_index_dict[to_edge])
+
+    def reachable_array(self, source_indices, target_indices):
+        """
+        :return: bool array, True where the target edge can be reached from the source edge at the same position
+        """
+        source_components = self.component[np.asarray(source_indices, dtype=np.int64)]
+        target_components = self.component[np.asarray(target_indices, dtype=np.int64)]
+        reach_bytes = self.reach[source_components, target_components >> 3]
+        return ((reach_bytes >> (target_components & 7).astype(np.uint8)) & 1).astype(bool)
+
+    def reachable_matrix(self, source_indices, target_indices):
+        """
+        :return: bool array of shape (len(source_indices), len(target_indices)), True where the target edge can
+                 be reached from the source edge
+        """
+        source_components = self.component[np.asarray(source_indices, dtype=np.int64)]
+        target_components = self.component[np.asarray(target_indices, dtype=np.int64)]
+        reach_bytes = self.reach[source_components[:, None], (target_components >> 3)[None, :]]
+        return ((reach_bytes >> (target_components & 7).astype(np.uint8)[None, :]) & 1).astype(bool)
+
+    def pair_counts(self, source_indices, target_indices):
+        """
+        Counts the reachable pairs without building the full pair matrix, so it also works for all pairs of a
+        large network.
+        :return: (int array, number of the targets reachable from every source,
+                  int array, number of the sources that reach every target)
+        """
+        source_components = self.component[np.asarray(source_indices, dtype=np.int64)]
+        target_components = self.component[np.asarray(target_indices, dtype=np.int64)]
+        source_weights = np.bincount(source_components, minlength=self.component_count)
+        target_weights = np.bincount(target_components, minlength=self.component_count)
+        reached = np.zeros(self.component_count, dtype=np.int64)
+        reaching = np.zeros(self.component_count, dtype=np.int64)
+        for start in range(0, self.component_count, COUNT_BLOCK_ROWS):
+            end = min(start + COUNT_BLOCK_ROWS, self.component_count)
+            block = np.unpackbits(self.reach[start:end], axis=1, count=self.component_count,
+                                  bitorder="little").astype(np.int64)
+            reached[start:end] = block @ target_weights
+            reaching += source_weights[start:end] @ block
+        return reached[source_components], reaching[target_components]
@@ -0,0 +1,50 @@
+"""
+    This file contains the route cache shared by the routing policies.
+    Vehicles on the same edge heading to the same destination under the
+    same edge weights get the same decision list, so it is computed once.
+"""
+
+from collections import OrderedDict
+
+
+class RouteCache:
+    """
+    Bounded LRU cache of decision lists keyed by (current edge, destination, weight version).
+    The weight version is the one of the controller, see RouteController.publish_weights, which increases it every
+    time it publishes different edge weights, so routes computed under older weights are never returned again and
+    are evicted as the cache fills up.
+        - hits, misses: lookup counters
+    :param max_size: maximum number of cached routes
+    """
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self.routes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, current_edge, destination, weight_version):
+        """
+        :return: the cached decision list, or None if there is none for the weight version
+        """
+        key = (current_edge, destination, weight_version)
+        decision_list = self.routes.get(key)
+        if decision_list is None:
+            self.misses += 1
+            return None
+        self.routes.move_to_end(key)
+        self.hits += 1
+        return decision_list
+
+    def put(self, current_edge, destination, weight_version, decision_list):
+        """
+        Stores a decision list for the weight version, evicting the least recently used routes.
+        """
+        key = (current_edge, destination, weight_version)
+        self.routes[key] = decision_list
+        self.routes.move_to_end(key)
+        while len(self.routes) > self.max_size:
+            self.routes.popitem(last=False)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -0,0 +1,158 @@
+"""
+    This file contains the shortest path engine shared by the Dijkstra-based
+    routing policies: forward searches for a single vehicle and reverse
+    shortest-path trees for a batch of vehicles with the same destination.
+    It searches the array-backed graph of ConnectionInfo using integer
+    edge indices.
+"""
+
+import heapq
+
+INF = float("inf")
+
+
+class DijkstraEngine:
+    """
+    Binary-heap Dijkstra over the CSR arrays of a ConnectionInfo.
+    The cost of a path is the sum of the weights of the edges it enters, plus the weight of the start edge,
+    which is the same cost model as the original dictionary-based DijkstraPolicy.
+    Ties are broken by edge index, i.e. by the order of edge_list, so the engine returns the same paths.
+    :param connection_info: object containing network information
+    """
+    def __init__(self, connection_info):
+        self.connection_info = connection_info
+        self.edge_count = len(connection_info.edge_ids)
+        # plain lists are much faster than numpy arrays for scalar access in the search loop
+        self.out_indptr = connection_info.out_indptr.tolist()
+        self.out_indices = connection_info.out_indices.tolist()
+        self.out_directions = connection_info.out_directions.tolist()
+        self.in_indptr = connection_info.in_indptr.tolist()
+        self.in_indices = connection_info.in_indices.tolist()
+        self.in_arcs = connection_info.in_arcs.tolist()
+        self.allowed = connection_info.passenger_mask.tolist()
+        self.lengths = [connection_info.edge_length_dict[edge_id] for edge_id in connection_info.edge_ids]
+
+    def search(self, source, target=None, weights=None):
+        """
+        Runs Dijkstra from the source edge until the target edge is settled (or the graph is exhausted).
+        :param source: index of the start edge
+        :param target: index of the destination edge, None to settle every reachable edge
+        :param weights: list of per-edge costs indexed by edge index, defaults to the edge lengths
+        :return: (distance, previous, previous_arc) lists, where previous_arc[i] is the arc used to reach edge i
+        """
+        if weights is None:
+            weights = self.lengths
+        out_indptr = self.out_indptr
+        out_indices = self.out_indices
+        allowed = self.allowed
+
+        distance = [INF] * self.edge_count
+        previous = [-1] * self.edge_count
+        previous_arc = [-1] * self.edge_count
+        settled = [False] * self.edge_count
+
+        distance[source] = weights[source]
+        heap = [(distance[source], source)]
+        while heap:
+            current_distance, current = heapq.heappop(heap)
+            if settled[current]:
+                continue
+            settled[current] = True
+            if current == target:
+                break
+            for arc in range(out_indptr[current], out_indptr[current + 1]):
+                outgoing = out_indices[arc]
+                if settled[outgoing] or not allowed[outgoing]:
+                    continue
+                new_distance = current_distance + weights[outgoing]
+                if new_distance < distance[outgoing]:
+                    distance[outgoing] = new_distance
+                    previous[outgoing] = current
+                    previous_arc[outgoing] = arc
+                    heapq.heappush(heap, (new_distance, outgoing))
+
+        return distance, previous, previous_arc
+
+    def shortest_path_directions(self, source, target, weights=None):
+        """
+        :param source: index of the start edge
+        :param target: index of the destination edge
+        :param weights: list of per-edge costs indexed by edge index, defaults to the edge lengths
+        :return: list of directions leading from source to target, empty if target is unreachable
+        """
+        _, previous, previous_arc = self.search(source, target, weights)
+        return self.directions_to(source, target, previous, previous_arc)
+
+    def directions_to(self, source, target, previous, previous_arc):
+        """
+        Rebuilds the direction list of a path from the predecessor arrays of a search.
+        :return: list of directions leading from source to target, empty if target is unreachable
+        """
+        arcs = []
+        current = target
+        while current != source and previous[current] != -1:
+            arcs.append(previous_arc[current])
+            current = previous[current]
+        if current != source:
+            return []
+        direction_list = self.connection_info.direction_list
+        return [direction_list[self.out_directions[arc]] for arc in reversed(arcs)]
+
+    def reverse_search(self, target, weights=None):
+        """
+        Runs Dijkstra backwards from the target edge over the incoming arcs, which yields the shortest path from
+        every edge to the target in one search (a reverse shortest-path tree).
+        :param target: index of the destination edge
+        :param weights: list of per-edge costs indexed by edge index, defaults to the edge lengths
+        :return: (distance, next_edge, next_arc) lists, where distance[i] is the cost of the edges entered on the
+                 way from edge i to the target and next_arc[i] is the outgoing arc of edge i on that path
+        """
+        if weights is None:
+            weights = self.lengths
+        in_indptr = self.in_indptr
+        in_indices = self.in_indices
+        in_arcs = self.in_arcs
+        allowed = self.allowed
+
+        distance = [INF] * self.edge_count
+        next_edge = [-1] * self.edge_count
+        next_arc = [-1] * self.edge_count
+        settled = [False] * self.edge_count
+
+        distance[target] = 0.0
+        heap = [(0.0, target)]
+        while heap:
+            current_distance, current = heapq.heappop(heap)
+            if settled[current]:
+                continue
+            settled[current] = True
+            # edges that do not allow passenger vehicles can only be the start of a path, never pass through
+            if current != target and not allowed[current]:
+                continue
+            new_distance = current_distance + weights[current]
+            for position in range(in_indptr[current], in_indptr[current + 1]):
+                incoming = in_indices[position]
+                if settled[incoming]:
+                    continue
+                if new_distance < distance[incoming]:
+                    distance[incoming] = new_distance
+                    next_edge[incoming] = current
+                    next_arc[incoming] = in_arcs[position]
+                    heapq.heappush(heap, (new_distance, incoming))
+
+        return distance, next_edge, next_arc
+
+    def tree_directions(self, source, target, next_edge, next_arc):
+        """
+        Reads the path of one vehicle from a reverse shortest-path tree.
+        :return: list of directions leading from source to target, empty if target is unreachable
+        """
+        direction_list = self.connection_info.direction_list
+        directions = []
+        current = source
+        while current != target:
+            if next_edge[current] == -1:
+                return []
+            directions.append(direction_list[self.out_directions[next_arc[current]]])
+            current = next_edge[current]
+        return directions
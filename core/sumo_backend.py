@@ -0,0 +1,126 @@
+"""
+    This file contains the handle through which the testbed talks to SUMO.
+    It is either the traci socket client or libsumo, which runs SUMO in the
+    same process and has the same API without the TCP round trips.
+    Modules import the handle instead of traci:
+        from core.sumo_backend import traci
+    The backend is chosen with select_backend() or the STR_SUMO_BACKEND
+    environment variable ("traci" or "libsumo", default "traci") before the
+    simulation starts. enable_tracing() or the STR_SUMO_TRACE environment
+    variable ("1", or a file to write the summary to) counts and times
+    every call through the handle, see core.traci_tracer.
+"""
+
+import os
+import sys
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("No environment variable SUMO_HOME!")
+from core.traci_tracer import TraciTracer, TracedDomain, traced_call
+
+BACKENDS = ("traci", "libsumo")
+
+# the domains of both backends; traci has domain objects, libsumo has classes with static methods
+DOMAINS = ("busstop", "calibrator", "chargingstation", "edge", "gui", "inductionloop", "junction", "lane",
+           "lanearea", "meandata", "multientryexit", "overheadwire", "parkingarea", "person", "poi", "polygon",
+           "rerouter", "route", "routeprobe", "simulation", "trafficlight", "variablespeedsign", "vehicle",
+           "vehicletype")
+
+
+class SumoBackend:
+    """
+    Forwards every attribute to the selected backend module, e.g. traci.vehicle.getIDList().
+    The backend is selected on first use if select() was not called.
+        - tracer the TraciTracer recording the calls, None unless tracing is enabled
+    """
+    def __init__(self):
+        self.name = None
+        self.module = None
+        self.tracer = None
+        self.traced = {}  # traced domains and functions by attribute name
+        trace = os.environ.get("STR_SUMO_TRACE")
+        if trace:
+            self.enable_tracing(None if trace == "1" else trace)
+
+    def enable_tracing(self, output_file=None):
+        """
+        Starts counting and timing the calls through the handle.
+        :param output_file: file the summary is also written to, if set
+        :return: the TraciTracer
+        """
+        self.tracer = TraciTracer(output_file)
+        self.traced = {}
+        return self.tracer
+
+    def disable_tracing(self):
+        self.tracer = None
+        self.traced = {}
+
+    def select(self, name=None):
+        """
+        :param name: "traci" or "libsumo", defaults to the STR_SUMO_BACKEND environment variable or "traci";
+                     falls back to traci if libsumo is not installed
+        :return: the name of the selected backend
+        """
+        name = name or os.environ.get("STR_SUMO_BACKEND", "traci")
+        if name not in BACKENDS:
+            raise ValueError("Unknown SUMO backend: {}".format(name))
+        self.traced = {}
+        if name == "libsumo":
+            try:
+                import libsumo
+                self.name, self.module = name, libsumo
+                return self.name
+            except ImportError:
+                print("libsumo is not available, using traci instead.")
+        import traci
+        self.name, self.module = "traci", traci
+        return self.name
+
+    def start(self, cmd, *args, **kwargs):
+        """
+        Starts SUMO with the selected backend. libsumo cannot drive sumo-gui, so GUI runs always use traci.
+        """
+        if self.module is None:
+            self.select()
+        if self.name == "libsumo" and "gui" in os.path.basename(cmd[0]):
+            print("sumo-gui needs traci, using traci instead of libsumo.")
+            self.select("traci")
+        return self.module.start(cmd, *args, **kwargs)
+
+    def __getattr__(self, attribute):
+        # only called for attributes that are not set on the handle itself
+        if self.module is None:
+            self.select()
+        value = getattr(self.module, attribute)
+        if self.tracer is None:
+            return value
+        traced = self.traced.get(attribute)
+        if traced is None:
+            if attribute in DOMAINS:
+                traced = TracedDomain(attribute, value, self.tracer)
+            elif callable(value) and not isinstance(value, type):
+                traced = traced_call("", attribute, value, self.tracer)
+            else:
+                return value
+            self.traced[attribute] = traced
+        return traced
+
+
+traci = SumoBackend()
+
+
+def select_backend(name=None):
+    """
+    Selects the backend of the shared handle, see SumoBackend.select.
+    """
+    return traci.select(name)
+
+
+def enable_tracing(output_file=None):
+    """
+    Enables call tracing on the shared handle, see SumoBackend.enable_tracing.
+    """
+    return traci.enable_tracing(output_file)
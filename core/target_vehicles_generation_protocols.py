@@ -10,9 +10,13 @@
 import random
 import os
 import sys
+import bisect
 import xml.dom.minidom 
+import numpy as np
 from core import Util
-from core import network_map_data_structures
+from core import network_cache
+from core import random_trips
+from core.reachability import ReachabilityIndex
 
 
 # CHECK VERSION INFORMATION AND SET UP VERSION REFERENCE VARIABLES:
@@ -20,10 +24,8 @@ CURRENT_PY_VERSION = None
 PY_VERSION3 = 3
 PY_VERSION2 = 2.7
 if sys.version_info.major == 3:
-    print("Python 3...")    # TODO: After testing, comment out this line, if appropriate.
     CURRENT_PY_VERSION = PY_VERSION3
 elif sys.version_info.major == 2 and sys.version_info.minor == 7:
-    print("Python 2.7...")  # TODO: After testing, comment out this line, if appropriate.
     CURRENT_PY_VERSION = PY_VERSION2
 else:
     sys.exit("This python version is outdated for the project! Upgrade to python 2.7 or higher!")
@@ -35,10 +37,6 @@ if 'SUMO_HOME' in os.environ:
 else:
     sys.exit("No environment variable SUMO_HOME!")
 
-from sumolib import checkBinary
-import traci
-import sumolib
-
 
 
 
@@ -63,17 +61,38 @@ class target_vehicles_generator:
     def __init__(self, net_file):
         """
             :param @net_file<str>: The name of the network file (in the form of XML)
+
+            The edge tables are built from the network cache (see core.network_cache). Paths are
+            validated with the reachability index of the network (see core.reachability), which
+            follows the arcs passenger vehicles can take; the sumolib network is only read on request.
         """
-        self.length_dict = None
-        self.out_dict = None
-        self.index_dict = None
-        self.edge_list = None
-        self.net = network_map_data_structures.getNetInfo(net_file)
-        [self.length_dict, self.out_dict, self.index_dict, self.edge_list] = network_map_data_structures.getEdgesInfo(self.net)
+        self.net_file = net_file
+        self.sumolib_net = None
+        connection_info = Util.ConnectionInfo(net_file)
+        self.connection_info = connection_info
+        self.length_dict = dict(connection_info.edge_length_dict)
+        self.out_dict = {edge_id: dict(outgoing_edges) for edge_id, outgoing_edges
+                         in connection_info.outgoing_edges_dict.items()}
+        self.index_dict = dict(connection_info.edge_index_dict)
+        self.edge_list = [network_cache.NetworkEdge(edge_id) for edge_id in connection_info.edge_list]
+        self.reachability = ReachabilityIndex(connection_info)
 
         self.__current_target_xml_file__ = ""
 
 
+    @property
+    def net(self):
+        """
+            The sumolib.net.Net of the network file, read on first use.
+        """
+        if self.sumolib_net is None:
+            self.sumolib_net = network_cache.read_sumolib_net(self.net_file)
+        return self.sumolib_net
+
+    @net.setter
+    def net(self, net):
+        self.sumolib_net = net
+
     def generate_target_vehicles(self, num_vehicles, target_xml_file, pattern=None):
         """
             param @num_vehicles <int>: the number of target-vehicles desired.
@@ -107,21 +126,25 @@ class target_vehicles_generator:
         __error_message__ = None
         # Call appropriate member functions according to the pattern specified:
         if type(pattern) is tuple:
-            if type(pattern[0]) is sumolib.net.edge.Edge:
-                if type(pattern[1]) is sumolib.net.edge.Edge:
+            if is_edge(pattern[0]):
+                if is_edge(pattern[1]):
                     # -- CASE 1. --
-                    vehicles_info = None
-                    while vehicles_info is None:
-                        vehicles_info = self.generate_with_one_start_one_dest(num_vehicles, pattern[0], pattern[1])
+                    vehicles_info = self.generate_with_one_start_one_dest(num_vehicles, pattern[0], pattern[1])
+                    if vehicles_info is None:
+                        __error_message__ = "Invalid pattern for generating random vehicles: There is no path from " + pattern[0].getID() + " to " + pattern[1].getID() + "!"
                 else:
                     __error_message__ = "Invalid pattern for generating random vehicles: The 1st element of " + str(pattern) + " is not an instance of sumolib.net.edge.Edge!"
             elif type(pattern[0]) is list:
-                if type(pattern[1]) is sumolib.net.edge.Edge:
+                if is_edge(pattern[1]):
                     # -- CASE 2. --
                     vehicles_info = self.generate_with_ranged_starts_one_dest(num_vehicles, pattern[0], pattern[1])
+                    if vehicles_info is None:
+                        __error_message__ = "Invalid pattern for generating random vehicles: There is no path from any start-point of " + str(pattern) + " to its destination!"
                 elif type(pattern[1]) is list:
                     # -- CASE 3. --
                     vehicles_info = self.generate_with_ranged_starts_ranged_dests(num_vehicles, pattern[0], pattern[1])
+                    if vehicles_info is None:
+                        __error_message__ = "Invalid pattern for generating random vehicles: There is no path from any start-point of " + str(pattern) + " to any of its destinations!"
                 else:
                     __error_message__ = "Invalid pattern for generating random vehicles: The 1st element of " + str(pattern) + " is not an instance of sumolib.net.edge.Edge or a list of such instances!"
             else:
@@ -129,6 +152,8 @@ class target_vehicles_generator:
         elif pattern == None:
             # -- Case 4. --
             vehicles_info = self.generate_with_rand_starts_rand_dests(num_vehicles)
+            if vehicles_info is None:
+                __error_message__ = "Invalid pattern for generating random vehicles: There is no path between any two edges of the network!"
         else:
             __error_message__ = "Invalid pattern for generating random vehicles: " + str(pattern) + " is not a tuple!"
         
@@ -170,7 +195,7 @@ class target_vehicles_generator:
         # TODO: Generate vehicle ID's:
         current_ID = target_vehicles_generator.target_vehicles_output_dict[self.__current_target_xml_file__]
         end_ID = current_ID + num_vehicles
-        if not validate_path(self.net, start_point, destination):
+        if not validate_path(self.reachability, start_point, destination):
             
             ### UNCOMMENT TO DEBUG ###
             print("No path from", start_point.getID(), "to", destination.getID())
@@ -197,6 +222,8 @@ class target_vehicles_generator:
             Function to generate @num_vehicles sets of target-vehicle information,
             stored in @vehicles_info. Each target-vehicle is generated with a randomly
             selected start-point from @start_point_lst and with the destination @destination.
+            Only the start-points with a path to @destination are drawn from. If the returned
+            value is None, there is no path from any of them to @destination.
             
             IMPORTANT: This function should only be called in contexts that assign a file
             name (type <str>) to @target_vehicles_generator.__current_target_xml_file__.
@@ -206,29 +233,24 @@ class target_vehicles_generator:
             to the wrong target-xml output file.
         """
         vehicles_info = []
+        # Keep the start-points with a path to the destination:
+        valid_start_point_lst = [start_point for start_point in start_point_lst
+                                 if validate_path(self.reachability, start_point, destination)]
+        if not valid_start_point_lst:
+            print("No path from any start-point to", destination.getID())
+            return None
+
         # Generate @num_vehicle start-points using a random choice function:
         assigned_start_point_lst = None
         if CURRENT_PY_VERSION == PY_VERSION3:
-            assigned_start_point_lst = random.choices(start_point_lst, k=num_vehicles)
+            assigned_start_point_lst = random.choices(valid_start_point_lst, k=num_vehicles)
         else: # CURRENT_PY_VERSION == PY_VERSION2
-            assigned_start_point_lst = __random_choices_with_rp__(start_point_lst, num_vehicles)
+            assigned_start_point_lst = __random_choices_with_rp__(valid_start_point_lst, num_vehicles)
         
         # TODO: Generate vehicle ID's:
         current_ID = target_vehicles_generator.target_vehicles_output_dict[self.__current_target_xml_file__]
-        i = 0
-        while i < num_vehicles:
-            valid_pair = True
-            if not validate_path(self.net, assigned_start_point_lst[i], destination):
-                valid_pair = False
-                
-                ### UNCOMMENT TO DEBUG ###
-                print("No path from", assigned_start_point_lst[i].getID(), "to", destination.getID())
-                
-                assigned_start_point_lst[i] = random.choice(start_point_lst)
-                continue
-            
-            vehicles_info.append( (current_ID + i, (assigned_start_point_lst[i], destination), valid_pair) )
-            i += 1
+        for i in range(num_vehicles):
+            vehicles_info.append( (current_ID + i, (assigned_start_point_lst[i], destination), True) )
         
         # TODO: The tuple elements for the information of a vehicle are to be determined.
         return vehicles_info
@@ -248,7 +270,9 @@ class target_vehicles_generator:
             Function to generate @num_vehicles sets of target-vehicle information,
             stored in @vehicles_info. Each target-vehicle is generated with a randomly
             selected start-point from @start_point_lst and with a randomly selected
-            destination from @destination_lst.
+            destination from @destination_lst. The pairs are drawn uniformly from the pairs
+            with a path from the start-point to the destination. If the returned value is
+            None, there is no such pair.
             
             IMPORTANT: This function should only be called in contexts that assign a file
             name (type <str>) to @target_vehicles_generator.__current_target_xml_file__.
@@ -258,33 +282,16 @@ class target_vehicles_generator:
             to the wrong target-xml output file.
         """
         vehicles_info = []
-        # Generate @num_vehicle start-points and destinations using a random choice function:
-        assigned_start_point_lst = None
-        assigned_destination_lst = None
-        if CURRENT_PY_VERSION == PY_VERSION3:
-            assigned_start_point_lst = random.choices(start_point_lst, k=num_vehicles)
-            assigned_destination_lst = random.choices(destination_lst, k=num_vehicles)
-        else:
-            assigned_start_point_lst = __random_choices_with_rp__(start_point_lst, num_vehicles)
-            assigned_destination_lst = __random_choices_with_rp__(destination_lst, num_vehicles)
+        # Generate @num_vehicle pairs of start-points and destinations with a path between them:
+        pairs = self.sample_reachable_pairs(start_point_lst, destination_lst, num_vehicles)
+        if pairs is None:
+            print("No path from any start-point to any destination")
+            return None
         
         # TODO: Generate vehicle ID's:
         current_ID = target_vehicles_generator.target_vehicles_output_dict[self.__current_target_xml_file__]
-        i = 0
-        while i < num_vehicles:
-            valid_pair = True
-            if not validate_path(self.net, assigned_start_point_lst[i], assigned_destination_lst[i]):
-                valid_pair = False
-                
-                ### UNCOMMENT TO DEBUG ###
-                print("No path from", assigned_start_point_lst[i].getID(), "to", assigned_destination_lst[i].getID())
-                
-                assigned_start_point_lst[i] = random.choice(start_point_lst)
-                assigned_destination_lst[i] = random.choice(destination_lst)
-                continue
-            
-            vehicles_info.append( (current_ID + i, (assigned_start_point_lst[i], assigned_destination_lst[i]), valid_pair) )
-            i += 1
+        for i, pair in enumerate(pairs):
+            vehicles_info.append( (current_ID + i, pair, True) )
         
         # TODO: The tuple elements for the information of a vehicle are to be determined.
         return vehicles_info
@@ -300,7 +307,9 @@ class target_vehicles_generator:
             Function to generate @num_vehicles sets of target-vehicle information,
             stored in @vehicles_info. Each target-vehicle is generated with a randomly
             selected start-point from @target_vehicles_generator.edge_list and with a
-            randomly selected destination from @target_vehicles_generator.edge_list.
+            randomly selected destination from @target_vehicles_generator.edge_list. The pairs
+            are drawn uniformly from the pairs of different edges with a path between them.
+            If the returned value is None, there is no such pair.
             
             IMPORTANT: This function should only be called in contexts that assign a file
             name (type <str>) to @target_vehicles_generator.__current_target_xml_file__.
@@ -314,17 +323,48 @@ class target_vehicles_generator:
         # Generate @num_vehicle tuple-pairs of start_points and destinations:
         # TODO: Generate vehicle ID's:
         current_ID = target_vehicles_generator.target_vehicles_output_dict[self.__current_target_xml_file__]
-        i = 0
-        while i < num_vehicles:
-            pair = random.sample(self.edge_list, 2)
-            if validate_path(self.net, pair[0], pair[1]):
-                vehicles_info.append( (current_ID + i, pair, True) )
-                i += 1
-            ### UNCOMMENT TO DEBUG ###
-            #else:
-                #print("No path from", pair[0].getID(), "to", pair[1].getID())
+        pairs = self.sample_reachable_pairs(self.edge_list, self.edge_list, num_vehicles, distinct=True)
+        if pairs is None:
+            return None
+        for i, pair in enumerate(pairs):
+            vehicles_info.append( (current_ID + i, list(pair), True) )
                 
         return vehicles_info
+
+
+    def sample_reachable_pairs(self, start_point_lst, destination_lst, num_pairs, distinct=False):
+        """
+            param @start_point_lst <list>: a list of start-points.
+            param @destination_lst <list>: a list of destinations.
+            param @num_pairs <int>: the number of pairs desired.
+            param @distinct <bool>: if True, @start_point_lst and @destination_lst are the same list
+                                    and a start-point is never paired with its own entry.
+
+            Returns @num_pairs (start-point, destination) tuples drawn independently and uniformly
+            from the pairs of entries of the two lists with a path from the start-point to the
+            destination, or None if there is no such pair. A start-point is drawn with a weight of
+            the number of destinations it reaches, then one of those destinations, so no pair is
+            ever rejected.
+        """
+        start_indices = [self.index_dict[start_point.getID()] for start_point in start_point_lst]
+        destination_indices = [self.index_dict[destination.getID()] for destination in destination_lst]
+        reached_counts = self.reachability.pair_counts(start_indices, destination_indices)[0]
+        if distinct:
+            # every edge reaches itself
+            reached_counts = reached_counts - 1
+        cumulative_counts = np.cumsum(reached_counts).tolist()
+        if not cumulative_counts or cumulative_counts[-1] == 0:
+            return None
+
+        pairs = []
+        for _ in range(num_pairs):
+            start = bisect.bisect_right(cumulative_counts, random.randrange(cumulative_counts[-1]))
+            reachable = self.reachability.reachable_matrix([start_indices[start]], destination_indices)[0]
+            if distinct:
+                reachable[start] = False
+            destination = random.choice(np.flatnonzero(reachable).tolist())
+            pairs.append( (start_point_lst[start], destination_lst[destination]) )
+        return pairs
     
     
     def random_select_edge_IDs(self, num_of_edges):
@@ -359,10 +399,14 @@ class target_vehicles_generator:
         
         target_vehicles_generator.target_vehicles_output_dict[target_xml_file] = 0
 
-    def generate_vehicles(self, num_target_vehicles, num_random_vehicles, pattern, target_xml_file, net_xml_file):
+    def generate_vehicles(self, num_target_vehicles, num_random_vehicles, pattern, target_xml_file, net_xml_file,
+                          random_seed=random_trips.RANDOM_TRIPS_SEED):
         """
             param @num_target_vehicles <int>: The number of target vehicles.
             param @num_random_vehicles <int>: The number of uncontrolled vehicles.
+            param @random_seed <int>: The seed of the uncontrolled vehicles. The default is the fixed
+                                      seed randomTrips.py uses, so they do not depend on the state of
+                                      the random module.
             param @pattern <tuple>: one of three possible patterns. FORMAT:
             -- CASES BEGIN --
                 #1. one start point, one destination for all target vehicles
@@ -378,51 +422,51 @@ class target_vehicles_generator:
         #set the start time as 0 (by default) and the end time as 50
         #calculate the density of vehicles accordingly
         latest_release_time = 50.0 #a constant number for the latest release time of all vehicles
-        num_random_vehicles *= 2 # this is done to compensate the loss when generating using scripts. Need to solve this later.
+        num_random_vehicles *= 2 # this is done to compensate the loss of the trips without a path. Need to solve this later.
         density =  latest_release_time / float(num_random_vehicles)
         density = int(density * 100)/100.0
-        #copy the file randomTrips.py to the current directory
-        command_str = "cp $SUMO_HOME/tools/randomTrips.py ./"
-        if os.system(command_str) != 0:
-            print("ERROR: Failed to copy randomTrips.py to current directory.")
-            return None
-        #invoke randomTrips.py
-        command_str = "./randomTrips.py -n "+net_xml_file+" -e 50 -p "+str(density) +" -r "+target_xml_file
-        if os.system(command_str) != 0:
-            print("ERROR: Failed to invoke randomTrips.py.")
-            return None
-        #delete randomTrips.py
-        command_str = "rm ./randomTrips.py"
-        if os.system(command_str) != 0:
-            print("ERROR: Failed to remove randomTrips.py.")
+        #generate the uncontrolled vehicles in process, as randomTrips.py -n net_xml_file -e 50 -p density -r target_xml_file would
+        if os.path.abspath(net_xml_file) == os.path.abspath(self.net_file):
+            num_generated = random_trips.generate_random_trips(self.connection_info, target_xml_file, density,
+                                                               end=latest_release_time, seed=random_seed,
+                                                               reachability=self.reachability)
+        else:
+            num_generated = random_trips.generate_random_trips(Util.ConnectionInfo(net_xml_file), target_xml_file,
+                                                               density, end=latest_release_time, seed=random_seed)
+        if num_generated is None:
+            print("ERROR: Failed to generate the uncontrolled vehicles.")
             return None
         #insert the generated vehicles into the xml file
         #use id to find the vehicles and modify their information directly
         result_dict = None
         if pattern==1:
-            param_start = random.choice(self.edge_list)
-            param_dest = random.choice(self.edge_list)
-            while not validate_path(self.net, param_start, param_dest):
-                param_start = random.choice(self.edge_list)
-                param_dest = random.choice(self.edge_list)
-                ### UNCOMMENT TO DEBUG ###
-                #print("DEBUG: pattern 1 regenerating.")
+            # a start point and a destination with a path between them, drawn directly from the reachable pairs
+            param_start, param_dest = self.sample_reachable_pairs(self.edge_list, self.edge_list, 1)[0]
             result_dict = self.generate_target_vehicles(num_target_vehicles, target_xml_file, (param_start, param_dest) )
         elif pattern==2:
-            param_start = __random_choices_with_rp__(self.edge_list, num_target_vehicles*2)
-            param_dest = random.choice(self.edge_list)
-            #all pairs must be valid
-            while not validate_path_start_points(self.net, param_start, param_dest):
-                param_start = __random_choices_with_rp__(self.edge_list, num_target_vehicles*2)
-                param_dest = random.choice(self.edge_list)
-                ### UNCOMMENT TO DEBUG ###
-                #print("DEBUG: pattern 2 regenerating.")
+            #the first half of the start points must have a path to the destination (see validate_path_start_points);
+            #the destination is drawn with a weight of the chance of that, then the start points are drawn directly
+            num_start_points = num_target_vehicles*2
+            num_checked = max(1, -(-num_start_points // 2))
+            edge_indices = [self.index_dict[edge.getID()] for edge in self.edge_list]
+            reaching_counts = self.reachability.pair_counts(edge_indices, edge_indices)[1].tolist()
+            cumulative_weights = []
+            total_weight = 0
+            for reaching_count in reaching_counts:
+                total_weight += reaching_count ** num_checked # exact integer weights
+                cumulative_weights.append(total_weight)
+            dest = bisect.bisect_right(cumulative_weights, random.randrange(total_weight))
+            param_dest = self.edge_list[dest]
+            reaching = self.reachability.reachable_matrix(edge_indices, [edge_indices[dest]])[:, 0]
+            reaching_edges = [self.edge_list[i] for i in np.flatnonzero(reaching).tolist()]
+            param_start = __random_choices_with_rp__(reaching_edges, num_checked) + \
+                __random_choices_with_rp__(self.edge_list, num_start_points - num_checked)
             result_dict = self.generate_target_vehicles(num_target_vehicles, target_xml_file, (param_start, param_dest) )
         elif pattern==3:
             param_start = __random_choices_with_rp__(self.edge_list, num_target_vehicles*2)
             param_dest = __random_choices_with_rp__(self.edge_list, num_target_vehicles*2)
             #at least one group of start points and one destination is valid towards each other
-            while not validate_path_starts_ends(self.net, param_start, param_dest):
+            while not validate_path_starts_ends(self.reachability, param_start, param_dest):
                 param_start = __random_choices_with_rp__(self.edge_list, num_target_vehicles*2)
                 param_dest = __random_choices_with_rp__(self.edge_list, num_target_vehicles*2)
                 ### UNCOMMENT TO DEBUG ###
@@ -488,32 +532,34 @@ class target_vehicles_generator:
     
 def validate_path(net, start_point, destination):
     """
-        param @net <sumolib.net.Net>: parameter that stores the information of a map.
-        param @start_point <sumolib.net.edge.Edge>: a start-point on the map from @net.
-        param @destination <sumolib.net.edge.Edge>: a destination on the map from @net.
+        param @net <reachability.ReachabilityIndex or sumolib.net.Net>: parameter that stores the information of a map.
+        param @start_point <sumolib.net.edge.Edge or network_cache.NetworkEdge>: a start-point on the map from @net.
+        param @destination <sumolib.net.edge.Edge or network_cache.NetworkEdge>: a destination on the map from @net.
         
         Function to validate the existence of a path from @start_point to @destination,
-        using the shortest path algorithm offered by @net; returns True if such a path
+        with a lookup in the reachability index, or using the shortest path algorithm
+        offered by @net if it is a sumolib network; returns True if such a path
         exists, and False otherwise.
         
     """
-    shortestPath = net.getShortestPath(start_point, destination)
+    if isinstance(net, ReachabilityIndex):
+        return net.reachable_edge(start_point.getID(), destination.getID())
+    shortestPath = net.getShortestPath(net.getEdge(start_point.getID()), net.getEdge(destination.getID()))
     return shortestPath[0] != None
     
 def validate_path_start_points(net, start_points, destination):
     """
-        param @net <sumolib.net.Net>: parameter that stores the information of a map.
+        param @net <reachability.ReachabilityIndex or sumolib.net.Net>: parameter that stores the information of a map.
         param @start_point <list of sumolib.net.edge.Edge>: a list of start-points on the map from @net.
         param @destination <sumolib.net.edge.Edge>: a destination on the map from @net.
         
         Function to validate the existence of a path from @start_point to @destination,
-        using the shortest path algorithm offered by @net; returns True if such a path
-        exists, and False otherwise.
+        see validate_path; returns True if such a path exists from the first half of
+        @start_points, and False otherwise.
     """
     num = 0
     for s in start_points:
-        shortest_path = net.getShortestPath(s, destination)
-        if shortest_path[0]==None:
+        if not validate_path(net, s, destination):
             return False
         num += 1
         if num >= len(start_points)/2:
@@ -522,13 +568,13 @@ def validate_path_start_points(net, start_points, destination):
 
 def validate_path_starts_ends(net, start_points, destinations):
     """
-        param @net <sumolib.net.Net>: parameter that stores the information of a map.
+        param @net <reachability.ReachabilityIndex or sumolib.net.Net>: parameter that stores the information of a map.
         param @start_point <list of sumolib.net.edge.Edge>: a list of start-points on the map from @net.
         param @destination <list of sumolib.net.edge.Edge>: a destination on the map from @net.
         
         Function to validate the existence of a path from @start_point to @destination,
-        using the shortest path algorithm offered by @net; returns True if such a path
-        exists, and False otherwise.
+        see validate_path_start_points; returns True if such a path exists for one of
+        @destinations, and False otherwise.
     """
     for d in destinations:
         if validate_path_start_points(net, start_points, d):
@@ -536,6 +582,13 @@ def validate_path_starts_ends(net, start_points, destinations):
     return False
     
 # Auxiliary Functions:
+def is_edge(value):
+    """
+        Returns True if @value is an edge accepted in a pattern: a sumolib.net.edge.Edge, or a
+        network_cache.NetworkEdge of the tables built from the network cache.
+    """
+    return not isinstance(value, (list, tuple, str)) and hasattr(value, "getID")
+
 def __random_choices_with_rp__(lst, k=1):
     """
         param @lst <list>: a list of elements.
@@ -0,0 +1,116 @@
+"""
+    This file contains the TraCI call tracer. When tracing is enabled on
+    the SUMO handle (see core.sumo_backend), every call through the handle
+    is counted and timed by domain, method and caller, so the code paths
+    that still make one round trip per edge or vehicle show up in the
+    summary written at the end of StrSumo.run.
+"""
+
+import sys
+import time
+from collections import defaultdict
+
+
+class TraciTracer:
+    """
+    Call counts and latencies of the SUMO handle, keyed by (caller, domain, method). The caller is the class of the
+    method that made the call (e.g. StrSumo, EdgeStatisticsCollector, DensityDijkstraPolicy), or its module for a
+    plain function. Steps are counted by simulationStep calls.
+        - calls, seconds totals per key
+        - max_step_calls highest number of calls per key in a single step
+    :param output_file: file the summary is also written to, if set
+    """
+    def __init__(self, output_file=None):
+        self.output_file = output_file
+        self.steps = 0
+        self.calls = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self.max_step_calls = defaultdict(int)
+        self.step_calls = defaultdict(int)
+
+    def record(self, domain, method, seconds):
+        """
+        Records one call; the caller is found two frames up, above the traced wrapper.
+        """
+        key = (self.caller(sys._getframe(2)), domain, method)
+        self.calls[key] += 1
+        self.seconds[key] += seconds
+        self.step_calls[key] += 1
+        if method == "simulationStep":
+            self.end_step()
+
+    @staticmethod
+    def caller(frame):
+        instance = frame.f_locals.get("self")
+        if instance is not None:
+            return type(instance).__name__
+        return frame.f_globals.get("__name__", "?")
+
+    def end_step(self):
+        for key, calls in self.step_calls.items():
+            if calls > self.max_step_calls[key]:
+                self.max_step_calls[key] = calls
+        self.step_calls.clear()
+        self.steps += 1
+
+    def summary(self):
+        """
+        :return: the summary table, one line per (caller, domain, method) sorted by total time
+        """
+        steps = max(self.steps, 1)
+        lines = ["TraCI calls over {} steps".format(self.steps),
+                 "{:<28} {:<40} {:>9} {:>9} {:>8} {:>10} {:>9}".format(
+                     "caller", "method", "calls", "per step", "max", "total ms", "mean us")]
+        for key in sorted(self.calls, key=lambda key: self.seconds[key], reverse=True):
+            caller, domain, method = key
+            calls = self.calls[key]
+            lines.append("{:<28} {:<40} {:>9} {:>9.1f} {:>8} {:>10.1f} {:>9.1f}".format(
+                caller, "{}.{}".format(domain, method) if domain else method, calls, calls / steps,
+                max(self.max_step_calls[key], self.step_calls.get(key, 0)), self.seconds[key] * 1e3,
+                self.seconds[key] / calls * 1e6))
+        total_calls = sum(self.calls.values())
+        lines.append("total: {} calls, {:.1f} per step, {:.1f} ms".format(
+            total_calls, total_calls / steps, sum(self.seconds.values()) * 1e3))
+        return "\n".join(lines)
+
+    def write_summary(self):
+        """
+        Prints the summary, and writes it to output_file if set.
+        """
+        summary = self.summary()
+        print(summary)
+        if self.output_file:
+            try:
+                with open(self.output_file, "w") as f:
+                    f.write(summary + "\n")
+            except OSError as err:
+                print("Could not write the TraCI call summary: {}".format(err))
+
+
+class TracedDomain:
+    """
+    Wraps a TraCI domain (traci.vehicle, traci.edge, ...) so every method call is recorded by the tracer.
+    """
+    def __init__(self, name, domain, tracer):
+        self.name = name
+        self.domain = domain
+        self.tracer = tracer
+
+    def __getattr__(self, attribute):
+        value = getattr(self.domain, attribute)
+        if not callable(value) or isinstance(value, type):
+            return value
+        traced = traced_call(self.name, attribute, value, self.tracer)
+        # later lookups find the wrapper without going through __getattr__
+        setattr(self, attribute, traced)
+        return traced
+
+
+def traced_call(domain, method, function, tracer):
+    def traced(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            tracer.record(domain, method, time.perf_counter() - start)
+    return traced
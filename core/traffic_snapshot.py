@@ -0,0 +1,81 @@
+"""
+    This file contains the per-step traffic snapshot shared by the routing
+    policies. StrSumo builds one snapshot per simulation step from the edge
+    subscriptions, so controllers read the traffic state from arrays
+    instead of making their own TraCI calls for every edge.
+"""
+
+import os
+import sys
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("No environment variable SUMO_HOME!")
+import numpy as np
+from core.sumo_backend import traci
+
+
+def edge_length_array(connection_info):
+    """
+    :return: float64 array of the edge lengths, indexed by edge index
+    """
+    return np.array([connection_info.edge_length_dict[edge_id] for edge_id in connection_info.edge_ids])
+
+
+class TrafficSnapshot:
+    """
+    Read-only traffic state of every edge at one simulation step. The arrays are indexed by edge index and
+    cannot be written to; edges outside edge_list are 0.
+        - time simulation time of the step
+        - vehicle_number number of vehicles on the edge
+        - mean_speed mean speed of the vehicles on the edge (the maximum speed if there are none)
+        - occupancy occupancy of the edge in percent
+        - vehicle_length mean length of the vehicles on the edge
+        - edge_lengths length of the edge
+        - density vehicles per meter of the edge
+    """
+    def __init__(self, time, vehicle_number, mean_speed, occupancy, vehicle_length, edge_lengths):
+        self.time = time
+        self.vehicle_number = self.read_only(vehicle_number)
+        self.mean_speed = self.read_only(mean_speed)
+        self.occupancy = self.read_only(occupancy)
+        self.vehicle_length = self.read_only(vehicle_length)
+        self.edge_lengths = self.read_only(edge_lengths)
+        self.density = self.read_only(self.vehicle_number / np.where(self.edge_lengths > 0, self.edge_lengths, 1))
+
+    @staticmethod
+    def read_only(values):
+        values = np.array(values)
+        values.flags.writeable = False
+        return values
+
+    @classmethod
+    def from_statistics(cls, time, edge_statistics, edge_lengths):
+        """
+        Builds the snapshot of the current step from an EdgeStatisticsCollector after its update().
+        :param time: simulation time of the step
+        :param edge_lengths: float64 array of the edge lengths, see edge_length_array
+        """
+        return cls(time, edge_statistics.vehicle_number, edge_statistics.mean_speed, edge_statistics.occupancy,
+                   edge_statistics.vehicle_length, edge_lengths)
+
+    @classmethod
+    def from_traci(cls, connection_info):
+        """
+        Builds the snapshot of the current step with one TraCI query per edge and value, for controllers that are
+        used without StrSumo.
+        """
+        edge_count = len(connection_info.edge_ids)
+        vehicle_number = np.zeros(edge_count, dtype=np.int32)
+        mean_speed = np.zeros(edge_count)
+        occupancy = np.zeros(edge_count)
+        vehicle_length = np.zeros(edge_count)
+        for edge in connection_info.edge_list:
+            index = connection_info.edge_index_dict[edge]
+            vehicle_number[index] = traci.edge.getLastStepVehicleNumber(edge)
+            mean_speed[index] = traci.edge.getLastStepMeanSpeed(edge)
+            occupancy[index] = traci.edge.getLastStepOccupancy(edge)
+            vehicle_length[index] = traci.edge.getLastStepLength(edge)
+        return cls(traci.simulation.getTime(), vehicle_number, mean_speed, occupancy, vehicle_length,
+                   edge_length_array(connection_info))
@@ -0,0 +1,57 @@
+'''
+Reports the import time of the testbed modules, each measured in a fresh interpreter with python -X importtime,
+with the slowest imports it pulls in. Run it from the main repository:
+    python import_time_report.py [module ...]
+'''
+import subprocess
+import sys
+
+DEFAULT_MODULES = ["core.Util", "core.STR_SUMO", "core.target_vehicles_generation_protocols", "controller.registry",
+                   "controller.DijkstraController", "controller.HeuristicController",
+                   "controller.FloydWarshallController", "controller.QLearningController"]
+
+# known imports that are not deferred, printed with the modules that pull them in
+IMPORT_NOTES = {
+    "core.STR_SUMO": "traci and sumolib are loaded through traci.constants with either backend; libsumo imports "
+                     "both itself, so selecting it does not avoid them",
+    "core.edge_statistics": "traci and sumolib are loaded through traci.constants with either backend",
+}
+
+
+def import_times(module):
+    """
+    :return: (total import time of the module in microseconds, [(cumulative us, self us, imported module)]), or
+             (None, error output) if the import failed
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1:]
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative), int(self_time), name.strip()))
+    total = next((cumulative for cumulative, _, name in reversed(imports) if name == module), None)
+    return total, imports
+
+
+def report(modules, top=8):
+    for module in modules:
+        total, imports = import_times(module)
+        if total is None:
+            print("{:<45} import failed: {}".format(module, " ".join(imports)))
+            continue
+        print("{:<45} {:>8.1f} ms".format(module, total / 1e3))
+        if module in IMPORT_NOTES:
+            print("    note: " + IMPORT_NOTES[module])
+        # the slowest imports made directly by packages outside the testbed
+        heaviest = sorted((entry for entry in imports if "." not in entry[2] and entry[2] != module),
+                          reverse=True)[:top]
+        for cumulative, _, name in heaviest:
+            print("    {:<41} {:>8.1f} ms".format(name, cumulative / 1e3))
+
+
+if __name__ == "__main__":
+    report(sys.argv[1:] or DEFAULT_MODULES)
@@ -8,7 +8,7 @@ import sys
 from xml.dom.minidom import parse, parseString
 from core.Util import *
 from controller.RouteController import *
-from controller.DijkstraController import DijkstraPolicy
+from controller.registry import create_controller
 from core.target_vehicles_generation_protocols import *
 
 if 'SUMO_HOME' in os.environ:
@@ -18,7 +18,7 @@ else:
     sys.exit("No environment variable SUMO_HOME!")
 
 from sumolib import checkBinary
-import traci
+from core.sumo_backend import traci
 
 
 # use vehicle generation protocols to generate vehicle list
@@ -51,7 +51,7 @@ def get_controlled_vehicles(route_filename, connection_info, \
 
 def test_dijkstra_policy(vehicles):
     print("Testing Dijkstra's Algorithm Route Controller")
-    scheduler = DijkstraPolicy(init_connection_info)
+    scheduler = create_controller("dijkstra", init_connection_info)
     run_simulation(scheduler, vehicles)
 
 
@@ -0,0 +1,66 @@
+'''
+This test file needs the following files:
+Util.py, test.net.xml and corresponding SUMO libraries.
+It checks that the array-backed (CSR) view of ConnectionInfo describes the same graph as its dictionaries.
+Run it from the main repository.
+'''
+from core.Util import ConnectionInfo, JAM_SPACING
+import sumolib
+
+connection_info = ConnectionInfo("./configurations/test.net.xml")
+
+
+def test_outgoing_arcs():
+    for edge_id, outgoing in connection_info.outgoing_edges_dict.items():
+        indices, directions = connection_info.outgoing_arcs(connection_info.edge_index_dict[edge_id])
+        assert [connection_info.edge_ids[i] for i in indices] == list(outgoing.values())
+        assert [connection_info.direction_list[d] for d in directions] == list(outgoing.keys())
+
+
+def test_incoming_arcs():
+    incoming = {edge_id: set() for edge_id in connection_info.edge_ids}
+    for edge_id, outgoing in connection_info.outgoing_edges_dict.items():
+        for direction, outgoing_edge in outgoing.items():
+            incoming[outgoing_edge].add((edge_id, direction))
+    for edge_id, expected in incoming.items():
+        indices, directions = connection_info.incoming_arcs(connection_info.edge_index_dict[edge_id])
+        found = {(connection_info.edge_ids[i], connection_info.direction_list[d]) for i, d in zip(indices, directions)}
+        assert found == expected
+
+
+def test_direction_table():
+    for edge_id, outgoing in connection_info.outgoing_edges_dict.items():
+        for direction, outgoing_edge in outgoing.items():
+            path = [edge_id, outgoing_edge]
+            found = connection_info.edge_id_path_directions(path)[0]
+            # the first direction leading to the outgoing edge
+            assert found == next(d for d, e in outgoing.items() if e == outgoing_edge)
+            assert outgoing[found] == outgoing_edge
+
+
+def test_edge_table():
+    for edge_id, index in connection_info.edge_index_dict.items():
+        assert connection_info.edge_ids[index] == edge_id
+        assert abs(connection_info.edge_lengths[index] - connection_info.edge_length_dict[edge_id]) < 1e-2
+        assert connection_info.passenger_mask[index] == (edge_id in connection_info.edge_list)
+
+
+def test_static_edge_attributes():
+    net = sumolib.net.readNet("./configurations/test.net.xml")
+    for edge in net.getEdges():
+        index = connection_info.edge_index_dict[edge.getID()]
+        lanes = edge.getLanes()
+        assert connection_info.edge_lane_counts[index] == len(lanes)
+        assert connection_info.edge_max_speeds[index] == max(lane.getSpeed() for lane in lanes)
+        assert abs(connection_info.edge_free_flow_times[index] * connection_info.edge_max_speeds[index]
+                   - edge.getLength()) < 1e-6
+        assert abs(connection_info.edge_capacities[index] - len(lanes) * edge.getLength() / JAM_SPACING) < 1e-6
+
+
+if __name__ == "__main__":
+    test_outgoing_arcs()
+    test_incoming_arcs()
+    test_direction_table()
+    test_edge_table()
+    test_static_edge_attributes()
+    print("TEST PASSED")
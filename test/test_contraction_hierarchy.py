@@ -0,0 +1,74 @@
+'''
+This test file needs the following files:
+Util.py, shortest_path_engine.py, contraction_hierarchy.py, test.net.xml and corresponding SUMO libraries.
+It checks that the paths of the contraction hierarchy cost the same as the paths of DijkstraEngine, for the edge
+lengths and for random weights customized one after another, and that a truncated order cache is computed again.
+Run it from the main repository.
+'''
+import os
+import random
+import tempfile
+import numpy as np
+from core.Util import ConnectionInfo
+from core.shortest_path_engine import DijkstraEngine
+from core.contraction_hierarchy import ContractionHierarchy
+
+connection_info = ConnectionInfo("./configurations/test.net.xml")
+engine = DijkstraEngine(connection_info)
+hierarchy = ContractionHierarchy(connection_info, order_cache_file="")
+
+
+def path_cost(path, weights):
+    # the cost of the entered edges, like a DijkstraEngine search without its start edge
+    return sum(weights[edge] for edge in path[1:])
+
+
+def check_paths(weights, seed):
+    hierarchy.customize(weights)
+    random.seed(seed)
+    for _ in range(100):
+        source = connection_info.edge_index_dict[random.choice(connection_info.edge_list)]
+        target = connection_info.edge_index_dict[random.choice(connection_info.edge_list)]
+        distance, _, _ = engine.search(source, target, weights)
+        path = hierarchy.shortest_path(source, target)
+        if distance[target] == float("inf"):
+            assert path == []
+            continue
+        assert path[0] == source and path[-1] == target
+        assert abs(path_cost(path, weights) - (distance[target] - weights[source])) < 1e-6
+
+        current_edge = connection_info.edge_ids[source]
+        for direction in hierarchy.shortest_path_directions(source, target):
+            current_edge = connection_info.outgoing_edges_dict[current_edge][direction]
+        assert current_edge == connection_info.edge_ids[target]
+
+
+def test_lengths():
+    check_paths(engine.lengths, 0)
+
+
+def test_customization():
+    random.seed(1)
+    for round_number in range(3):
+        weights = [length * random.uniform(1, 10) for length in engine.lengths]
+        check_paths(weights, round_number)
+
+
+def test_truncated_order_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        cache_file = os.path.join(directory, "test.net.xml.ch_order.npz")
+        ContractionHierarchy(connection_info, order_cache_file=cache_file)
+        size = os.path.getsize(cache_file)
+        with open(cache_file, "r+b") as f:
+            f.truncate(size // 2)
+        cached = ContractionHierarchy(connection_info, order_cache_file=cache_file)
+        assert np.array_equal(cached.order, hierarchy.order)
+        assert os.path.getsize(cache_file) == size
+        assert os.listdir(directory) == [os.path.basename(cache_file)]
+
+
+if __name__ == "__main__":
+    test_lengths()
+    test_customization()
+    test_truncated_order_cache()
+    print("TEST PASSED")
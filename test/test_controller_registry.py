@@ -0,0 +1,35 @@
+'''
+This test file needs the following files:
+registry.py, DijkstraController.py, Util.py, test.net.xml and corresponding SUMO libraries.
+It checks that policies are created by name and that unknown names are rejected.
+Run it from the main repository.
+'''
+from core.Util import ConnectionInfo
+from controller.registry import create_controller, load_controller, register_controller, controller_names
+
+connection_info = ConnectionInfo("./configurations/test.net.xml")
+
+
+def test_create_controller():
+    from controller.DijkstraController import DijkstraPolicy
+    policy = create_controller("dijkstra", connection_info)
+    assert type(policy) is DijkstraPolicy
+    assert policy.connection_info is connection_info
+
+
+def test_register_controller():
+    register_controller("shortest_path", "controller.DijkstraController", "DijkstraPolicy")
+    assert "shortest_path" in controller_names()
+    assert load_controller("shortest_path") is load_controller("dijkstra")
+    try:
+        load_controller("no such policy")
+    except ValueError:
+        pass
+    else:
+        assert False, "unknown controllers must be rejected"
+
+
+if __name__ == "__main__":
+    test_create_controller()
+    test_register_controller()
+    print("TEST PASSED")
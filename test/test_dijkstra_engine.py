@@ -0,0 +1,73 @@
+'''
+This test file needs the following files:
+Util.py, shortest_path_engine.py, test.net.xml and corresponding SUMO libraries.
+It checks that DijkstraEngine returns the same direction lists as the original dictionary-based Dijkstra
+used by DijkstraPolicy, and that its reverse shortest-path trees agree with forward searches.
+Run it from the main repository.
+'''
+import random
+from core.Util import ConnectionInfo
+from core.shortest_path_engine import DijkstraEngine
+
+connection_info = ConnectionInfo("./configurations/test.net.xml")
+engine = DijkstraEngine(connection_info)
+
+
+def reference_dijkstra(start_edge, destination):
+    """
+    The dictionary-based Dijkstra previously implemented in DijkstraPolicy.make_decisions.
+    """
+    unvisited = {edge: 1000000000 for edge in connection_info.edge_list}
+    current_edge = start_edge
+    current_distance = connection_info.edge_length_dict[current_edge]
+    unvisited[current_edge] = current_distance
+    path_lists = {edge: [] for edge in connection_info.edge_list}
+    while True:
+        for direction, outgoing_edge in connection_info.outgoing_edges_dict[current_edge].items():
+            if outgoing_edge not in unvisited:
+                continue
+            new_distance = current_distance + connection_info.edge_length_dict[outgoing_edge]
+            if new_distance < unvisited[outgoing_edge]:
+                unvisited[outgoing_edge] = new_distance
+                path_lists[outgoing_edge] = path_lists[current_edge] + [direction]
+        del unvisited[current_edge]
+        if not unvisited or current_edge == destination:
+            break
+        possible_edges = [edge for edge in unvisited.items() if edge[1]]
+        current_edge, current_distance = sorted(possible_edges, key=lambda x: x[1])[0]
+    return path_lists[destination]
+
+
+def test_shortest_path_directions():
+    random.seed(0)
+    for _ in range(30):
+        start_edge, destination = random.choice(connection_info.edge_list), random.choice(connection_info.edge_list)
+        directions = engine.shortest_path_directions(connection_info.edge_index_dict[start_edge],
+                                                     connection_info.edge_index_dict[destination])
+        assert directions == reference_dijkstra(start_edge, destination)
+
+
+def test_reverse_search():
+    random.seed(1)
+    for _ in range(10):
+        target = connection_info.edge_index_dict[random.choice(connection_info.edge_list)]
+        reverse_distance, next_edge, next_arc = engine.reverse_search(target)
+        for _ in range(10):
+            source = connection_info.edge_index_dict[random.choice(connection_info.edge_list)]
+            distance, _, _ = engine.search(source, target)
+            directions = engine.tree_directions(source, target, next_edge, next_arc)
+            if distance[target] == float("inf"):
+                assert directions == []
+                continue
+            # the forward cost includes the start edge, the reverse cost does not
+            assert abs(distance[target] - engine.lengths[source] - reverse_distance[source]) < 1e-6
+            current_edge = connection_info.edge_ids[source]
+            for direction in directions:
+                current_edge = connection_info.outgoing_edges_dict[current_edge][direction]
+            assert current_edge == connection_info.edge_ids[target]
+
+
+if __name__ == "__main__":
+    test_shortest_path_directions()
+    test_reverse_search()
+    print("TEST PASSED")
@@ -0,0 +1,40 @@
+'''
+This test file needs the following files:
+Util.py, all_pairs_shortest_paths.py, complex_grid1.net.xml and corresponding SUMO libraries.
+It checks that DynamicAllPairsEngine gives the same distances as a full Floyd-Warshall after a sequence of
+small weight changes. Run it from the main repository.
+'''
+import random
+import numpy as np
+from core.Util import ConnectionInfo
+from core.all_pairs_shortest_paths import FloydWarshallEngine, DynamicAllPairsEngine
+
+connection_info = ConnectionInfo("./configurations/maps/complex_grid1.net.xml")
+
+
+def test_incremental_updates():
+    random.seed(0)
+    dynamic_engine = DynamicAllPairsEngine(connection_info, rebuild_threshold=0.2)
+    full_engine = FloydWarshallEngine(connection_info)
+    weights = np.array([random.uniform(1, 20) for _ in range(dynamic_engine.edge_count)], dtype=np.float32)
+    dynamic_engine.update_weights(weights)
+
+    for _ in range(20):
+        for edge in random.sample(range(dynamic_engine.edge_count), 3):
+            weights[edge] = random.uniform(1, 40)
+        distance = dynamic_engine.update_weights(weights)
+        expected = full_engine.compute(weights)
+        assert np.array_equal(np.isinf(distance), np.isinf(expected))
+        finite = np.isfinite(expected)
+        assert np.allclose(distance[finite], expected[finite], rtol=1e-4)
+
+        # every next hop path must have the cost stored in the distance matrix
+        for i, j in zip(*np.nonzero(finite)):
+            path = dynamic_engine.path(i, j)
+            cost = sum(float(weights[edge]) for edge in path[:-1])
+            assert abs(cost - distance[i][j]) <= 1e-3 * max(1.0, cost)
+
+
+if __name__ == "__main__":
+    test_incremental_updates()
+    print("TEST PASSED")
@@ -0,0 +1,61 @@
+'''
+This test file needs the following files:
+Util.py, all_pairs_shortest_paths.py, simple_grid1.net.xml and corresponding SUMO libraries.
+It checks FloydWarshallEngine against the pure Python Floyd-Warshall previously used by FloydWarshallPolicy.
+Run it from the main repository.
+'''
+import random
+import numpy as np
+from core.Util import ConnectionInfo
+from core.all_pairs_shortest_paths import FloydWarshallEngine
+
+connection_info = ConnectionInfo("./configurations/maps/simple_grid1.net.xml")
+engine = FloydWarshallEngine(connection_info)
+
+random.seed(0)
+weights = np.zeros(engine.edge_count, dtype=np.float32)
+for edge in connection_info.edge_list:
+    weights[connection_info.edge_index_dict[edge]] = random.uniform(1, 20)
+
+
+def reference_floyd_warshall():
+    inf = float("inf")
+    n = engine.edge_count
+    distance = [[inf if i != j else 0 for i in range(n)] for j in range(n)]
+    for edge in connection_info.edge_list:
+        idx1 = connection_info.edge_index_dict[edge]
+        for direction, outgoing_edge in connection_info.outgoing_edges_dict[edge].items():
+            distance[idx1][connection_info.edge_index_dict[outgoing_edge]] = float(weights[idx1])
+    for k in range(n):
+        for i in range(n):
+            for j in range(n):
+                if distance[i][k] + distance[k][j] < distance[i][j]:
+                    distance[i][j] = distance[i][k] + distance[k][j]
+    return distance
+
+
+def test_distances():
+    distance = engine.compute(weights)
+    expected = np.array(reference_floyd_warshall())
+    assert np.array_equal(np.isinf(distance), np.isinf(expected))
+    finite = np.isfinite(expected)
+    assert np.allclose(distance[finite], expected[finite], rtol=1e-5)
+
+
+def test_paths():
+    distance = engine.compute(weights)
+    for i in range(engine.edge_count):
+        for j in range(engine.edge_count):
+            path = engine.path(i, j)
+            if np.isinf(distance[i][j]):
+                assert path == []
+                continue
+            assert path[0] == i and path[-1] == j
+            cost = sum(float(weights[edge]) for edge in path[:-1])
+            assert abs(cost - distance[i][j]) <= 1e-4 * max(1.0, cost)
+
+
+if __name__ == "__main__":
+    test_distances()
+    test_paths()
+    print("TEST PASSED")
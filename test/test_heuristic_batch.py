@@ -0,0 +1,70 @@
+'''
+This test file needs the following files:
+RouteController.py, HeuristicController.py, Util.py, shortest_path_engine.py, reachability.py, traffic_snapshot.py,
+test.net.xml and corresponding SUMO libraries.
+It checks that the batch mode of HeuristicPolicy, which reads the routes from reverse shortest-path trees, finds
+routes of the same travel-time cost as its A* searches, so the routes only differ where they tie, and the same local
+targets where the routes are the same.
+Run it from the main repository.
+'''
+import random
+import numpy as np
+from core.Util import ConnectionInfo, Vehicle
+from core.reachability import ReachabilityIndex
+from core.traffic_snapshot import TrafficSnapshot, edge_length_array
+from controller.HeuristicController import HeuristicPolicy
+
+connection_info = ConnectionInfo("./configurations/test.net.xml")
+
+
+def traffic_snapshot(seed):
+    random_state = np.random.RandomState(seed)
+    edge_count = len(connection_info.edge_ids)
+    vehicle_number = np.zeros(edge_count, dtype=np.int32)
+    vehicle_number[connection_info.edge_list_indices] = random_state.randint(0, 4, len(connection_info.edge_list))
+    vehicle_length = np.where(vehicle_number > 0, 5.0, 0.0)
+    return TrafficSnapshot(100.0, vehicle_number, connection_info.edge_max_speeds, np.zeros(edge_count),
+                           vehicle_length, edge_length_array(connection_info))
+
+
+def reachable_vehicles(count):
+    random.seed(3)
+    reachability = ReachabilityIndex(connection_info)
+    vehicles = []
+    while len(vehicles) < count:
+        start, destination = random.sample(connection_info.edge_list, 2)
+        if reachability.reachable_edge(start, destination):
+            vehicle = Vehicle(str(len(vehicles)), destination, 0, random.randint(100, 1000))
+            vehicle.current_edge = start
+            vehicles.append(vehicle)
+    return vehicles
+
+
+def route_plan_cost(policy, route_plan):
+    # the cost of both searches: the weights of the edges entered after the current edge
+    return sum(policy.weight[edge] for edge in route_plan[1:])
+
+
+def test_batch_matches_a_star():
+    for seed in range(3):
+        snapshot = traffic_snapshot(seed)
+        routes = {}
+        for batch in (False, True):
+            policy = HeuristicPolicy(connection_info, batch=batch)
+            policy.observe_traffic(snapshot)
+            vehicles = reachable_vehicles(60)
+            local_targets = policy.make_decisions(vehicles, connection_info)
+            routes[batch] = [(vehicle.route_plan, route_plan_cost(policy, vehicle.route_plan),
+                              local_targets[vehicle.vehicle_id]) for vehicle in vehicles]
+
+        for (a_star_plan, a_star_cost, a_star_target), (batch_plan, batch_cost, batch_target) in \
+                zip(routes[False], routes[True]):
+            assert a_star_plan[-1] == batch_plan[-1]
+            assert abs(a_star_cost - batch_cost) <= 1e-9 * a_star_cost
+            if a_star_plan == batch_plan:
+                assert a_star_target == batch_target
+
+
+if __name__ == "__main__":
+    test_batch_matches_a_star()
+    print("TEST PASSED")
@@ -0,0 +1,56 @@
+'''
+This test file needs the following files:
+Util.py, shortest_path_engine.py, landmarks.py, test.net.xml and corresponding SUMO libraries.
+It checks that the landmark lower bounds never exceed the shortest path costs of DijkstraEngine, and that they
+are exact for the landmarks themselves, and that a truncated cache is computed again.
+Run it from the main repository.
+'''
+import os
+import random
+import tempfile
+import numpy as np
+from core.Util import ConnectionInfo
+from core.shortest_path_engine import DijkstraEngine
+from core.landmarks import LandmarkIndex
+
+connection_info = ConnectionInfo("./configurations/test.net.xml")
+engine = DijkstraEngine(connection_info)
+landmarks = LandmarkIndex(connection_info, engine.lengths, landmark_count=4, cache_file="")
+
+
+def test_lower_bounds():
+    random.seed(0)
+    for _ in range(20):
+        goal = connection_info.edge_index_dict[random.choice(connection_info.edge_list)]
+        bounds = landmarks.lower_bounds(goal)
+        distance, _, _ = engine.reverse_search(goal)
+        for edge in range(len(connection_info.edge_ids)):
+            assert bounds[edge] <= distance[edge] + 1e-6
+        for landmark in landmarks.landmarks.tolist():
+            if distance[landmark] < float("inf"):
+                assert abs(bounds[landmark] - distance[landmark]) < 1e-6
+
+
+def test_landmarks_are_distinct():
+    assert len(set(landmarks.landmarks.tolist())) == 4
+
+
+def test_truncated_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        cache_file = os.path.join(directory, "test.net.xml.landmarks.npz")
+        LandmarkIndex(connection_info, engine.lengths, landmark_count=4, cache_file=cache_file)
+        size = os.path.getsize(cache_file)
+        with open(cache_file, "r+b") as f:
+            f.truncate(size // 2)
+        cached = LandmarkIndex(connection_info, engine.lengths, landmark_count=4, cache_file=cache_file)
+        assert np.array_equal(cached.landmarks, landmarks.landmarks)
+        assert np.array_equal(cached.to_landmark, landmarks.to_landmark)
+        assert os.path.getsize(cache_file) == size
+        assert os.listdir(directory) == [os.path.basename(cache_file)]
+
+
+if __name__ == "__main__":
+    test_lower_bounds()
+    test_landmarks_are_distinct()
+    test_truncated_cache()
+    print("TEST PASSED")
@@ -18,7 +18,7 @@ else:
     sys.exit("No environment variable SUMO_HOME!")
 
 from sumolib import checkBinary
-import traci
+from core.sumo_backend import traci
 
 sumo_binary = checkBinary('sumo-gui')
 # sumo_binary = checkBinary('sumo')
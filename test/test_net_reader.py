@@ -0,0 +1,53 @@
+'''
+This test file needs the following files:
+Util.py, net_reader.py, the network files in configurations and corresponding SUMO libraries.
+It checks that ConnectionInfo built from the streaming network reader equals the one built from
+sumolib.net.readNet, for every network in the repository.
+Run it from the main repository.
+'''
+import glob
+import numpy as np
+import sumolib
+from core.Util import ConnectionInfo
+from core.net_reader import read_net
+
+net_files = sorted(glob.glob("./configurations/*.net.xml") + glob.glob("./configurations/maps/*.net.xml"))
+
+
+def test_streamed_edges():
+    for net_file in net_files:
+        reference = sumolib.net.readNet(net_file)
+        streamed = read_net(net_file)
+        assert [edge.getID() for edge in streamed.getEdges()] == [edge.getID() for edge in reference.getEdges()]
+        for edge in reference.getEdges():
+            streamed_edge = streamed.getEdge(edge.getID())
+            assert streamed_edge.allows("passenger") == edge.allows("passenger")
+            assert streamed_edge.getLength() == edge.getLength()
+            assert [lane.getSpeed() for lane in streamed_edge.getLanes()] == \
+                [lane.getSpeed() for lane in edge.getLanes()]
+            assert [out_edge.getID() for out_edge in streamed_edge.getOutgoing()] == \
+                [out_edge.getID() for out_edge in edge.getOutgoing()]
+            for out_edge, connections in edge.getOutgoing().items():
+                streamed_connections = streamed_edge.getConnections(streamed.getEdge(out_edge.getID()))
+                assert [connection.getDirection() for connection in streamed_connections] == \
+                    [connection.getDirection() for connection in connections]
+
+
+def test_connection_info_parity():
+    for net_file in net_files:
+        reference = ConnectionInfo(net_file, cache_file="", net=sumolib.net.readNet(net_file))
+        streamed = ConnectionInfo(net_file, cache_file="")
+        for name in ["edge_ids", "edge_list", "edge_index_dict", "edge_length_dict", "edge_lane_count_dict",
+                     "edge_max_speed_dict", "direction_list", "direction_table", "roundabout_edges"]:
+            assert list(getattr(streamed, name)) == list(getattr(reference, name)), (net_file, name)
+            assert getattr(streamed, name) == getattr(reference, name), (net_file, name)
+        for edge_id, outgoing_edges in reference.outgoing_edges_dict.items():
+            assert list(streamed.outgoing_edges_dict[edge_id].items()) == list(outgoing_edges.items())
+        for name in ["out_indptr", "out_indices", "out_directions", "edge_lengths", "edge_max_speeds"]:
+            assert np.array_equal(getattr(streamed, name), getattr(reference, name)), (net_file, name)
+
+
+if __name__ == "__main__":
+    test_streamed_edges()
+    test_connection_info_parity()
+    print("TEST PASSED")
@@ -0,0 +1,73 @@
+'''
+This test file needs the following files:
+Util.py, network_cache.py, test.net.xml and corresponding SUMO libraries.
+It checks that a ConnectionInfo loaded from the network cache equals the one parsed from the network file, and
+that a cache written for other file contents is not used.
+Run it from the main repository.
+'''
+import os
+import tempfile
+import numpy as np
+from core.Util import ConnectionInfo, GRAPH_ARRAYS
+from core.network_cache import file_hash, load_cache, save_cache
+
+net_file = "./configurations/test.net.xml"
+
+
+def test_cached_connection_info():
+    with tempfile.TemporaryDirectory() as directory:
+        cache_file = os.path.join(directory, "test.net.xml.netcache")
+        parsed = ConnectionInfo(net_file, cache_file=cache_file)
+        assert load_cache(cache_file, file_hash(net_file)) is not None
+        cached = ConnectionInfo(net_file, cache_file=cache_file)
+
+    for name in ["edge_ids", "edge_list", "edge_index_dict", "edge_length_dict", "edge_lane_count_dict",
+                 "edge_max_speed_dict", "direction_list", "direction_table", "roundabout_edges"]:
+        assert list(getattr(cached, name)) == list(getattr(parsed, name)), name
+        assert getattr(cached, name) == getattr(parsed, name), name
+    # the directions of every edge keep their order
+    for edge_id, outgoing_edges in parsed.outgoing_edges_dict.items():
+        assert list(cached.outgoing_edges_dict[edge_id].items()) == list(outgoing_edges.items())
+    # the graph arrays are used from the cache as they are, not rebuilt
+    for name in GRAPH_ARRAYS:
+        assert np.array_equal(getattr(cached, name), getattr(parsed, name)), name
+        assert getattr(cached, name).dtype == getattr(parsed, name).dtype, name
+        assert not getattr(cached, name).flags.writeable, name
+
+
+def test_stale_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        cache_file = os.path.join(directory, "cache")
+        save_cache(cache_file, "other contents", {"values": np.arange(3)}, {"names": ["a", "b"]})
+        assert load_cache(cache_file, "file contents") is None
+        values = load_cache(cache_file, "other contents", ("names",))
+        assert values["values"].tolist() == [0, 1, 2] and values["names"] == ["a", "b"]
+
+
+def test_truncated_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        cache_file = os.path.join(directory, "test.net.xml.netcache")
+        parsed = ConnectionInfo(net_file, cache_file=cache_file)
+        assert os.listdir(directory) == ["test.net.xml.netcache"]
+        with open(cache_file, "r+b") as f:
+            f.truncate(os.path.getsize(cache_file) // 2)
+        assert load_cache(cache_file, file_hash(net_file)) is None
+        # falls back to parsing the network and writes a complete cache again
+        reparsed = ConnectionInfo(net_file, cache_file=cache_file)
+        assert reparsed.edge_ids == parsed.edge_ids
+        assert load_cache(cache_file, file_hash(net_file)) is not None
+
+        # a header that is valid JSON but not a cache header
+        save_cache(cache_file, "contents", {}, {})
+        with open(cache_file, "r+b") as f:
+            data = f.read().replace(b'"arrays"', b'"other!"')
+            f.seek(0)
+            f.write(data)
+        assert load_cache(cache_file, "contents") is None
+
+
+if __name__ == "__main__":
+    test_cached_connection_info()
+    test_stale_cache()
+    test_truncated_cache()
+    print("TEST PASSED")
@@ -0,0 +1,70 @@
+'''
+This test file needs the following files:
+Util.py, random_trips.py, simple_grid1.net.xml, test.net.xml and corresponding SUMO libraries.
+It checks that the in-process trip generator departs vehicles as randomTrips.py -e 50 -p <period> does, only on
+the start and end edges randomTrips.py would use, with routes that can be driven, and that the same seed gives
+the same vehicles.
+Run it from the main repository.
+'''
+import os
+import tempfile
+import xml.etree.ElementTree as ElementTree
+import sumolib
+from core.Util import ConnectionInfo
+from core.random_trips import departure_times, generate_random_trips, trip_edge_candidates
+
+grid_file = "./configurations/maps/simple_grid1.net.xml"
+net_file = "./configurations/test.net.xml"
+
+
+def read_vehicles(route_file):
+    return [(vehicle.get("id"), vehicle.get("depart"), vehicle.find("route").get("edges").split())
+            for vehicle in ElementTree.parse(route_file).getroot().iter("vehicle")]
+
+
+def test_departures():
+    assert departure_times(0.0, 50.0, 0.5) == [0.5 * i for i in range(100)]
+    times = departure_times(0.0, 50.0, 0.3)
+    assert len(times) == 167 and times[-1] < 50.0
+
+
+def test_edge_candidates():
+    connection_info = ConnectionInfo(grid_file)
+    net = sumolib.net.readNet(grid_file)
+    sources, destinations = trip_edge_candidates(connection_info)
+    assert sorted(sources.tolist()) == sorted(connection_info.edge_index_dict[edge.getID()] for edge in net.getEdges()
+                                              if edge.allows("passenger") and not edge.is_fringe(edge._outgoing))
+    assert sorted(destinations.tolist()) == sorted(connection_info.edge_index_dict[edge.getID()]
+                                                   for edge in net.getEdges()
+                                                   if edge.allows("passenger") and not edge.is_fringe(edge._incoming))
+
+
+def test_generated_routes():
+    connection_info = ConnectionInfo(net_file)
+    sources, destinations = trip_edge_candidates(connection_info)
+    sources = set(connection_info.edge_ids[index] for index in sources.tolist())
+    destinations = set(connection_info.edge_ids[index] for index in destinations.tolist())
+    with tempfile.TemporaryDirectory() as directory:
+        route_file = os.path.join(directory, "random.rou.xml")
+        count = generate_random_trips(connection_info, route_file, 0.25, seed=7)
+        vehicles = read_vehicles(route_file)
+        assert generate_random_trips(connection_info, route_file, 0.25, seed=7) == count
+        assert read_vehicles(route_file) == vehicles
+        assert os.listdir(directory) == ["random.rou.xml"]
+
+    assert count == len(vehicles) and 0 < count <= 200
+    previous_trip = -1
+    for vehicle_id, depart, route in vehicles:
+        trip = int(vehicle_id)
+        assert trip > previous_trip and depart == "{:.2f}".format(trip * 0.25)
+        previous_trip = trip
+        assert route[0] in sources and route[-1] in destinations
+        for edge, next_edge in zip(route, route[1:]):
+            assert next_edge in connection_info.outgoing_edges_dict[edge].values()
+
+
+if __name__ == "__main__":
+    test_departures()
+    test_edge_candidates()
+    test_generated_routes()
+    print("TEST PASSED")
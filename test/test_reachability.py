@@ -0,0 +1,80 @@
+'''
+This test file needs the following files:
+Util.py, shortest_path_engine.py, reachability.py, target_vehicles_generation_protocols.py, test.net.xml,
+simple_grid1.net.xml and corresponding SUMO libraries.
+It checks that the reachability index agrees with full searches of DijkstraEngine and with sumolib's passenger
+routing, and that the vehicle generator only draws pairs with a path between them.
+Run it from the main repository.
+'''
+import random
+import numpy as np
+import sumolib
+from core.Util import ConnectionInfo
+from core.shortest_path_engine import DijkstraEngine
+from core.reachability import ReachabilityIndex
+from core.target_vehicles_generation_protocols import target_vehicles_generator, validate_path
+
+net_file = "./configurations/test.net.xml"
+connection_info = ConnectionInfo(net_file)
+reachability = ReachabilityIndex(connection_info)
+
+
+def test_reachability_matches_search():
+    engine = DijkstraEngine(connection_info)
+    sources = connection_info.edge_list_indices.tolist()
+    matrix = reachability.reachable_matrix(sources, np.arange(len(connection_info.edge_ids)))
+    for row, source in enumerate(sources):
+        distance, _, _ = engine.search(source)
+        reached = np.isfinite(np.array(distance))
+        assert np.array_equal(matrix[row], reached), connection_info.edge_ids[source]
+        assert reachability.reachable(source, source)
+
+    reached_counts, reaching_counts = reachability.pair_counts(sources, sources)
+    square = reachability.reachable_matrix(sources, sources)
+    assert np.array_equal(reached_counts, square.sum(axis=1))
+    assert np.array_equal(reaching_counts, square.sum(axis=0))
+
+
+def test_components_are_topologically_ordered():
+    component = reachability.component
+    for source in range(len(connection_info.edge_ids)):
+        targets, _ = connection_info.outgoing_arcs(source)
+        assert all(component[target] <= component[source] for target in targets.tolist())
+
+
+def test_matches_sumolib_passenger_routing():
+    grid_file = "./configurations/maps/simple_grid1.net.xml"
+    grid = ConnectionInfo(grid_file)
+    grid_reachability = ReachabilityIndex(grid)
+    net = sumolib.net.readNet(grid_file)
+    for start in grid.edge_list:
+        for destination in grid.edge_list:
+            path = net.getShortestPath(net.getEdge(start), net.getEdge(destination), vClass="passenger")[0]
+            assert grid_reachability.reachable_edge(start, destination) == (path is not None)
+
+
+def test_generator_draws_reachable_pairs():
+    random.seed(1)
+    generator = target_vehicles_generator(net_file)
+    generator.reset_vehicle_info("test.reachability.xml")
+    result = generator.generate_target_vehicles(50, "test.reachability.xml")
+    vehicles_info = result[target_vehicles_generator.VEHICLES_INFO]
+    assert result[target_vehicles_generator.__ERROR_MESSAGE__] is None
+    assert len(vehicles_info) == 50
+    for _, (start, destination), valid in vehicles_info:
+        assert valid and start.getID() != destination.getID()
+        assert validate_path(generator.reachability, start, destination)
+
+    starts = generator.random_select_edge_IDs(10)
+    destinations = generator.random_select_edge_IDs(10)
+    for start, destination in generator.sample_reachable_pairs(starts, destinations, 50):
+        assert start in starts and destination in destinations
+        assert validate_path(generator.reachability, start, destination)
+
+
+if __name__ == "__main__":
+    test_reachability_matches_search()
+    test_components_are_topologically_ordered()
+    test_matches_sumolib_passenger_routing()
+    test_generator_draws_reachable_pairs()
+    print("TEST PASSED")
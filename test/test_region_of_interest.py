@@ -0,0 +1,55 @@
+'''
+This test file needs the following files:
+STR_SUMO.py, edge_statistics.py, RouteController.py, FloydWarshallController.py, Util.py,
+target_vehicles_generation_protocols.py, simple_grid1.net.xml and corresponding SUMO libraries.
+It runs a short simulation with regions of interest and FloydWarshallPolicy, which reads the traffic state of the
+whole network, and checks that every edge stays queried, so the decisions see the same traffic as without regions.
+Run it from the main repository.
+'''
+import os
+import random
+import tempfile
+from sumolib import checkBinary
+from core.Util import ConnectionInfo
+from core.STR_SUMO import StrSumo
+from core.target_vehicles_generation_protocols import target_vehicles_generator
+from core.sumo_backend import traci
+from controller.FloydWarshallController import FloydWarshallPolicy
+
+net_file = "./configurations/maps/simple_grid1.net.xml"
+
+
+def test_whole_network_controller():
+    random.seed(3)
+    connection_info = ConnectionInfo(net_file)
+    with tempfile.TemporaryDirectory() as directory:
+        route_file = os.path.join(directory, "region.rou.xml")
+        generator = target_vehicles_generator(net_file)
+        vehicles = generator.generate_vehicles(5, 10, 1, route_file, net_file)
+        simulation = StrSumo(FloydWarshallPolicy(connection_info), connection_info,
+                             {str(vehicle.vehicle_id): vehicle for vehicle in vehicles}, region_hops=1)
+        decisions = []
+        decide = simulation.decide
+
+        def checked_decide(vehicles_to_direct, traffic_snapshot):
+            if vehicles_to_direct:
+                statistics = simulation.edge_statistics
+                assert statistics.subscribed_mask[connection_info.edge_list_indices].all()
+                for edge in connection_info.edge_list:
+                    index = connection_info.edge_index_dict[edge]
+                    assert traffic_snapshot.vehicle_number[index] == traci.edge.getLastStepVehicleNumber(edge)
+                decisions.append(len(vehicles_to_direct))
+            return decide(vehicles_to_direct, traffic_snapshot)
+
+        simulation.decide = checked_decide
+        traci.start([checkBinary("sumo"), "-n", net_file, "-r", route_file, "--no-step-log", "--no-warnings"])
+        try:
+            _, arrived, _ = simulation.run()
+        finally:
+            traci.close()
+    assert arrived == 5 and decisions
+
+
+if __name__ == "__main__":
+    test_whole_network_controller()
+    print("TEST PASSED")
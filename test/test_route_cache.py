@@ -0,0 +1,47 @@
+'''
+This test file needs the following files:
+route_cache.py, RouteController.py, DijkstraController.py, Util.py, test.net.xml and corresponding SUMO libraries.
+It checks the LRU eviction, the hit and miss counters and the invalidation of the route cache on new weights.
+Run it from the main repository.
+'''
+from core.route_cache import RouteCache
+from core.Util import ConnectionInfo, Vehicle
+from controller.DijkstraController import DijkstraPolicy
+
+
+def test_lru_eviction():
+    cache = RouteCache(max_size=2)
+    cache.put("a", "d", 0, ["s"])
+    cache.put("b", "d", 0, ["l"])
+    assert cache.get("a", "d", 0) == ["s"]
+    cache.put("c", "d", 0, ["r"])
+    # "b" is the least recently used route
+    assert cache.get("b", "d", 0) is None
+    assert cache.get("a", "d", 0) == ["s"]
+    assert cache.get("c", "d", 0) == ["r"]
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_weight_versions():
+    connection_info = ConnectionInfo("./configurations/test.net.xml")
+    policy = DijkstraPolicy(connection_info)
+    cache = policy.enable_route_cache()
+    vehicle = Vehicle("0", connection_info.edge_list[-1], 0, 1000)
+    vehicle.current_edge = connection_info.edge_list[0]
+    weights = [1.0] * len(connection_info.edge_ids)
+    policy.publish_weights(weights)
+    decisions = policy.cached_decisions(vehicle, lambda v: ["s"])
+    policy.publish_weights(list(weights))
+    assert policy.weight_version == 0
+    assert policy.cached_decisions(vehicle, lambda v: ["r"]) == decisions == ["s"]
+    weights[0] = 2.0
+    policy.publish_weights(weights)
+    assert policy.weight_version == 1
+    assert policy.cached_decisions(vehicle, lambda v: ["r"]) == ["r"]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+if __name__ == "__main__":
+    test_lru_eviction()
+    test_weight_versions()
+    print("TEST PASSED")
@@ -0,0 +1,115 @@
+'''
+This test file needs the following files:
+STR_SUMO.py, RouteController.py, DijkstraController.py, DensityDijkstraController.py,
+ContractionHierarchyController.py, traffic_snapshot.py, Util.py, test.net.xml and corresponding SUMO libraries.
+It checks that routing decisions are stored as route plans on the vehicles, that a plan only drifts when the
+cost of its remaining edges changes by more than the threshold, and that the controllers publish the weights of
+every step, also when no vehicle is routed.
+Run it from the main repository.
+'''
+import numpy as np
+from core.Util import ConnectionInfo, Vehicle
+from core.STR_SUMO import StrSumo
+from core.traffic_snapshot import TrafficSnapshot, edge_length_array
+from controller.DijkstraController import DijkstraPolicy
+from controller.DensityDijkstraController import DensityDijkstraPolicy
+from controller.ContractionHierarchyController import ContractionHierarchyPolicy
+
+connection_info = ConnectionInfo("./configurations/test.net.xml")
+policy = DijkstraPolicy(connection_info)
+start_edge, destination = connection_info.edge_list[0], connection_info.edge_list[-1]
+
+
+def planned_vehicle():
+    vehicle = Vehicle("0", destination, 0, 1000)
+    vehicle.current_edge = start_edge
+    policy.make_decisions([vehicle], connection_info)
+    return vehicle
+
+
+def test_route_plan():
+    vehicle = planned_vehicle()
+    assert vehicle.route_plan[0] == start_edge and vehicle.route_plan[-1] == destination
+    for edge, next_edge in zip(vehicle.route_plan, vehicle.route_plan[1:]):
+        assert next_edge in connection_info.outgoing_edges_dict[edge].values()
+    assert vehicle.plan_index == 0
+
+
+def test_route_plan_drift():
+    simulation = StrSumo(policy, connection_info, {}, replan_threshold=0.5)
+    lengths = [connection_info.edge_length_dict[edge] for edge in connection_info.edge_ids]
+    policy.publish_weights(lengths)
+    vehicle = planned_vehicle()
+    assert not simulation.route_plan_drifted(vehicle)
+
+    remaining = [connection_info.edge_index_dict[edge] for edge in vehicle.route_plan[1:]]
+    weights = list(lengths)
+    weights[remaining[0]] *= 1.01
+    policy.publish_weights(weights)
+    assert not simulation.route_plan_drifted(vehicle)
+    for edge in remaining:
+        weights[edge] *= 2
+    policy.publish_weights(weights)
+    assert simulation.route_plan_drifted(vehicle)
+
+
+def traffic_snapshot(vehicle_number):
+    edge_count = len(connection_info.edge_ids)
+    vehicle_numbers = np.zeros(edge_count, dtype=np.int32)
+    vehicle_numbers[connection_info.edge_list_indices] = vehicle_number
+    return TrafficSnapshot(0.0, vehicle_numbers, connection_info.edge_max_speeds / (1 + vehicle_numbers),
+                           np.zeros(edge_count), np.where(vehicle_numbers > 0, 5.0, 0.0),
+                           edge_length_array(connection_info))
+
+
+def test_weights_published_without_vehicles():
+    for controller in (DensityDijkstraPolicy(connection_info),
+                       ContractionHierarchyPolicy(connection_info, order_cache_file="")):
+        controller.observe_traffic(traffic_snapshot(0))
+        assert controller.make_decisions([], connection_info) == {}
+        assert controller.edge_weights is not None and controller.weight_version == 0
+        controller.observe_traffic(traffic_snapshot(3))
+        controller.make_decisions([], connection_info)
+        assert controller.weight_version == 1
+
+
+def test_route_dispatch():
+    simulation = StrSumo(policy, connection_info, {}, dispatch="route")
+    vehicle = planned_vehicle()
+    route = simulation.planned_route(vehicle)
+    assert route == vehicle.route_plan
+    assert not simulation.holds_route(vehicle, route)
+    vehicle.dispatched_route = route
+    assert simulation.holds_route(vehicle, route)
+
+    # further down its plan, the vehicle still holds the rest of the route
+    vehicle.current_edge = route[1]
+    assert simulation.planned_route(vehicle) == route[1:]
+    assert simulation.holds_route(vehicle, route[1:])
+    vehicle.current_edge = "not on the plan"
+    assert simulation.planned_route(vehicle) is None
+
+
+def test_edges_of_interest():
+    vehicle = planned_vehicle()
+    plan = [connection_info.edge_index_dict[edge] for edge in vehicle.route_plan]
+    assert set(policy.edges_of_interest(vehicle, hops=0)) == set(plan)
+
+    corridor = set(plan)
+    for edge in plan:
+        corridor.update(connection_info.edge_index_dict[out_edge]
+                        for out_edge in connection_info.outgoing_edges_dict[connection_info.edge_ids[edge]].values())
+    assert set(policy.edges_of_interest(vehicle, hops=1)) == corridor
+
+    # further down its plan, the edges behind the vehicle are no longer of interest
+    vehicle.current_edge = vehicle.route_plan[1]
+    assert plan[0] not in policy.edges_of_interest(vehicle, hops=0)
+
+
+if __name__ == "__main__":
+    test_route_plan()
+    test_route_plan_drift()
+    test_weights_published_without_vehicles()
+    test_route_dispatch()
+    test_edges_of_interest()
+    print("TEST PASSED")
@@ -0,0 +1,73 @@
+'''
+This test file needs the following files:
+traci_tracer.py, sumo_backend.py and corresponding SUMO libraries.
+It checks that traced calls are counted by caller, domain and method, and per step, and that the SUMO handle
+traces the domains of both backends.
+Run it from the main repository.
+'''
+import types
+from core.traci_tracer import TraciTracer, TracedDomain, traced_call
+from core.sumo_backend import SumoBackend
+
+
+class EdgeDomain:
+    def getLastStepVehicleNumber(self, edge_id):
+        return 3
+
+
+class EdgeReader:
+    def __init__(self, edge):
+        self.edge = edge
+
+    def read(self, edge_ids):
+        return [self.edge.getLastStepVehicleNumber(edge_id) for edge_id in edge_ids]
+
+
+def test_call_accounting():
+    tracer = TraciTracer()
+    edge = TracedDomain("edge", EdgeDomain(), tracer)
+    simulation_step = traced_call("", "simulationStep", lambda: None, tracer)
+
+    assert EdgeReader(edge).read(["a", "b", "c"]) == [3, 3, 3]
+    simulation_step()
+    edge.getLastStepVehicleNumber("a")
+    simulation_step()
+
+    # calls from plain functions are attributed to their module
+    module = test_call_accounting.__module__
+    assert tracer.steps == 2
+    assert dict(tracer.calls) == {("EdgeReader", "edge", "getLastStepVehicleNumber"): 3,
+                                  (module, "edge", "getLastStepVehicleNumber"): 1,
+                                  (module, "", "simulationStep"): 2}
+    assert tracer.max_step_calls[("EdgeReader", "edge", "getLastStepVehicleNumber")] == 3
+    assert "EdgeReader" in tracer.summary()
+
+
+class SimulationDomain:
+    # a libsumo domain: a class with static methods and no getIDList
+    @staticmethod
+    def getTime():
+        return 1.0
+
+
+def test_backend_domains():
+    backend = SumoBackend()
+    backend.name = "libsumo"
+    backend.module = types.SimpleNamespace(simulation=SimulationDomain, edge=EdgeDomain(),
+                                           simulationStep=lambda: None, TraCIException=Exception)
+    tracer = backend.enable_tracing()
+    assert backend.simulation.getTime() == 1.0
+    assert backend.edge.getLastStepVehicleNumber("a") == 3
+    backend.simulationStep()
+    assert backend.TraCIException is Exception
+
+    module = test_backend_domains.__module__
+    assert dict(tracer.calls) == {(module, "simulation", "getTime"): 1,
+                                  (module, "edge", "getLastStepVehicleNumber"): 1,
+                                  (module, "", "simulationStep"): 1}
+
+
+if __name__ == "__main__":
+    test_call_accounting()
+    test_backend_domains()
+    print("TEST PASSED")
@@ -0,0 +1,34 @@
+'''
+This test file needs the following files:
+traffic_snapshot.py and corresponding SUMO libraries.
+It checks that a TrafficSnapshot computes the edge densities and cannot be modified.
+Run it from the main repository.
+'''
+import numpy as np
+from core.traffic_snapshot import TrafficSnapshot
+
+vehicle_number = np.array([0, 2, 5])
+snapshot = TrafficSnapshot(10.0, vehicle_number, [13.9, 5.0, 1.0], [0, 10, 40], [0, 5, 5], [100.0, 50.0, 0.0])
+
+
+def test_density():
+    assert snapshot.time == 10.0
+    assert np.allclose(snapshot.density, [0, 0.04, 5])
+
+
+def test_read_only():
+    for values in (snapshot.vehicle_number, snapshot.mean_speed, snapshot.density):
+        try:
+            values[0] = 1
+        except ValueError:
+            continue
+        raise AssertionError("snapshot arrays must be read-only")
+    # the snapshot does not share memory with the arrays it was built from
+    vehicle_number[0] = 3
+    assert snapshot.vehicle_number[0] == 0
+
+
+if __name__ == "__main__":
+    test_density()
+    test_read_only()
+    print("TEST PASSED")
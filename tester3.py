@@ -8,10 +8,7 @@ import sys
 from xml.dom.minidom import parse, parseString
 from core.Util import *
 from controller.RouteController import *
-from controller.DijkstraController import DijkstraPolicy
-from controller.DensityDijkstraController import DensityDijkstraPolicy
-from controller.FloydWarshallController import FloydWarshallPolicy
-from controller.HeuristicController import HeuristicPolicy
+from controller.registry import create_controller
 from core.target_vehicles_generation_protocols import *
 import numpy as np
 import csv
@@ -24,7 +21,7 @@ else:
     sys.exit("No environment variable SUMO_HOME!")
 
 from sumolib import checkBinary
-import traci
+from core.sumo_backend import traci
 
 
 # use vehicle generation protocols to generate vehicle list
@@ -57,25 +54,25 @@ def get_controlled_vehicles(route_filename, connection_info,
 
 def test_dijkstra_policy(vehicles):
     print("Testing Dijkstra's Algorithm Route Controller")
-    scheduler = DijkstraPolicy(init_connection_info)
+    scheduler = create_controller("dijkstra", init_connection_info)
     return run_simulation(scheduler, vehicles)
 
 
 def test_density_policy(vehicles):
     print("Testing Density Dijkstra's Algorithm Route Controller")
-    scheduler = DensityDijkstraPolicy(init_connection_info)
+    scheduler = create_controller("density_dijkstra", init_connection_info)
     return run_simulation(scheduler, vehicles)
 
 
 def test_fw_policy(vehicles):
     print("Testing Floyd-Warshall Route Controller")
-    scheduler = FloydWarshallPolicy(init_connection_info)
+    scheduler = create_controller("floyd_warshall", init_connection_info)
     return run_simulation(scheduler, vehicles)
 
 
 def test_astar_policy(vehicles):
     print("Testing A-Star Route Controller")
-    scheduler = HeuristicPolicy(init_connection_info)
+    scheduler = create_controller("heuristic", init_connection_info)
     return run_simulation(scheduler, vehicles)
 
 